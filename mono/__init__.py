@@ -3,4 +3,22 @@ project monopoly
 author: or_hid
 """
 
-from mono.game import run_game
+import importlib
+
+# submodules are only imported once their functions are first used
+_LAZY = {
+        'run_game' : 'mono.game',
+        }
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name:str):
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    return getattr(importlib.import_module(module), name)
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,555 @@
+"""
+Batch simulation handling.
+"""
+
+import json
+import logging as log
+import os
+import sys
+import time
+import uuid
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+from random import Random
+
+from mono.game import run_game
+from mono.player import adopt, settings, use_knowledge
+from mono.sketch import Sketches
+from mono.stats import RatioGroup, RunningStat, StatGroup
+from mono.store import KnowledgeStore
+
+_MIN_GAMES = 8
+
+
+# tallies
+
+def tally_game(board, tally_c:dict, tally_f:dict):
+    """Add the visitations of a finished game to the running tallies."""
+    for key, value in board.colour_visits.items():
+        tally_c[key] = tally_c.get(key, 0) + value
+    for key, value in board.field_visits.items():
+        tally_f[key] = tally_f.get(key, 0) + value
+
+def write_tallies(tally_c:dict, tally_f:dict, directory:str = 'bounce'):
+    """Save the colour and field tallies to csv files."""
+    total_c = sum(value for value in iter(tally_c.values()))
+    total_f = sum(value for value in iter(tally_f.values()))
+    with open(f'{directory}/tally_colour.csv', 'w') as csv:
+        csv.write('colour, tally, prob\n')
+        for key in tally_c:
+            csv.write(f'{key}, {tally_c[key]}, {tally_c[key]/total_c:.4f}\n')
+    with open(f'{directory}/tally_field.csv', 'w') as csv:
+        csv.write('field, tally, prob\n')
+        for key in tally_f:
+            csv.write(f'{key}, {tally_f[key]}, {tally_f[key]/total_f:.4f}\n')
+
+
+def seeded_players(seed:int = None) -> int:
+    """Draw a number of players, the same for the same seed."""
+    return Random(seed).randint(2,6)
+
+
+# estimates
+
+def strategy_wins(board) -> dict:
+    """Score each named strategy in a finished game by whether its player won."""
+    wins = dict()
+    for player in board.seats:
+        for strategy in player.strategies:
+            if strategy is not None:
+                wins[strategy] = max(wins.get(strategy, 0), int(player is board.winner))
+    return wins
+
+
+class Batch():
+    """Running tallies and estimates of a batch of games."""
+    def __init__(self):
+        self.games = 0
+        self.tally_c = dict()
+        self.tally_f = dict()
+        self.colours = RatioGroup()
+        self.fields = RatioGroup()
+        self.wins = StatGroup()
+        self.outcomes = dict()
+        self.sketches = Sketches()
+        self.started = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the batch started."""
+        return time.perf_counter() - self.started
+
+    def add(self, board):
+        """Take note of a finished game."""
+        self.games += 1
+        tally_game(board, self.tally_c, self.tally_f)
+        self.sketches.add_game(board)
+        self.colours.push(board.colour_visits)
+        self.fields.push(board.field_visits)
+        wins = strategy_wins(board)
+        self.wins.push(wins)
+        for strategy, won in wins.items():
+            games, total = self.outcomes.get(strategy, (0, 0))
+            self.outcomes[strategy] = (games + 1, total + won)
+
+    def widest(self) -> float:
+        """Widest confidence half width among all tracked quantities."""
+        return max(self.colours.widest(), self.fields.widest(), self.wins.widest())
+
+    def converged(self, tolerance:float) -> bool:
+        """Check whether every tracked quantity is known within tolerance."""
+        return self.games >= _MIN_GAMES and self.widest() <= tolerance
+
+
+def run_until_converged(
+        tolerance:float = 0.01,
+        max_games:int = None,
+        max_seconds:float = None,
+        num_players:int = None,
+        seed:int = None,
+        **kwds,
+        ) -> Batch:
+    """Run games until the visit probabilities and win rates settle.
+
+    Stops as soon as every tracked quantity lies within tolerance of its
+    estimate, or when either the game or the time budget runs out.
+    Games are played on a random number of players unless specified.
+    With a seed, the n-th game of the batch is played with seed + n.
+    """
+    batch = Batch()
+    while not batch.converged(tolerance):
+        if max_games is not None and batch.games >= max_games:
+            log.info('Game budget exhausted after %d games.', batch.games)
+            break
+        if max_seconds is not None and batch.elapsed >= max_seconds:
+            log.info('Time budget exhausted after %d games.', batch.games)
+            break
+        game_seed = None if seed is None else seed + batch.games
+        batch.add(run_game(
+            num_players = num_players or seeded_players(game_seed),
+            seed = game_seed,
+            **kwds,
+            ))
+    log.info('Batch finished after %d games, widest interval %.4f.', batch.games, batch.widest())
+    return batch
+
+
+# chunks
+
+def portable(config:dict) -> dict:
+    """A batch config fit for json, with the strategies of every seat as a sorted list."""
+    config = dict(config)
+    if config.get('strategies') is not None:
+        config['strategies'] = [None if strategies is None else sorted(strategies, key = str)
+                for strategies in config['strategies']]
+    return config
+
+def restore(config:dict) -> dict:
+    """A batch config read from json, with the strategies of every seat as a set again."""
+    config = dict(config)
+    if config.get('strategies') is not None:
+        config['strategies'] = [None if strategies is None else set(strategies)
+                for strategies in config['strategies']]
+    return config
+
+def game_result(board, seed:int) -> dict:
+    """Summarise a finished game."""
+    return {
+            'seed' : seed,
+            'players' : len(board.seats),
+            'laps' : board.laps,
+            'turns' : board.turns,
+            'winner' : None if board.winner is None
+                else sorted(board.winner.strategies, key = str),
+            }
+
+def play_chunk(start:int, stop:int, config:dict, heartbeat = None) -> dict:
+    """Play the games seeded from start to stop and aggregate them.
+
+    Games are played on a random number of players unless configured.
+    """
+    config = dict(config)
+    num_players = config.pop('num_players', None)
+    tally_c = dict()
+    tally_f = dict()
+    outcomes = dict()
+    sketches = Sketches()
+    results = []
+    for seed in range(start, stop):
+        board = run_game(num_players = num_players or seeded_players(seed), seed = seed, **config)
+        tally_game(board, tally_c, tally_f)
+        sketches.add_game(board)
+        for strategy, won in strategy_wins(board).items():
+            games, wins = outcomes.get(strategy, (0, 0))
+            outcomes[strategy] = (games + 1, wins + won)
+        results.append(game_result(board, seed))
+        if heartbeat is not None:
+            heartbeat()
+    return {
+            'tally_c' : tally_c,
+            'tally_f' : tally_f,
+            'outcomes' : outcomes,
+            'sketches' : sketches.as_dict(),
+            'results' : results,
+            }
+
+
+# running
+
+def _absorb(total:dict, part:dict):
+    for tally in ('tally_c', 'tally_f'):
+        for key, value in part[tally].items():
+            total[tally][key] = total[tally].get(key, 0) + value
+    for strategy, (games, wins) in part['outcomes'].items():
+        played, won = total['outcomes'].get(strategy, (0, 0))
+        total['outcomes'][strategy] = (played + games, won + wins)
+    total['sketches'].merge(Sketches.from_dict(part['sketches']))
+    total['results'].extend(part['results'])
+
+
+class Progress():
+    """Live throughput and estimated time left of a running batch."""
+    def __init__(self, games:int = None, seconds:float = None, stream = sys.stderr, interval:float = 1.0):
+        self.budget_games = games
+        self.budget_seconds = seconds
+        self.stream = stream
+        self.interval = interval
+        self.games = 0
+        self.turns = 0
+        self.started = time.perf_counter()
+        self._reported = self.started
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the batch started."""
+        return time.perf_counter() - self.started
+
+    def rates(self) -> (float, float):
+        """Games and turns per second so far."""
+        elapsed = max(self.elapsed, 1e-9)
+        return self.games / elapsed, self.turns / elapsed
+
+    def eta(self) -> float:
+        """Seconds left until either budget runs out."""
+        left = []
+        games_per_second, _ = self.rates()
+        if self.budget_games is not None and games_per_second > 0:
+            left.append((self.budget_games - self.games) / games_per_second)
+        if self.budget_seconds is not None:
+            left.append(self.budget_seconds - self.elapsed)
+        return max(min(left), 0) if left else float('nan')
+
+    def update(self, games:int, turns:int):
+        """Count finished games, reporting at most once an interval."""
+        self.games += games
+        self.turns += turns
+        if self.stream is not None and time.perf_counter() - self._reported >= self.interval:
+            self._reported = time.perf_counter()
+            games_per_second, turns_per_second = self.rates()
+            self.stream.write(f'\r{self.games} games  {games_per_second:.1f} games/s  '
+                    f'{turns_per_second:.0f} turns/s  eta {self.eta():.0f}s ')
+            self.stream.flush()
+
+    def summary(self) -> dict:
+        """Performance of the whole batch."""
+        games_per_second, turns_per_second = self.rates()
+        return {
+                'games' : self.games,
+                'turns' : self.turns,
+                'seconds' : round(self.elapsed, 3),
+                'games_per_second' : round(games_per_second, 3),
+                'turns_per_second' : round(turns_per_second, 1),
+                'turns_per_game' : round(self.turns / max(self.games, 1), 1),
+                }
+
+
+class Checkpoint():
+    """Atomic snapshots of a running batch, to resume it after a crash.
+
+    Tallies, outcomes and sketches of every game up to a seed are saved
+    together, replacing the previous snapshot at once. Per game results are
+    appended to a journal instead, and the snapshot remembers how long the
+    journal was, so results written after it are dropped on resuming.
+    """
+    def __init__(self, directory:str, every:float = 60.0, identity:dict = None):
+        self.directory = directory
+        self.every = every
+        self.identity = identity or dict()
+        self.path = os.path.join(directory, 'checkpoint.json')
+        self.journal_path = os.path.join(directory, 'results.journal')
+        # names the chunks merged into a knowledge store, kept on resuming
+        self.batch = uuid.uuid4().hex
+        self._journal = None
+        self._saved = time.perf_counter()
+
+    def load(self, total:dict) -> int:
+        """Fill the totals from the last snapshot and return the next seed to play.
+
+        Returns None when there is no snapshot yet.
+        """
+        os.makedirs(self.directory, exist_ok = True)
+        try:
+            with open(self.path) as handle:
+                content = json.load(handle)
+        except FileNotFoundError:
+            self._journal = open(self.journal_path, 'w')
+            return None
+        if content['identity'] != self.identity:
+            raise ValueError(f'Checkpoint in {self.directory} belongs to a different batch.')
+        self.batch = content.get('batch', self.batch)
+        total['tally_c'].update(content['tally_c'])
+        total['tally_f'].update({int(field):tally for field, tally in content['tally_f'].items()})
+        total['outcomes'].update({strategy:tuple(outcome)
+            for strategy, outcome in content['outcomes'].items()})
+        total['sketches'].merge(Sketches.from_dict(content['sketches']))
+        self._journal = open(self.journal_path, 'r+')
+        self._journal.truncate(content['journal'])
+        total['results'].extend(json.loads(line) for line in self._journal)
+        return content['next_seed']
+
+    def journal(self, results:list):
+        """Append results to the journal."""
+        self._journal.writelines(json.dumps(result) + '\n' for result in results)
+
+    def due(self) -> bool:
+        """Whether it is time for another snapshot."""
+        return time.perf_counter() - self._saved >= self.every
+
+    def save(self, total:dict, next_seed:int):
+        """Snapshot every game played before the next seed."""
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        content = {
+                'identity' : self.identity,
+                'batch' : self.batch,
+                'next_seed' : next_seed,
+                'tally_c' : total['tally_c'],
+                'tally_f' : total['tally_f'],
+                'outcomes' : total['outcomes'],
+                'sketches' : total['sketches'].as_dict(),
+                'journal' : self._journal.tell(),
+                }
+        with open(f'{self.path}.tmp', 'w') as handle:
+            json.dump(content, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(f'{self.path}.tmp', self.path)
+        self._saved = time.perf_counter()
+        log.info('Checkpoint before seed %d.', next_seed)
+
+    def close(self):
+        """Close the journal."""
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+def run_batch(
+        num_games:int = None,
+        max_seconds:float = None,
+        workers:int = None,
+        seed:int = 0,
+        chunk:int = 8,
+        progress:Progress = None,
+        threads:bool = False,
+        checkpoint:str = None,
+        checkpoint_every:float = 60.0,
+        knowledge:str = None,
+        **config,
+        ) -> dict:
+    """Play seeded games until the game or time budget runs out.
+
+    Games are played in chunks of consecutive seeds, spread over a pool of
+    worker processes if asked, or of worker threads with threads, which
+    only pays off on free-threaded builds of Python. Chunks started before
+    the time runs out are still finished and counted.
+    With a checkpoint directory, progress is saved every so many seconds and
+    a batch found there is resumed, continuing with the first seed it had
+    not finished. The game budget counts every game of the batch, the time
+    budget only this run.
+    With a knowledge store, every chunk is merged into it as it is absorbed,
+    and expert players in every worker rely on it. Chunks of a checkpointed
+    batch are merged once, even when played again after resuming.
+    """
+    if num_games is None and max_seconds is None:
+        raise ValueError('A batch needs a game or time budget.')
+    progress = progress or Progress(num_games, max_seconds, stream = None)
+    total = {'tally_c' : dict(), 'tally_f' : dict(), 'outcomes' : dict(),
+            'sketches' : Sketches(), 'results' : []}
+    start = seed
+    keeper = None
+    if checkpoint is not None:
+        keeper = Checkpoint(checkpoint, checkpoint_every,
+                identity = {'seed' : seed, 'config' : repr(sorted(portable(config).items()))})
+        resumed = keeper.load(total)
+        if resumed is None and knowledge is not None:
+            # the chunks merged before the first snapshot are named after it too
+            keeper.save(total, start)
+        if resumed is not None:
+            log.info('Resuming batch at seed %d.', resumed)
+            start = resumed
+            if progress.budget_games is not None:
+                progress.budget_games = max(progress.budget_games - (start - seed), 0)
+    store = None if knowledge is None else KnowledgeStore(knowledge)
+    end = None if num_games is None else seed + num_games
+    finished = start
+
+    def chunks():
+        nonlocal start
+        while (end is None or start < end) and \
+                (max_seconds is None or progress.elapsed < max_seconds):
+            stop = start + chunk if end is None else min(start + chunk, end)
+            yield start, stop
+            start = stop
+
+    def absorb(part, stop):
+        # chunks are absorbed in order, so every seed before stop is done
+        nonlocal finished
+        _absorb(total, part)
+        progress.update(len(part['results']), sum(result['turns'] for result in part['results']))
+        if store is not None:
+            store.merge(part['tally_c'], part['tally_f'], part['outcomes'],
+                    batch = None if keeper is None else f'{keeper.batch}/{finished}-{stop}')
+        finished = stop
+        if keeper is not None:
+            keeper.journal(part['results'])
+            if keeper.due():
+                keeper.save(total, finished)
+
+    def pump(pool):
+        running = []
+        for first, stop in chunks():
+            running.append((pool.apply_async(play_chunk, (first, stop, config)), stop))
+            # keep the pool busy without queueing the whole budget
+            while len(running) >= 2 * workers:
+                result, last = running.pop(0)
+                absorb(result.get(), last)
+        for result, last in running:
+            absorb(result.get(), last)
+
+    previous = settings()
+    if workers and threads:
+        # threads share the tables of this process, and take on its expert knowledge
+        knowing = previous if store is None else dict(previous, knowledge = store)
+        with ThreadPool(workers, initializer = adopt, initargs = (knowing,)) as pool:
+            pump(pool)
+    elif workers:
+        # numpy is only needed to share the tables with worker processes
+        from mono import shared
+        with shared.publish() as tables, \
+                Pool(workers, initializer = shared.attach, initargs = (tables.spec, knowledge)) as pool:
+            pump(pool)
+    else:
+        if store is not None:
+            use_knowledge(store)
+        try:
+            for first, stop in chunks():
+                absorb(play_chunk(first, stop, config), stop)
+        finally:
+            adopt(previous)
+    if keeper is not None:
+        keeper.save(total, finished)
+        keeper.close()
+    total['results'].sort(key = lambda result: result['seed'])
+    total['tally_f'] = dict(sorted(total['tally_f'].items()))
+    log.info('Batch of %d games finished in %.1fs.', progress.games, progress.elapsed)
+    return total
+
+def write_batch(total:dict, directory:str = 'bounce', form:str = 'csv'):
+    """Save tallies, game results and sketches of a batch."""
+    total['sketches'].write(directory)
+    if form == 'json':
+        with open(f'{directory}/tally.json', 'w') as handle:
+            json.dump({'colour' : total['tally_c'], 'field' : total['tally_f'],
+                'outcomes' : total['outcomes']}, handle)
+        with open(f'{directory}/results.jsonl', 'w') as handle:
+            for result in total['results']:
+                handle.write(json.dumps(result) + '\n')
+        return
+    write_tallies(total['tally_c'], total['tally_f'], directory)
+    with open(f'{directory}/results.csv', 'w') as csv:
+        csv.write('seed, players, laps, turns, winner\n')
+        for result in total['results']:
+            winner = '' if result['winner'] is None else ' '.join(map(str, result['winner']))
+            csv.write(f'{result["seed"]}, {result["players"]}, {result["laps"]}, '
+                    f'{result["turns"]}, {winner}\n')
+
+
+# comparing
+
+def rotate(lineup:list, rotation:int) -> list:
+    """Shift the lineup of strategies by a number of seats."""
+    return [lineup[(seat + rotation) % len(lineup)] for seat in range(len(lineup))]
+
+def play_rotations(lineup:list, seed:int, **kwds) -> list:
+    """Play one game per seat rotation of the lineup on common random numbers.
+
+    Returns, for each rotation, the index in the lineup of the winning entrant
+    or None if nobody won.
+    """
+    winners = []
+    for rotation in range(len(lineup)):
+        board = run_game(strategies = rotate(lineup, rotation), seed = seed, **kwds)
+        if board.winner is None:
+            winners.append(None)
+        else:
+            seat = board.seats.index(board.winner)
+            winners.append((seat + rotation) % len(lineup))
+    return winners
+
+def _play_rotations(args) -> list:
+    lineup, seed, kwds = args
+    return play_rotations(lineup, seed, **kwds)
+
+
+class Comparison():
+    """Win rates of a lineup of strategies played on common random numbers."""
+    def __init__(self, lineup:list):
+        self.lineup = lineup
+        self.games = 0
+        self.wins = [RunningStat() for _ in lineup]
+        self.differences = [RunningStat() for _ in lineup]
+
+    def add(self, winners:list):
+        """Take note of the winners of every rotation of a single seed."""
+        self.games += len(winners)
+        rates = [sum(1 for winner in winners if winner == entrant) / len(winners)
+                for entrant in range(len(self.lineup))]
+        for entrant, rate in enumerate(rates):
+            self.wins[entrant].push(rate)
+            # paired by seed, so the dice luck cancels out of the difference
+            self.differences[entrant].push(rate - rates[0])
+
+    def __repr__(self):
+        return '\n'.join(f'{sorted(map(str, strategies))} : {wins} ({difference} against first)'
+                for strategies, wins, difference
+                in zip(self.lineup, self.wins, self.differences))
+
+
+def compare_strategies(
+        lineup:list,
+        num_seeds:int = 72,
+        seed:int = 0,
+        workers:int = None,
+        **kwds,
+        ) -> Comparison:
+    """Compare strategies head to head with common random numbers.
+
+    Every seed is played once for each rotation of the lineup around the table,
+    so each entrant sits in every seat against identical dice and decks.
+    Seeds can be spread over a pool of worker processes, which share the
+    static tables read once by the parent.
+    """
+    comparison = Comparison(lineup)
+    jobs = ((lineup, seed + j, kwds) for j in range(num_seeds))
+    if workers:
+        from mono import shared
+        with shared.publish() as tables, \
+                Pool(workers, initializer = shared.attach, initargs = (tables.spec,)) as pool:
+            for winners in pool.imap(_play_rotations, jobs):
+                comparison.add(winners)
+    else:
+        for winners in map(_play_rotations, jobs):
+            comparison.add(winners)
+    log.info('Compared strategies over %d games.', comparison.games)
+    return comparison
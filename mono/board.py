@@ -3,8 +3,14 @@ Board handling.
 """
 
 import csv
+import io
 import logging as log
-from random import shuffle
+import marshal
+import os
+import zlib
+from random import Random
+
+from mono.zobrist import OWNER, DEVELOPMENT, MORTGAGED, TranspositionCache
 
 _CAT_FIELD = {'go','jail','parking','gojail','tax','chance','community'}
 _CAT_BUYABLE = {'utility','station'}
@@ -18,6 +24,65 @@ FIELD_POSITION = {
         }
 
 
+# static data
+
+_STATIC_FILES = ('board', 'estate', 'chance', 'community')
+_STATIC_CACHE = 'static/.cache.marshal'
+_CACHE_VERSION = 2
+_static = None
+
+def _parse(source:bytes) -> list:
+    return list(csv.DictReader(io.StringIO(source.decode('utf-8'), newline='')))
+
+def _sources() -> dict:
+    sources = dict()
+    for path in _STATIC_FILES:
+        with open(f'static/{path}.csv', 'rb') as source:
+            sources[path] = source.read()
+    return sources
+
+def read_static() -> dict:
+    """Read the rows of every static csv file."""
+    return {path:_parse(source) for path, source in _sources().items()}
+
+def load_static(cache:str = _STATIC_CACHE) -> dict:
+    """Read the static rows from the precompiled cache.
+
+    The cache is keyed on the contents of the csv files and rebuilt whenever
+    they change.
+    """
+    sources = _sources()
+    key = [_CACHE_VERSION, marshal.version] + [zlib.crc32(sources[path]) for path in _STATIC_FILES]
+    try:
+        with open(cache, 'rb') as cached:
+            content = marshal.loads(cached.read())
+        if content['key'] == key:
+            return content['static']
+    except (OSError, EOFError, ValueError, TypeError, KeyError):
+        pass
+    log.info('Rebuilding static cache.')
+    static = {path:_parse(source) for path, source in sources.items()}
+    try:
+        with open(f'{cache}.{os.getpid()}.tmp', 'wb') as cached:
+            marshal.dump({'key' : key, 'static' : static}, cached)
+        os.replace(f'{cache}.{os.getpid()}.tmp', cache)
+    except OSError:
+        # read only checkouts still work, only slower
+        pass
+    return static
+
+def use_static(static:dict):
+    """Build boards from already read static rows instead of the csv files."""
+    global _static
+    _static = static
+
+def _static_rows(path:str) -> list:
+    # read once per process
+    if _static is None:
+        use_static(load_static())
+    return _static[path]
+
+
 # fields
 
 class Field():
@@ -41,7 +106,14 @@ class Buyable(Field):
     def __hash__(self) -> int:
         # only hashable objects can be elements of sets
         # sets instead of lists for O(1) lookup
-        return hash(self.name)
+        # positions rather than names, since string hashes change between
+        # interpreters and so would the order of playing out estates
+        return hash(self.position)
+
+    def __reduce__(self):
+        # copies and pickles get their position before anything else, since
+        # the sets of estates they are in need the hash while being rebuilt
+        return _bare_buyable, (type(self), self.position), self.__dict__
 
     def _evaluate_cost(self, cost:int = 0) -> int:
         if cost:
@@ -66,8 +138,10 @@ class Buyable(Field):
                     return abs(moved) * (self.owner.count_owned_utilities() * 6 - 2)
         return 0
 
-    def mortgage(self):
+    def mortgage(self, board = None):
         """Mortgage this estate."""
+        if board is not None:
+            board.zobrist ^= MORTGAGED[self.position]
         self.mortgaged = True
         self.cost = self.cost // 2
         self.owner.capital += self.cost
@@ -77,11 +151,18 @@ class Buyable(Field):
     def demortgage(self, board):
         """Pay the mortgage."""
         self.owner.pay(self.cost + self.cost // 10, board)
+        board.zobrist ^= MORTGAGED[self.position]
         self.mortgaged = False
         self.cost = self.cost * 2
         log.info('Player %s pays the mortgage on %s.', self.owner.name, self.name)
 
 
+def _bare_buyable(cls, position:int):
+    field = cls.__new__(cls)
+    field.position = position
+    return field
+
+
 class Estate(Buyable):
     """A field which allows for development of huosing."""
     def __init__(
@@ -131,6 +212,8 @@ class Estate(Buyable):
             board.hotels += 1
         else:
             board.houses += 1
+        board.zobrist ^= DEVELOPMENT[self.position][self.development] ^ \
+                DEVELOPMENT[self.position][self.development - 1]
         self.development -= 1
         log.info('Player %s sells a house from %s for %d£.',
                 self.owner.name, self.name, self.house // 2)
@@ -146,45 +229,45 @@ class Estate(Buyable):
             board.hotels -= 1
             board.houses += 4
             log.info('Player %s builds a hotel on %s!', self.owner.name, self.name)
+        board.zobrist ^= DEVELOPMENT[self.position][self.development] ^ \
+                DEVELOPMENT[self.position][self.development + 1]
         self.development = self.development + 1
 
 
 def _read_fields() -> dict:
     log.info('Reading London fields.')
     fields = dict()
-    with open('static/board.csv', newline='') as fieldss:
-        for row in csv.DictReader(fieldss):
-            if row['category'] in _CAT_FIELD:
-                fields.update({int(row['position']):Field(
-                    name = row['name'],
-                    position = int(row['position']),
-                    category = row['category'],
-                    ), })
-            elif row['category'] in _CAT_BUYABLE:
-                fields.update({int(row['position']):Buyable(
-                    name = row['name'],
-                    position = int(row['position']),
-                    category = row['category'],
-                    cost = 200 if row['category'] == 'station' else 150,
-                    ), })
-            else:
-                continue
-    with open('static/estate.csv', newline='') as properties:
-        for row in csv.DictReader(properties):
-            fields.update({int(row['position']):Estate(
+    for row in _static_rows('board'):
+        if row['category'] in _CAT_FIELD:
+            fields.update({int(row['position']):Field(
+                name = row['name'],
+                position = int(row['position']),
+                category = row['category'],
+                ), })
+        elif row['category'] in _CAT_BUYABLE:
+            fields.update({int(row['position']):Buyable(
                 name = row['name'],
                 position = int(row['position']),
-                category = 'estate',
-                cost = int(row['cost']),
-                colour = row['colour'],
-                house = int(row['house']),
-                site = int(row['site']),
-                single = int(row['single']),
-                double = int(row['double']),
-                triple = int(row['triple']),
-                quadruple = int(row['quadruple']),
-                hotel = int(row['hotel']),
+                category = row['category'],
+                cost = 200 if row['category'] == 'station' else 150,
                 ), })
+        else:
+            continue
+    for row in _static_rows('estate'):
+        fields.update({int(row['position']):Estate(
+            name = row['name'],
+            position = int(row['position']),
+            category = 'estate',
+            cost = int(row['cost']),
+            colour = row['colour'],
+            house = int(row['house']),
+            site = int(row['site']),
+            single = int(row['single']),
+            double = int(row['double']),
+            triple = int(row['triple']),
+            quadruple = int(row['quadruple']),
+            hotel = int(row['hotel']),
+            ), })
     return fields
 
 
@@ -231,13 +314,15 @@ class Card():
             else:
                 player.pay(-self.capital, board)
         elif self.category == 'jail':
-            player.enjail()
+            player.enjail(board)
         elif self.category == 'jailout':
-            player.jailoutcard = True
+            # kept by the player until used, so a player may hold one of each deck
+            player.jailoutcards.append(self)
             log.info('Player %s draws the Get Out of Jail card.', player.name)
         else:
             if self.name == 'birthday':
-                birthday = sum(plr.pay(10) for plr in board.players)
+                birthday = sum(plr.pay(10, board) for plr in board.players
+                        if plr is not player and not plr.bankrupt)
                 player.capital += birthday
                 log.info('Player %s receives %d£.', player.name, birthday)
             elif self.name == 'takechance':
@@ -246,17 +331,16 @@ class Card():
                 else:
                     player.pay(10, board)
             else:
-                house_rent = 25 if self.name == 'houserent' else 40
-                hotel_rent = 100 if self.name == 'houserent' else 115
-                player.pay(house_rent * player.count_owned_houses + \
-                        hotel_rent * player.count_owned_hotels)
+                house_rent = 25 if self.name == 'repairs' else 40
+                hotel_rent = 100 if self.name == 'repairs' else 115
+                player.pay(house_rent * player.count_owned_houses() + \
+                        hotel_rent * player.count_owned_hotels(), board)
 
 def _read_cards(path:str) -> list:
-    with open(f'static/{path}.csv', newline='') as cards:
-        return [
-                Card(card['name'], card['category'], card['advance'], card['capital'])
-                for card in csv.DictReader(cards)
-                ]
+    return [
+            Card(card['name'], card['category'], card['advance'], card['capital'])
+            for card in _static_rows(path)
+            ]
 
 def _read_chance_cards() -> list:
     return _read_cards('chance')
@@ -265,23 +349,98 @@ def _read_community_cards() -> list:
     return _read_cards('community')
 
 
+_DECK_RULES = ('bottom', 'discard')
+
+class Deck():
+    """Cards drawn in turn from a fixed order.
+
+    By the bottom rule a drawn card goes back under the deck, so the order
+    cycles, except for Get Out of Jail cards which are held aside until used.
+    By the discard rule no card ever comes back and the deck runs out.
+    """
+    def __init__(self, cards:list, rule:str = 'bottom'):
+        if rule not in _DECK_RULES:
+            raise ValueError(f'Unknown deck rule {rule}.')
+        self.cards = cards
+        self.rule = rule
+        self.top = 0
+        self.held = []
+
+    def __len__(self) -> int:
+        if self.rule == 'discard':
+            return len(self.cards) - self.top
+        return len(self.cards) - len(self.held)
+
+    def shuffle(self, rng):
+        """Shuffle the deck."""
+        rng.shuffle(self.cards)
+        self.top = 0
+
+    def draw(self):
+        """Draw the top card, or None if there are no cards left."""
+        if self.rule == 'discard':
+            if self.top == len(self.cards):
+                return None
+            card = self.cards[self.top]
+            self.top += 1
+            return card
+        for _ in range(len(self.cards)):
+            card = self.cards[self.top]
+            self.top = (self.top + 1) % len(self.cards)
+            if not any(card is held for held in self.held):
+                if card.category == 'jailout':
+                    self.held.append(card)
+                return card
+        return None
+
+    def remaining(self) -> list:
+        """Cards that might be drawn next, those not yet drawn in this pass."""
+        cards = [card for card in self.cards[self.top:]
+                if not any(card is held for held in self.held)]
+        if cards or self.rule == 'discard':
+            return cards
+        return [card for card in self.cards if not any(card is held for held in self.held)]
+
+    def give_back(self, card) -> bool:
+        """Return a held card to its place in the deck."""
+        for j, held in enumerate(self.held):
+            if held is card:
+                del self.held[j]
+                return True
+        return False
+
+
 # board
 
 class Board():
-    """Board with fields, cards and bank."""
-    def __init__(self, houses, hotels):
+    """Board with fields, cards and bank.
+
+    Every board rolls its dice and shuffles its decks with a random number
+    generator of its own, so games never share random state.
+    """
+    def __init__(self, houses, hotels, deck_rule:str = 'bottom', rng = None):
+        self.rng = Random() if rng is None else rng
         self.fields = _read_fields()
-        self.chance = _read_chance_cards()
-        self.community = _read_community_cards()
+        self.chance = Deck(_read_chance_cards(), deck_rule)
+        self.community = Deck(_read_community_cards(), deck_rule)
         self.houses = houses
         self.hotels = hotels
         self.players = None
+        self.seats = None
+        self.winner = None
+        self.trajectory = None
+        self.first_bankruptcy = None
         self.laps = 0
+        self.turns = 0
+        self.zobrist = 0
+        self.transpositions = TranspositionCache()
         self.field_visits = {j:0 for j in range(40)}
         self.category_visits = {field.category:0 for field in iter(self.fields.values())}
         self.colour_visits = {field.colour:0 for field in iter(self.fields.values())
             if field.category == 'estate'}
         self.colour_visits.update({'utility':0, 'station':0})
+        self.rent_paid = {field.position:0 for field in iter(self.fields.values())
+            if field.category in {'estate', 'utility', 'station'}}
 
     def has_houses(self) -> bool:
         """Check is houses can be built on the board."""
@@ -293,27 +452,46 @@ class Board():
 
     def shuffle_decks(self):
         """Shuffle both decks."""
-        shuffle(self.chance)
-        shuffle(self.community)
+        self.chance.shuffle(self.rng)
+        self.community.shuffle(self.rng)
+
+    def give_back(self, card):
+        """Return a used Get Out of Jail card to its deck."""
+        if not self.chance.give_back(card):
+            self.community.give_back(card)
+
+    def own(self, field, player):
+        """Hand a field over to a player, or to the bank for None."""
+        if field.owner is not None and field.owner.seat is not None:
+            self.zobrist ^= OWNER[field.position][field.owner.seat]
+        if player is not None and player.seat is not None:
+            self.zobrist ^= OWNER[field.position][player.seat]
+        field.owner = player
 
     def discard_players(self):
         """Eliminate players with no capital."""
         total = len(self.players)
         self.players = [player for player in self.players if not player.bankrupt]
+        if total > len(self.players) and self.first_bankruptcy is None:
+            self.first_bankruptcy = self.laps
         log.info('%d players eliminated.', total - len(self.players))
 
-    def log_position(self, position):
-        """Take note of where the player landed."""
-        self.field_visits[position] += 1
-        self.category_visits[self.fields[position].category] += 1
+    def log_position(self, position, count:int = 1):
+        """Take note of where the player landed, or how many times."""
+        self.field_visits[position] += count
+        self.category_visits[self.fields[position].category] += count
         try:
-            self.colour_visits[self.fields[position].colour] += 1
+            self.colour_visits[self.fields[position].colour] += count
         except Exception:
             try:
-                self.colour_visits[self.fields[position].category] += 1
+                self.colour_visits[self.fields[position].category] += count
             except Exception:
                 pass
 
+    def log_rent(self, position, amount):
+        """Take note of rent paid for landing on a field."""
+        self.rent_paid[position] = self.rent_paid.get(position, 0) + amount
+
     def _log_visited_fields(self):
         total = sum(value for value in iter(self.field_visits.values()))
         log.info('The following fields were visited:')
@@ -346,9 +524,9 @@ class Board():
         self._log_visited_colours()
 
 
-def prepare_board(houses, hotels) -> Board:
+def prepare_board(houses, hotels, deck_rule:str = 'bottom', rng = None) -> Board:
     """Prepare London board for play."""
     log.info('Preparing London board.')
-    board = Board(houses, hotels)
+    board = Board(houses, hotels, deck_rule, rng)
     board.shuffle_decks()
     return board
@@ -0,0 +1,236 @@
+"""
+Expected cash flow of a player's next turn.
+"""
+
+from mono.board import FIELD_POSITION
+
+_RENT, _TAX, _CARDS = range(3)
+_JAIL_FINE = 50
+
+
+def _rolls() -> list:
+    # distinct sums of two dice, apart and as doubles, with their probability
+    rolls = dict()
+    for die0 in range(1, 7):
+        for die1 in range(1, 7):
+            key = (die0 + die1, die0 == die1)
+            rolls[key] = rolls.get(key, 0) + 1 / 36
+    return [(total, doubles, probability) for (total, doubles), probability in sorted(rolls.items())]
+
+_ROLLS = _rolls()
+
+
+def liquidity(player) -> int:
+    """Money the player can raise by selling every house and mortgaging every estate."""
+    return player.capital + sum(
+            getattr(estate, 'development', 0) * (estate.house // 2 if hasattr(estate, 'house') else 0)
+            + (0 if estate.mortgaged else estate.cost // 2)
+            for estate in player.estates)
+
+
+class CashFlow():
+    """Expected money changing hands on a single turn, and the risk of bankruptcy.
+
+    Rent and tax are the amounts paid, salary the money for passing Go and
+    cards the net money received from cards.
+    """
+    def __init__(
+            self,
+            salary:float = 0,
+            rent:float = 0,
+            tax:float = 0,
+            cards:float = 0,
+            bankruptcy:float = 0,
+            ):
+        self.salary = salary
+        self.rent = rent
+        self.tax = tax
+        self.cards = cards
+        self.bankruptcy = bankruptcy
+
+    @property
+    def net(self) -> float:
+        """Expected change of the player's capital."""
+        return self.salary + self.cards - self.rent - self.tax
+
+    def __repr__(self):
+        return (f'salary {self.salary:.2f}, rent {self.rent:.2f}, tax {self.tax:.2f}, '
+                f'cards {self.cards:.2f}, bankruptcy {self.bankruptcy:.4f}')
+
+
+class _Path():
+    """Where a turn might have led the player so far."""
+    __slots__ = ('position', 'balance', 'capital', 'bankrupt', 'jailed', 'drawn',
+            'salary', 'rent', 'tax', 'cards')
+
+    def __init__(self, position, balance, capital, bankrupt = False, jailed = False,
+            drawn = (), salary = 0, rent = 0, tax = 0, cards = 0):
+        self.position = position
+        # money left after selling everything
+        self.balance = balance
+        self.capital = capital
+        self.bankrupt = bankrupt
+        self.jailed = jailed
+        self.drawn = drawn
+        self.salary = salary
+        self.rent = rent
+        self.tax = tax
+        self.cards = cards
+
+    def move(self, position, salary:bool = False):
+        bonus = 200 if salary else 0
+        return _Path(position, self.balance + bonus, self.capital + bonus, self.bankrupt,
+                self.jailed, self.drawn, self.salary + bonus, self.rent, self.tax, self.cards)
+
+    def receive(self, amount):
+        return _Path(self.position, self.balance + amount, self.capital + amount, self.bankrupt,
+                self.jailed, self.drawn, self.salary, self.rent, self.tax, self.cards + amount)
+
+    def pay(self, amount, kind):
+        # mirrors Player.pay, which sells off until the amount is covered
+        paid = min(amount, max(self.balance, 0))
+        return _Path(self.position, self.balance - amount, max(self.capital - amount, 0),
+                self.bankrupt or self.balance < amount, self.jailed, self.drawn, self.salary,
+                self.rent + paid * (kind == _RENT),
+                self.tax + paid * (kind == _TAX),
+                self.cards - paid * (kind == _CARDS))
+
+    def enjail(self):
+        return _Path(10, self.balance, self.capital, self.bankrupt, True, self.drawn,
+                self.salary, self.rent, self.tax, self.cards)
+
+    def draw(self, card):
+        return _Path(self.position, self.balance, self.capital, self.bankrupt, self.jailed,
+                self.drawn + (card,), self.salary, self.rent, self.tax, self.cards)
+
+
+class _Turn():
+    """Every way the next turn of a player can go, on the board as it is."""
+    def __init__(self, board, player):
+        self.board = board
+        self.player = player
+        self.decks = {deck:getattr(board, deck) for deck in ('chance', 'community')}
+        self.remaining = {deck:cards.remaining() for deck, cards in self.decks.items()}
+        # rent due on every field, or the multiple of the roll on utilities
+        self.rents = dict()
+        for field in board.fields.values():
+            if field.category in {'station', 'utility', 'estate'} and field.owner is not None \
+                    and field.owner is not player and not field.mortgaged:
+                self.rents[field.position] = field.current_rent() if field.category == 'estate' \
+                        else field.current_rent(1)
+        self.birthday = sum(min(10, max(liquidity(other), 0)) for other in board.players
+                if other is not player and not other.bankrupt)
+        self.repairs = 25 * player.count_owned_houses() + 100 * player.count_owned_hotels()
+        self.repairsexp = 40 * player.count_owned_houses() + 115 * player.count_owned_hotels()
+
+    def _land(self, path, moved) -> list:
+        field = self.board.fields[path.position]
+        if field.category == 'tax':
+            return [(1, path.pay(200 if field.name == 'Income Tax' else 100, _TAX))]
+        if field.category == 'gojail':
+            return [(1, path.enjail())]
+        if field.category in {'station', 'utility', 'estate'}:
+            if path.position not in self.rents:
+                return [(1, path)]
+            rent = self.rents[path.position]
+            if field.category == 'utility':
+                rent = rent * abs(moved) if isinstance(moved, int) else 0
+            return [(1, path.pay(rent, _RENT))]
+        if field.category in {'chance', 'community'}:
+            return self._draw(path, field.category)
+        return [(1, path)]
+
+    def _advance(self, path, steps:int) -> list:
+        position = (path.position + steps) % 40
+        return self._land(path.move(position, position < path.position), steps)
+
+    def _remaining(self, path, name:str) -> list:
+        deck = self.decks[name]
+        cards = [card for card in self.remaining[name]
+                if not any(card is drawn for drawn in path.drawn)]
+        if cards or deck.rule == 'discard':
+            return cards
+        # the deck went round within this turn
+        return [card for card in deck.cards
+                if not any(card is held for held in deck.held)
+                and not (card.category == 'jailout' and any(card is drawn for drawn in path.drawn))]
+
+    def _draw(self, path, deck:str) -> list:
+        cards = self._remaining(path, deck)
+        if not cards:
+            return [(1, path)]
+        outcomes = []
+        for card in cards:
+            for probability, end in self._card(path.draw(card), card):
+                outcomes.append((probability / len(cards), end))
+        return outcomes
+
+    def _card(self, path, card) -> list:
+        # mirrors Card.evaluate
+        if card.category == 'advance':
+            position = FIELD_POSITION[card.advance]
+            return self._land(path.move(position, position < path.position), card.advance)
+        if card.category == 'retreat':
+            if isinstance(card.advance, int):
+                position = (path.position + card.advance) % 40
+            else:
+                position = FIELD_POSITION[card.advance]
+            return self._land(path.move(position), 0)
+        if card.category == 'capital':
+            if card.capital > 0:
+                return [(1, path.receive(card.capital))]
+            return [(1, path.pay(-card.capital, _CARDS))]
+        if card.category == 'jail':
+            return [(1, path.enjail())]
+        if card.category == 'jailout':
+            return [(1, path)]
+        if card.name == 'birthday':
+            return [(1, path.receive(self.birthday))]
+        if card.name == 'takechance':
+            if path.capital < 10 or 'chance' in self.player.strategies:
+                return self._draw(path, 'chance')
+            return [(1, path.pay(10, _CARDS))]
+        return [(1, path.pay(self.repairs if card.name == 'repairs' else self.repairsexp, _CARDS))]
+
+    def _ends(self) -> list:
+        # mirrors game.turn
+        player = self.player
+        start = _Path(player.position, liquidity(player), player.capital)
+        if player.jailed:
+            if not player.jailoutcards and player.jailouttries >= player.jailtries:
+                return [(1, start.pay(_JAIL_FINE, _TAX))]
+            # rolling for doubles moves nobody
+            return [(1, start)]
+        ends = []
+        for total, doubles, first in _ROLLS:
+            for probability, path in self._advance(start, total):
+                if not doubles or path.jailed or path.bankrupt:
+                    ends.append((first * probability, path))
+                    continue
+                for total_, doubles_, second in _ROLLS:
+                    for probability_, end in self._advance(path, total_):
+                        ends.append((first * probability * second * probability_,
+                            end.enjail() if doubles_ else end))
+        return ends
+
+    def expectation(self) -> CashFlow:
+        """Sum the cash flows over every way the turn can go."""
+        flow = CashFlow()
+        for probability, end in self._ends():
+            flow.salary += probability * end.salary
+            flow.rent += probability * end.rent
+            flow.tax += probability * end.tax
+            flow.cards += probability * end.cards
+            flow.bankruptcy += probability * end.bankrupt
+        return flow
+
+
+def next_turn(board, player) -> CashFlow:
+    """Exact expected cash flow of the next turn of a player.
+
+    Every roll of the dice, including the second roll after doubles, and every
+    card that might still be drawn is weighed by its probability. Estates
+    change hands only by decisions, so the board is taken as it is before
+    the player develops, buys or sells anything.
+    """
+    return _Turn(board, player).expectation()
@@ -0,0 +1,254 @@
+"""
+Evolution of strategy parameters.
+"""
+
+import json
+import logging as log
+import os
+import random
+from multiprocessing import Pool
+
+from mono import shared
+from mono.game import run_game
+from mono.player import _NAIVE_CLR, _SAFENET, _STRAT_VAL, _STRAT_BUY
+
+_CONFIG = {'start_capital' : 1500, 'houses' : 32, 'hotels' : 12}
+_SAFENET_STEP = 64
+
+
+class Genome():
+    """Parameters of a single strategy."""
+    def __init__(
+            self,
+            valuation:str = None,
+            buy:str = 'buyall',
+            chance:bool = False,
+            safenet:int = _SAFENET,
+            colours:tuple = tuple(_NAIVE_CLR),
+            jailtries:int = 3,
+            ):
+        self.valuation = valuation
+        self.buy = buy
+        self.chance = chance
+        self.safenet = safenet
+        self.colours = tuple(colours)
+        self.jailtries = jailtries
+
+    def key(self) -> tuple:
+        """Everything that determines how the strategy plays."""
+        return (self.valuation, self.buy, self.chance, self.safenet, self.colours, self.jailtries)
+
+    def __eq__(self, other):
+        return self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def __repr__(self):
+        return (f'{self.valuation}/{self.buy}/{"chance" if self.chance else "fine"} '
+                f'safenet {self.safenet}, {self.jailtries} jail tries, {" > ".join(self.colours)}')
+
+    def strategies(self) -> set:
+        """Strategies of a player following this genome."""
+        return {self.valuation, self.buy, 'chance' if self.chance else None}
+
+    def options(self) -> dict:
+        """Options of a player following this genome."""
+        return {'safenet' : self.safenet, 'jailtries' : self.jailtries, 'colours' : list(self.colours)}
+
+    def as_dict(self) -> dict:
+        """Genome in a form that can be saved as json."""
+        return dict(zip(('valuation', 'buy', 'chance', 'safenet', 'colours', 'jailtries'), self.key()))
+
+
+def random_genome(rng) -> Genome:
+    """Draw a genome uniformly."""
+    colours = list(_NAIVE_CLR)
+    rng.shuffle(colours)
+    return Genome(
+            valuation = rng.choice(_STRAT_VAL),
+            buy = rng.choice(_STRAT_BUY),
+            chance = rng.random() < 0.5,
+            safenet = rng.randrange(0, 2 * _SAFENET, _SAFENET_STEP // 2),
+            colours = colours,
+            jailtries = rng.randint(0, 3),
+            )
+
+def crossover(first:Genome, second:Genome, rng) -> Genome:
+    """Mix two genomes, taking every gene from either parent."""
+    genes = [rng.choice(pair) for pair in zip(first.key(), second.key())]
+    return Genome(*genes)
+
+def mutate(genome:Genome, rng, rate:float = 0.2) -> Genome:
+    """Perturb some of the genes."""
+    valuation, buy, chance, safenet, colours, jailtries = genome.key()
+    colours = list(colours)
+    if rng.random() < rate:
+        valuation = rng.choice(_STRAT_VAL)
+    if rng.random() < rate:
+        buy = rng.choice(_STRAT_BUY)
+    if rng.random() < rate:
+        chance = not chance
+    if rng.random() < rate:
+        safenet = max(0, safenet + rng.choice((-1, 1)) * _SAFENET_STEP)
+    if rng.random() < rate:
+        first, second = rng.sample(range(len(colours)), 2)
+        colours[first], colours[second] = colours[second], colours[first]
+    if rng.random() < rate:
+        jailtries = min(3, max(0, jailtries + rng.choice((-1, 1))))
+    return Genome(valuation, buy, chance, safenet, colours, jailtries)
+
+
+# fitness
+
+def play_seed(genome:Genome, seed:int, num_players:int = 4, config:dict = None) -> int:
+    """Play the genome against random opponents on a seed, returning 1 for a win.
+
+    The seed fixes the opponents, the seat of the genome and the dice,
+    so every genome faces exactly the same games.
+    """
+    opponents = random.Random(seed)
+    seat = seed % num_players
+    strategies = []
+    options = []
+    for j in range(num_players):
+        if j == seat:
+            strategies.append(genome.strategies())
+            options.append(genome.options())
+        else:
+            strategies.append({opponents.choice(group) for group in (_STRAT_VAL, _STRAT_BUY, (None,))})
+            options.append(dict())
+    board = run_game(strategies = strategies, options = options, seed = seed,
+            **dict(_CONFIG, **(config or dict())))
+    return int(board.winner is board.seats[seat])
+
+def _play_chunk(args) -> (int, int):
+    index, genome, seeds, num_players, config = args
+    return index, sum(play_seed(genome, seed, num_players, config) for seed in seeds)
+
+
+class Evolution():
+    """Population of genomes improved generation by generation."""
+    def __init__(
+            self,
+            population:int = 24,
+            games:int = 1296,
+            num_players:int = 4,
+            elite:int = 4,
+            seed:int = 0,
+            config:dict = None,
+            ):
+        self.rng = random.Random(seed)
+        self.size = population
+        self.games = games
+        self.num_players = num_players
+        self.elite = elite
+        self.config = config or dict()
+        self.generation = 0
+        self.population = [Genome(valuation = valuation, buy = buy)
+                for valuation in _STRAT_VAL for buy in _STRAT_BUY][:population]
+        while len(self.population) < population:
+            self.population.append(random_genome(self.rng))
+        self.fitness = dict()
+
+    def _unevaluated(self) -> list:
+        return list(dict.fromkeys(genome for genome in self.population
+            if genome.key() not in self.fitness))
+
+    def evaluate(self, workers:int = None, chunk:int = 72):
+        """Play the games of every genome not evaluated before."""
+        genomes = self._unevaluated()
+        if not genomes:
+            return
+        seeds = range(self.games)
+        jobs = [(index, genome, seeds[start:start + chunk], self.num_players, self.config)
+                for index, genome in enumerate(genomes)
+                for start in range(0, self.games, chunk)]
+        wins = [0] * len(genomes)
+        if workers:
+            with shared.publish() as tables, \
+                    Pool(workers, initializer = shared.attach, initargs = (tables.spec,)) as pool:
+                for index, won in pool.imap_unordered(_play_chunk, jobs):
+                    wins[index] += won
+        else:
+            for index, won in map(_play_chunk, jobs):
+                wins[index] += won
+        for genome, won in zip(genomes, wins):
+            self.fitness[genome.key()] = won / self.games
+        log.info('Evaluated %d genomes in %d games.', len(genomes), len(genomes) * self.games)
+
+    def ranked(self) -> list:
+        """Evaluated genomes of the population, fittest first."""
+        return sorted(dict.fromkeys(self.population),
+                key = lambda genome: self.fitness[genome.key()], reverse = True)
+
+    def _select(self, ranked:list) -> Genome:
+        # tournament of two
+        if len(ranked) < 2:
+            return ranked[0]
+        first, second = self.rng.sample(ranked, 2)
+        return first if self.fitness[first.key()] >= self.fitness[second.key()] else second
+
+    def step(self, workers:int = None):
+        """Evaluate the population and breed the next generation."""
+        self.evaluate(workers)
+        ranked = self.ranked()
+        offspring = ranked[:self.elite]
+        while len(offspring) < self.size:
+            child = crossover(self._select(ranked), self._select(ranked), self.rng)
+            offspring.append(mutate(child, self.rng))
+        self.population = offspring
+        self.generation += 1
+        best = ranked[0]
+        log.info('Generation %d best %.4f: %s', self.generation, self.fitness[best.key()], best)
+
+    # checkpoints
+
+    def save(self, directory:str):
+        """Save the current generation atomically."""
+        os.makedirs(directory, exist_ok = True)
+        path = os.path.join(directory, f'generation-{self.generation:04d}.json')
+        content = {
+                'generation' : self.generation,
+                'rng' : self.rng.getstate(),
+                'population' : [genome.as_dict() for genome in self.population],
+                'fitness' : [[key, value] for key, value in self.fitness.items()],
+                }
+        with open(f'{path}.tmp', 'w') as handle:
+            json.dump(content, handle)
+        os.replace(f'{path}.tmp', path)
+
+    def load(self, directory:str) -> bool:
+        """Continue from the latest saved generation, if there is one."""
+        try:
+            latest = max(name for name in os.listdir(directory)
+                    if name.startswith('generation-') and name.endswith('.json'))
+        except (FileNotFoundError, ValueError):
+            return False
+        with open(os.path.join(directory, latest)) as handle:
+            content = json.load(handle)
+        self.generation = content['generation']
+        state = content['rng']
+        self.rng.setstate((state[0], tuple(state[1]), state[2]))
+        self.population = [Genome(**genes) for genes in content['population']]
+        self.fitness = {Genome(*genes).key():value for genes, value in content['fitness']}
+        log.info('Resuming from generation %d.', self.generation)
+        return True
+
+
+def evolve(
+        generations:int = 12,
+        workers:int = None,
+        checkpoint:str = None,
+        **kwds,
+        ) -> Evolution:
+    """Evolve strategy parameters, resuming from the checkpoint directory."""
+    evolution = Evolution(**kwds)
+    if checkpoint is not None:
+        evolution.load(checkpoint)
+    while evolution.generation < generations:
+        evolution.step(workers)
+        if checkpoint is not None:
+            evolution.save(checkpoint)
+    evolution.evaluate(workers)
+    return evolution
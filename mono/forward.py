@@ -0,0 +1,431 @@
+"""
+Fast-forward of decision-free late-game phases.
+"""
+
+import logging as log
+import math
+
+import numpy as np
+
+from mono.board import FIELD_POSITION
+from mono.cashflow import _ROLLS
+
+_BUYABLE = {'station', 'utility', 'estate'}
+_BUYING = {'buyall', 'safenet'}
+_JAIL_FINE = 50
+_SALARY = 200
+# laps drawn at a time while looking for the end of a jump
+_BLOCK = 64
+
+
+def _summed(index:np.ndarray, values:np.ndarray, size:int) -> np.ndarray:
+    # values summed by their index, into rows of an array of the given size
+    summed = np.zeros((size,) + values.shape[1:])
+    if len(index):
+        order = np.argsort(index, kind = 'stable')
+        index = index[order]
+        unique, first = np.unique(index, return_index = True)
+        summed[unique] = np.add.reduceat(values[order], first, axis = 0)
+    return summed
+
+def _colour(field) -> str:
+    return field.colour if field.category == 'estate' else field.category
+
+def quiescent(board) -> bool:
+    """Whether no player has any decision left on the board as it is.
+
+    Every field is owned, or left to players who never buy, nothing is
+    mortgaged that its owner would buy back, and nobody can build on a full
+    set, since the bank ran out of houses or every estate has a hotel. By the
+    discard rule the decks must have run out as well. A bankrupt player must
+    have left the game first, and nobody may hold both Get Out of Jail cards,
+    which the chains only know as held or not.
+    """
+    players = board.players
+    if len(players) < 2 or any(player.bankrupt or len(player.jailoutcards) > 1 for player in players):
+        return False
+    buyers = any(_BUYING & player.strategies for player in players)
+    for field in board.fields.values():
+        if field.category not in _BUYABLE:
+            continue
+        if field.owner is None:
+            if buyers:
+                return False
+        elif field.mortgaged and _colour(field) in field.owner.colour_priorities:
+            return False
+    for player in players:
+        for colour in player.colour_priorities:
+            if colour in {'station', 'utility'} or not player.can_develop(colour):
+                continue
+            if any(estate.can_be_developed(board) for estate in player.estates
+                    if estate.category == 'estate' and estate.colour == colour):
+                return False
+    return not any(deck.rule == 'discard' and deck.remaining()
+            for deck in (board.chance, board.community))
+
+
+class _Chain():
+    """Turns of a player in a quiescent game, as a Markov chain with rewards.
+
+    States are the forty fields, then jail after every number of tries,
+    and the forty fields again holding a Get Out of Jail card, then jail
+    with the card. Rewards are the money every player in the game gains on
+    the turn, followed by the landings on and the rent paid at every field.
+    """
+    def __init__(self, board, player):
+        self.board = board
+        self.player = player
+        self.players = board.players
+        self.me = self.players.index(player)
+        self.seats = len(self.players)
+        # jail while rolling the dice, and jail holding the card
+        self.jail = 80
+        self.jailcard = 81 + player.jailtries
+        self.states = 82 + player.jailtries
+        self.dims = self.seats + 81
+        self.drew = self.seats + 80
+        # in the long run any card of the deck might be next, whoever holds it now
+        self.decks = {name:list(deck.cards) if deck.rule == 'bottom' else deck.remaining()
+                for name, deck in (('chance', board.chance), ('community', board.community))}
+        # rent due on every field, or the multiple of the roll on utilities
+        self.rents = dict()
+        for field in board.fields.values():
+            if field.category in _BUYABLE and field.owner is not None \
+                    and field.owner is not player and not field.mortgaged:
+                self.rents[field.position] = (self.players.index(field.owner),
+                        field.current_rent() if field.category == 'estate' else field.current_rent(1))
+        self.repairs = 25 * player.count_owned_houses() + 100 * player.count_owned_hotels()
+        self.repairsexp = 40 * player.count_owned_houses() + 115 * player.count_owned_hotels()
+        self._landings = dict()
+        self._tables()
+
+    # a single roll, mirroring Player.advance and Card.evaluate
+
+    def _land(self, position:int, moved) -> list:
+        key = (position, moved) if self.board.fields[position].category == 'utility' else position
+        if key not in self._landings:
+            self._landings[key] = self._resolve(position, moved)
+        return self._landings[key]
+
+    def _resolve(self, position:int, moved) -> list:
+        field = self.board.fields[position]
+        landed = ((self.seats + position, 1),)
+        if field.category == 'tax':
+            return [(1, position, landed + ((self.me, -200 if field.name == 'Income Tax' else -100),))]
+        if field.category == 'gojail':
+            return [(1, 40, landed)]
+        if field.category in _BUYABLE and position in self.rents:
+            owner, rent = self.rents[position]
+            if field.category == 'utility':
+                rent = rent * abs(moved) if isinstance(moved, int) else 0
+            return [(1, position, landed + ((self.me, -rent), (owner, rent),
+                (self.seats + 40 + position, rent)))]
+        if field.category in {'chance', 'community'}:
+            return [(probability, end, landed + rewards)
+                    for probability, end, rewards in self._draw(position, field.category)]
+        return [(1, position, landed)]
+
+    def _draw(self, position:int, deck:str) -> list:
+        cards = self.decks[deck]
+        if not cards:
+            return [(1, position, ())]
+        return [(probability / len(cards), end, rewards)
+                for card in cards for probability, end, rewards in self._card(position, card)]
+
+    def _card(self, position:int, card) -> list:
+        if card.category == 'advance':
+            target = FIELD_POSITION[card.advance]
+            salary = ((self.me, _SALARY),) if target < position else ()
+            return [(probability, end, salary + rewards)
+                    for probability, end, rewards in self._land(target, card.advance)]
+        if card.category == 'retreat':
+            if isinstance(card.advance, int):
+                return self._land((position + card.advance) % 40, 0)
+            return self._land(FIELD_POSITION[card.advance], 0)
+        if card.category == 'capital':
+            return [(1, position, ((self.me, card.capital),))]
+        if card.category == 'jail':
+            return [(1, 40, ())]
+        if card.category == 'jailout':
+            return [(1, position, ((self.drew, 1),))]
+        if card.name == 'birthday':
+            return [(1, position, ((self.me, 10 * (self.seats - 1)),)
+                + tuple((other, -10) for other in range(self.seats) if other != self.me))]
+        if card.name == 'takechance':
+            if 'chance' in self.player.strategies:
+                return self._draw(position, 'chance')
+            return [(1, position, ((self.me, -10),))]
+        return [(1, position, ((self.me, -(self.repairs if card.name == 'repairs' else self.repairsexp)),))]
+
+    def _rolls(self):
+        # every way a single roll from every field can go, as arrays, with 40 for jail
+        keys = dict()
+        landings = []
+        for position in range(40):
+            for total, _, _ in _ROLLS:
+                key = (position, total) if self.board.fields[position].category == 'utility' \
+                        else position
+                if key not in keys:
+                    keys[key] = len(keys)
+                    landings.append(self._land(position, total))
+        count = np.array([len(outcomes) for outcomes in landings])
+        offset = np.cumsum(count) - count
+        flat = [outcome for outcomes in landings for outcome in outcomes]
+        chance = np.array([probability for probability, _, _ in flat])
+        landed = np.array([end for _, end, _ in flat])
+        rewards = np.zeros((len(flat), self.dims))
+        for row, (_, _, pairs) in enumerate(flat):
+            for column, value in pairs:
+                rewards[row, column] += value
+        totals = np.array([total for total, _, _ in _ROLLS])
+        positions = np.arange(40)[:, None]
+        targets = (positions + totals) % 40
+        key = np.array([[keys[(target, total) if (target, total) in keys else target]
+            for target, total in zip(row, totals)] for row in targets])
+        # one row for every roll from every field and every way its landing goes
+        combos = np.repeat(np.arange(key.size), count[key.ravel()])
+        rows = np.repeat(offset[key.ravel()] - np.cumsum(count[key.ravel()]) + count[key.ravel()],
+                count[key.ravel()]) + np.arange(len(combos))
+        starts = combos // len(totals)
+        rolled = combos % len(totals)
+        ends = landed[rows]
+        probabilities = np.array([first for _, _, first in _ROLLS])[rolled] * chance[rows]
+        doubles = np.array([double for _, double, _ in _ROLLS])[rolled] & (ends != 40)
+        rewards = rewards[rows]
+        rewards[:, self.me] += _SALARY * (targets.ravel()[combos] < starts)
+        return starts, ends, doubles, probabilities, rewards
+
+    # whole turns, mirroring game.turn and Player.try_jailout
+
+    def _tables(self):
+        n, S = self.seats, self.states
+        starts, ends, doubles, probabilities, rewards = self._rolls()
+        weighted = probabilities[:, None] * rewards
+        cash = weighted[:, :n]
+        squared = (cash[:, :, None] * rewards[:, None, :n]).reshape(-1, n * n)
+        drew = rewards[:, self.drew] > 0
+        key = ((starts * 41 + ends) * 2 + drew) * 2 + doubles
+        chances = _summed(key, probabilities, 40 * 41 * 4).reshape(40, 41, 2, 2)
+        gains = _summed(key, cash, 40 * 41 * 4).reshape(40, 41, 2, 2, n)
+        # the same from every field holding the card, which a roll might also draw
+        Q = np.tile(_summed(starts, squared, 40).reshape(40, n, n), (2, 1, 1))
+        W = np.tile(_summed(starts, weighted, 40), (2, 1))
+        # a roll ending the turn, and one of doubles rolling again
+        P1 = np.zeros((80, S))
+        M1 = np.zeros((80, S, n))
+        C = np.zeros((80, 80))
+        Mc = np.zeros((80, 80, n))
+        for holding in (0, 1):
+            for drawn in (0, 1):
+                rows = slice(40 * holding, 40 * holding + 40)
+                fields = np.arange(40) + 40 * (holding or drawn)
+                jail = self.jailcard if holding or drawn else self.jail
+                P1[rows, fields] += chances[:, :40, drawn, 0]
+                P1[rows, jail] += chances[:, 40, drawn].sum(axis = 1)
+                M1[rows, fields] += gains[:, :40, drawn, 0]
+                M1[rows, jail] += gains[:, 40, drawn].sum(axis = 1)
+                C[rows, fields] += chances[:, :40, drawn, 1]
+                Mc[rows, fields] += gains[:, :40, drawn, 1]
+        # the second roll, where doubles again lead to jail
+        P2 = P1.copy()
+        P2[:, self.jail] += C[:, :40].sum(axis = 1)
+        P2[:, self.jailcard] += C[:, 40:].sum(axis = 1)
+        M2 = M1.copy()
+        M2[:, self.jail] += Mc[:, :40].sum(axis = 1)
+        M2[:, self.jailcard] += Mc[:, 40:].sum(axis = 1)
+        P = np.zeros((S, S))
+        M = np.zeros((S, S, n))
+        R2 = np.zeros((S, n, n))
+        r = np.zeros((S, self.dims))
+        P[:80] = P1 + C @ P2
+        M[:80] = M1 + np.tensordot(Mc, P2, axes = ([1], [0])).transpose(0, 2, 1) \
+                + np.tensordot(C, M2, axes = 1)
+        cross = np.tensordot(Mc, W[:, :n], axes = ([1], [0]))
+        R2[:80] = Q + np.tensordot(C, Q, axes = 1) + cross + cross.transpose(0, 2, 1)
+        r[:80] = W + C @ W
+        # jail, rolling for doubles until the tries run out and the fine is due
+        for tries in range(self.player.jailtries):
+            P[self.jail + tries, 10] = 1 / 6
+            P[self.jail + tries, self.jail + tries + 1] = 5 / 6
+        fine = self.jailcard - 1
+        P[fine, 10] = 1
+        M[fine, 10, self.me] = -_JAIL_FINE
+        R2[fine, self.me, self.me] = _JAIL_FINE ** 2
+        r[fine, self.me] = -_JAIL_FINE
+        # or out at once with the card
+        P[self.jailcard, 10] = 1
+        self.P = P
+        self._moments(P, M, R2, r)
+        # the worst a single turn of the player can do to their capital
+        self.worst = 2 * max(-rewards[:, self.me].min(), 0) + _JAIL_FINE
+
+    def _moments(self, P:np.ndarray, M:np.ndarray, R2:np.ndarray, r:np.ndarray):
+        n, S = self.seats, self.states
+        A = P.T - np.eye(S)
+        A[-1] = 1
+        b = np.zeros(S)
+        b[-1] = 1
+        pi = np.linalg.solve(A, b)
+        self.mean = pi @ r
+        # solution of the Poisson equation, the lasting effect of the state
+        self.bias = np.linalg.solve(np.eye(S) - P + pi[None, :], r - self.mean)
+        g = self.bias[:, :n]
+        # asymptotic covariance per turn, by the martingale decomposition
+        a = -g - self.mean[:n]
+        Mg = np.tensordot(M, g, axes = ([1], [0]))
+        first = r[:, :n] + P @ g
+        conditional = R2 + Mg + Mg.transpose(0, 2, 1) \
+                + np.tensordot(P, g[:, :, None] * g[:, None, :], axes = 1) \
+                + first[:, :, None] * a[:, None, :] + a[:, :, None] * first[:, None, :] \
+                + a[:, :, None] * a[:, None, :]
+        self.covariance = np.tensordot(pi, conditional, axes = 1)
+
+    def state(self) -> int:
+        """State of the player now."""
+        if self.player.jailed:
+            if self.player.jailoutcards:
+                return self.jailcard
+            return self.jail + min(self.player.jailouttries, self.player.jailtries)
+        return self.player.position + 40 * bool(self.player.jailoutcards)
+
+    def ahead(self, laps:int) -> (np.ndarray, np.ndarray):
+        """Distribution of the state after some turns, and the expected rewards of those turns."""
+        start = self.state()
+        row = np.linalg.matrix_power(self.P, laps)[start]
+        return row, laps * self.mean + self.bias[start] - row @ self.bias
+
+
+class FastForward():
+    """Skip decision-free stretches of a game in bulk.
+
+    Once the game is quiescent, the turns of every player make a Markov
+    chain of positions with money changing hands on the way. Its long run
+    mean and covariance per lap drive a random walk of the money of every
+    player, lap after lap, while the fields visited and the rent paid are
+    added as expected. Every player has a floor, the most a single turn
+    can cost them plus ten for every player at the table. Jumps start only
+    while everybody holds more than their floor, and end with the first lap
+    leaving anybody below it, from where the game is played turn by turn
+    again. No lap of the walk loses more than the floor, so it never leaves
+    anybody insolvent, and money lost is paid as in play. Cards are drawn
+    as if from a shuffled deck, and Get Out of Jail cards as if nobody else
+    held them.
+    """
+    def __init__(self, board):
+        self.board = board
+        self.jumps = 0
+        self.skipped = 0
+        self._key = None
+        self._chains = None
+
+    def _signature(self) -> tuple:
+        board = self.board
+        return (tuple(id(player) for player in board.players),
+                tuple((id(field.owner), getattr(field, 'development', 0), field.mortgaged)
+                    for field in board.fields.values() if field.category in _BUYABLE))
+
+    def chains(self) -> list:
+        """Chains of every player in the game, rebuilt whenever the board changed."""
+        key = self._signature()
+        if key != self._key:
+            self._key = key
+            self._chains = [_Chain(self.board, player) for player in self.board.players]
+            self._mean = sum(chain.mean[:chain.seats] for chain in self._chains)
+            values, vectors = np.linalg.eigh(sum(chain.covariance for chain in self._chains))
+            self._spread = vectors * np.sqrt(np.clip(values, 0, None))
+            # below this after a lap, a player might have to sell during the next one
+            self._floor = np.array([chain.worst for chain in self._chains]) + 10 * len(self._chains)
+        return self._chains
+
+    def _walk(self, capital:np.ndarray, laps:int) -> (int, np.ndarray):
+        # laps up to the first one ending below the floor, and the change of money over them
+        start = capital
+        rng = np.random.default_rng(self.board.rng.getrandbits(64))
+        walked = 0
+        while walked < laps:
+            block = min(_BLOCK, laps - walked)
+            steps = self._mean + rng.standard_normal((block, len(capital))) @ self._spread.T
+            # no lap loses more than the floor, which leaves everybody above it solvent
+            steps = np.maximum(steps, -self._floor)
+            path = capital + np.cumsum(steps, axis = 0)
+            low = np.flatnonzero((path < self._floor).any(axis = 1))
+            if len(low):
+                walked += int(low[0]) + 1
+                capital = path[low[0]]
+                break
+            walked += block
+            capital = path[-1]
+        return walked, capital - start - walked * self._mean
+
+    def jump(self, laps:int) -> int:
+        """Skip up to a number of laps if nothing happens in them, return how many were skipped."""
+        board = self.board
+        if laps < 1 or not quiescent(board):
+            return 0
+        chains = self.chains()
+        capital = np.array([player.capital for player in board.players], dtype = float)
+        if (capital < self._floor).any():
+            return 0
+        length, noise = self._walk(capital, laps)
+        n = len(chains)
+        expected = np.zeros(chains[0].dims)
+        ends = []
+        for chain in chains:
+            row, rewards = chain.ahead(length)
+            expected += rewards
+            ends.append(row)
+        for player, change in zip(board.players, expected[:n] + noise):
+            change = int(round(change))
+            if change < 0:
+                # anybody short sells or goes bankrupt, as they would in play
+                player.pay(-change, board)
+            else:
+                player.capital += change
+        for position in range(40):
+            visits = self._rounded(expected[n + position])
+            if visits:
+                board.log_position(position, visits)
+            rent = self._rounded(expected[n + 40 + position])
+            if rent:
+                board.log_rent(position, rent)
+        for player, chain, row in zip(board.players, chains, ends):
+            self._place(player, chain, row)
+        board.turns += length * n
+        board.laps += length
+        self.jumps += 1
+        self.skipped += length
+        log.info('Fast-forward of %d laps to lap %d.', length, board.laps)
+        return length
+
+    def _rounded(self, value:float) -> int:
+        # up or down at random, right on average
+        whole = math.floor(value)
+        return whole + (self.board.rng.random() < value - whole)
+
+    def _place(self, player, chain:_Chain, row:np.ndarray):
+        state = int(np.searchsorted(np.cumsum(row), self.board.rng.random() * row.sum(), side = 'right'))
+        state = min(state, chain.states - 1)
+        if state < 80:
+            player._place(state % 40, self.board)
+            player._jail(False, self.board)
+            player.jailouttries = 0
+        else:
+            player._place(10, self.board)
+            player._jail(True, self.board)
+            player.jailouttries = state - chain.jail if state < chain.jailcard else 0
+        self._hold(player, 40 <= state < 80 or state == chain.jailcard)
+
+    def _hold(self, player, holding:bool):
+        # hand a Get Out of Jail card nobody holds to the player, or take theirs back
+        board = self.board
+        if player.jailoutcards and not holding:
+            for card in player.jailoutcards:
+                board.give_back(card)
+            player.jailoutcards = []
+        elif holding and not player.jailoutcards:
+            for deck in (board.chance, board.community):
+                for card in deck.cards:
+                    if card.category == 'jailout' and not any(card is held for held in deck.held):
+                        deck.held.append(card)
+                        player.jailoutcards.append(card)
+                        return
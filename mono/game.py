@@ -3,32 +3,41 @@ Game handling.
 """
 
 import logging as log
+from random import Random
 
 from mono.dice import roll
 from mono.board import prepare_board
 from mono.player import numstring, initialise_player
+from mono.zobrist import full_hash
+
+_MAX_LAPS = 1296
 
 
 def turn(board, player):
     """Simulate a single player's turn."""
     log.info('Beginning turn of player %s.', player.name)
+    board.turns += 1
     if player.jailed:
         player.try_jailout(board)
     else:
         player.consider_developing(board)
-        diceroll, doubles = roll()
+        diceroll, doubles = roll(board.rng)
         player.advance(diceroll, board)
         if doubles and not player.jailed and not player.bankrupt:
-            diceroll, doubles = roll()
+            diceroll, doubles = roll(board.rng)
             player.advance(diceroll, board)
             if doubles:
-                player.enjail()
+                player.enjail(board)
 
 def lap(board):
     """Simulate a single round of play."""
     log.info('Beginning round %d.', board.laps)
     for player in board.players:
         turn(board, player)
+    return end_lap(board)
+
+def end_lap(board):
+    """Eliminate bankrupt players at the end of a round."""
     board.discard_players()
     if len(board.players) == 1:
         return board.players[0]
@@ -36,6 +45,28 @@ def lap(board):
     return None
 
 
+def finish_game(board, on_lap = None, fast_forward:bool = False):
+    """Play a prepared game until somebody wins or the laps run out.
+
+    With fast_forward, stretches of the game where nobody has a decision
+    left are skipped in bulk, see mono.forward, and on_lap is called once
+    after every such jump.
+    """
+    forward = None
+    if fast_forward:
+        # numpy is only needed when fast-forwarding
+        from mono.forward import FastForward
+        forward = FastForward(board)
+    winner = None
+    while winner is None and board.laps < _MAX_LAPS:
+        if forward is None or not forward.jump(_MAX_LAPS - board.laps):
+            winner = lap(board)
+        if on_lap is not None:
+            on_lap(board)
+    board.winner = winner
+    return winner
+
+
 def announce_winner(winner, board):
     """Declare the winner of the game."""
     if winner:
@@ -45,17 +76,81 @@ def announce_winner(winner, board):
     log.info('Game ended after %d laps.', board.laps)
     board.log_visitations()
 
-def run_game(num_players:int = 1, start_capital:int = 1, houses:int = 0, hotels:int = 0):
-    """Prepare game and run loop."""
+def prepare_game(
+        num_players:int = 1,
+        start_capital:int = 1,
+        houses:int = 0,
+        hotels:int = 0,
+        strategies:list = None,
+        seed:int = None,
+        options:list = None,
+        deck_rule:str = 'bottom',
+        ):
+    """Prepare board and seat the players."""
+    if strategies is not None:
+        num_players = len(strategies)
     log.info('Initialising game on %d players.',num_players)
-    board = prepare_board(houses, hotels)
+    board = prepare_board(houses, hotels, deck_rule, Random(seed))
     board.players = [initialise_player(
         name = f'player-{numstring(j)}',
         capital = start_capital,
         board = board,
+        strategies = None if strategies is None else strategies[j],
+        seat = j,
+        **(dict() if options is None else options[j]),
         ) for j in range(num_players)]
-    winner = None
-    while winner is None and board.laps < 1296:
-        winner = lap(board)
+    board.seats = list(board.players)
+    board.zobrist = full_hash(board)
+    return board
+
+def run_game(
+        num_players:int = 1,
+        start_capital:int = 1,
+        houses:int = 0,
+        hotels:int = 0,
+        strategies:list = None,
+        seed:int = None,
+        options:list = None,
+        deck_rule:str = 'bottom',
+        trajectory:bool = False,
+        on_lap = None,
+        fast_forward:bool = False,
+        ):
+    """Prepare game and run loop.
+
+    Strategies can be given for every seat, otherwise they are chosen randomly.
+    Options for every seat tune their strategies, see Player.
+    Drawn cards go back under the deck, or with the discard deck rule never
+    come back.
+    Games with the same seed roll the same dice and draw from identically
+    shuffled decks, whatever the strategies of the players. The dice and decks
+    of every game draw from a generator of its own, so games can be played
+    side by side in threads.
+    With trajectory, the capital, net worth, estates and houses of every seat
+    at the end of each lap are kept in `board.trajectory`, and on_lap is
+    called with the board at the end of each lap.
+    With fast_forward, decision-free late stretches of the game are skipped
+    in bulk, which keeps the outcomes alike in distribution but not game
+    by game, so it cannot be combined with a trajectory.
+    """
+    if trajectory and fast_forward:
+        raise ValueError('Trajectories are recorded lap by lap, without fast-forward.')
+    board = prepare_game(num_players, start_capital, houses, hotels, strategies, seed, options, deck_rule)
+    num_players = len(board.seats)
+    record = None
+    if trajectory:
+        # numpy is only needed when recording
+        from mono.trajectory import Trajectory
+        record = Trajectory(num_players, _MAX_LAPS)
+
+    def recorded(board):
+        if record is not None:
+            record.record(board.seats)
+        if on_lap is not None:
+            on_lap(board)
+
+    winner = finish_game(board, recorded, fast_forward)
+    if record is not None:
+        board.trajectory = record.values()
     announce_winner(winner, board)
     return board
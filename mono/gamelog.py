@@ -0,0 +1,183 @@
+"""
+Buffered writing of game logs.
+"""
+
+import gzip
+import logging as log
+import os
+import threading
+from collections import deque
+
+_GAME_LOG = 'bounce/game.log'
+_QUEUE_SIZE = 65536
+_BATCH = 4096
+_COMPRESSLEVEL = 1
+_FULL = ('block', 'drop', 'oldest')
+# markers passed down the queue in order with the records
+_ROTATE = object()
+_STOP = object()
+
+
+class LogWriter(log.Handler):
+    """Logging handler writing from a background thread.
+
+    The logging thread only puts records on a bounded queue; formatting,
+    compression and writing happen in batches on the writer thread. When
+    the queue is full the logging thread either blocks, drops the new
+    record, or drops the oldest queued one. Records are formatted late, so
+    their arguments should not change after they are logged.
+
+    Logs go to the given path, then on to numbered files beside it once the
+    batch being written would take a file past max_bytes, or after every
+    call to rotate, for example at the end of every game.
+    """
+    def __init__(
+            self,
+            path:str = _GAME_LOG,
+            queue_size:int = _QUEUE_SIZE,
+            full:str = 'block',
+            max_bytes:int = None,
+            compress:bool = True,
+            batch:int = _BATCH,
+            level = log.INFO,
+            ):
+        if full not in _FULL:
+            raise ValueError(f'Unknown policy {full} for a full queue.')
+        super().__init__(level)
+        self.path = path
+        self.full = full
+        self.max_bytes = max_bytes
+        self.compress = compress
+        self.batch = batch
+        self.dropped = 0
+        self.files = []
+        self.queue_size = queue_size
+        # records and markers in order, only records count towards the size
+        self._items = deque()
+        self._records = 0
+        self._ready = threading.Condition()
+        self._file = None
+        self._written = 0
+        self._closed = False
+        self._thread = threading.Thread(target = self._write, name = 'LogWriter', daemon = True)
+        self._thread.start()
+
+    # logging thread
+
+    def _put(self, item):
+        with self._ready:
+            if self._records >= self.queue_size:
+                if self.full == 'block':
+                    while self._records >= self.queue_size:
+                        self._ready.wait()
+                elif self.full == 'drop':
+                    self.dropped += 1
+                    return
+                else:
+                    # markers are never dropped and keep their place
+                    for j, queued in enumerate(self._items):
+                        if queued is not _ROTATE and queued is not _STOP:
+                            del self._items[j]
+                            self._records -= 1
+                            break
+                    self.dropped += 1
+            self._items.append(item)
+            self._records += 1
+            self._ready.notify_all()
+
+    def _mark(self, marker):
+        with self._ready:
+            self._items.append(marker)
+            self._ready.notify_all()
+
+    def emit(self, record):
+        """Queue a record for writing."""
+        self._put(record)
+
+    def rotate(self):
+        """Write the following records to a new file."""
+        self._mark(_ROTATE)
+
+    def close(self):
+        """Write out every queued record and stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._mark(_STOP)
+            self._thread.join()
+        super().close()
+
+    # writer thread
+
+    def _next_name(self) -> str:
+        if not self.files:
+            name = self.path
+        else:
+            root, extension = os.path.splitext(self.path)
+            name = f'{root}.{len(self.files)}{extension}'
+        return f'{name}.gz' if self.compress else name
+
+    def _open(self):
+        name = self._next_name()
+        if self.compress:
+            self._file = gzip.open(name, 'wb', compresslevel = _COMPRESSLEVEL)
+        else:
+            self._file = open(name, 'wb')
+        self.files.append(name)
+        self._written = 0
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _flush(self, lines:list):
+        if not lines:
+            return
+        content = ''.join(lines).encode('utf-8')
+        if self._file is None or self.max_bytes and self._written + len(content) > self.max_bytes \
+                and self._written:
+            self._close_file()
+            self._open()
+        self._file.write(content)
+        self._written += len(content)
+        lines.clear()
+
+    def _format(self, record) -> str:
+        try:
+            return self.format(record) + '\n'
+        except Exception:
+            self.handleError(record)
+            return ''
+
+    def _write(self):
+        lines = []
+        stop = False
+        while not stop:
+            with self._ready:
+                while not self._items:
+                    self._ready.wait()
+                items = [self._items.popleft() for _ in range(min(self.batch, len(self._items)))]
+                self._records -= sum(1 for item in items if item is not _ROTATE and item is not _STOP)
+                self._ready.notify_all()
+            for item in items:
+                if item is _STOP:
+                    stop = True
+                elif item is _ROTATE:
+                    self._flush(lines)
+                    self._close_file()
+                else:
+                    lines.append(self._format(item))
+            if self.dropped and stop:
+                lines.append(f'{self.dropped} log records dropped.\n')
+            self._flush(lines)
+        self._close_file()
+
+
+def install(path:str = _GAME_LOG, fmt:str = '%(message)s', **kwds) -> LogWriter:
+    """Send every log record of the root logger through a LogWriter."""
+    writer = LogWriter(path, **kwds)
+    writer.setFormatter(log.Formatter(fmt))
+    root = log.getLogger()
+    root.addHandler(writer)
+    root.setLevel(writer.level)
+    return writer
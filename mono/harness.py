@@ -0,0 +1,159 @@
+"""
+Differential testing of game engines.
+"""
+
+import logging as log
+from array import array
+from multiprocessing import Pool
+
+from mono import game
+
+_CONFIG = {'start_capital' : 1500, 'houses' : 32, 'hotels' : 12}
+
+
+class Engine():
+    """Reference engine, playing by the rules of mono.game.
+
+    Alternative engines override any of the methods, and are checked against
+    this one on identical dice and decks.
+    """
+    def prepare(self, seed:int, **config):
+        """Prepare the board of a seeded game."""
+        return game.prepare_game(seed = seed, **config)
+
+    def turn(self, board, player):
+        """Simulate a single player's turn."""
+        game.turn(board, player)
+
+    def end_lap(self, board):
+        """Finish a round, returning the winner if there is one."""
+        return game.end_lap(board)
+
+
+def _buyables(board) -> list:
+    return [field for field in board.fields.values() if hasattr(field, 'owner')]
+
+def labels(board) -> tuple:
+    """Names of the entries of the flattened game state."""
+    names = ['laps', 'houses', 'hotels', 'chance', 'community']
+    for player in board.seats:
+        names.extend(f'{player.name}.{key}' for key in
+                ('position', 'capital', 'jailed', 'jailoutcards', 'jailouttries', 'bankrupt'))
+    for field in _buyables(board):
+        names.extend(f'{field.name}.{key}' for key in ('owner', 'mortgaged', 'cost', 'development'))
+    return tuple(names)
+
+def state(board, buyables:list = None) -> tuple:
+    """Everything the rules act upon, grouped into bank, players and estates."""
+    return (
+            (board.laps, board.houses, board.hotels, len(board.chance), len(board.community)),
+            tuple((player.position, player.capital, player.jailed, len(player.jailoutcards),
+                player.jailouttries, player.bankrupt) for player in board.seats),
+            tuple((field.owner and field.owner.name, field.mortgaged, field.cost,
+                getattr(field, 'development', 0)) for field in buyables or _buyables(board)),
+            )
+
+def flatten(state:tuple) -> tuple:
+    """Flatten the game state in the order of labels."""
+    bank, players, fields = state
+    return bank + sum(players, ()) + sum(fields, ())
+
+def _config(seed:int, config:dict) -> dict:
+    config = dict(_CONFIG, **config)
+    if config.get('num_players') is None and config.get('strategies') is None:
+        # cycle through every table size
+        config['num_players'] = 2 + seed % 5
+    return config
+
+def _play(engine, seed:int, config:dict):
+    # yields the board before the first turn and after every turn after
+    board = engine.prepare(seed, **_config(seed, config))
+    yield board, None
+    winner = None
+    while winner is None and board.laps < game._MAX_LAPS:
+        for player in board.players:
+            engine.turn(board, player)
+            yield board, player
+        winner = engine.end_lap(board)
+
+def _digests(engine, seed:int, config:dict) -> array:
+    digests = array('q')
+    buyables = None
+    for board, _ in _play(engine, seed, config):
+        buyables = buyables or _buyables(board)
+        digests.append(hash(state(board, buyables)))
+    return digests
+
+
+class Divergence():
+    """First turn at which a candidate engine leaves the reference."""
+    def __init__(self, seed:int, turn:int, lap:int, player:str, differences:list):
+        self.seed = seed
+        self.turn = turn
+        self.lap = lap
+        self.player = player
+        self.differences = differences
+
+    def __repr__(self):
+        lines = [f'Seed {self.seed} diverges at turn {self.turn} '
+                f'(lap {self.lap}, player {self.player}):']
+        lines.extend(f'  {label} : {reference} != {candidate}'
+                for label, reference, candidate in self.differences)
+        return '\n'.join(lines)
+
+
+def _replay(engine, seed:int, config:dict, turn:int):
+    for count, (board, player) in enumerate(_play(engine, seed, config)):
+        if count == turn:
+            return board, player
+    return board, None
+
+def _describe(reference, candidate, seed:int, config:dict, turn:int) -> Divergence:
+    board_r, player = _replay(reference, seed, config, turn)
+    values_r = dict(zip(labels(board_r), flatten(state(board_r))))
+    board_c, _ = _replay(candidate, seed, config, turn)
+    values_c = dict(zip(labels(board_c), flatten(state(board_c))))
+    differences = [(label, values_r.get(label), values_c.get(label))
+            for label in dict.fromkeys(list(values_r) + list(values_c))
+            if values_r.get(label) != values_c.get(label)]
+    if not differences:
+        differences = [('turns', len(_digests(reference, seed, config)),
+            len(_digests(candidate, seed, config)))]
+    return Divergence(seed, turn, board_r.laps, None if player is None else player.name, differences)
+
+def check_seed(candidate, seed:int, reference = None, **config):
+    """Play a seed on both engines and compare the state after every turn."""
+    reference = reference or Engine()
+    expected = _digests(reference, seed, config)
+    buyables = None
+    turn = -1
+    for turn, (board, _) in enumerate(_play(candidate, seed, config)):
+        buyables = buyables or _buyables(board)
+        if turn >= len(expected) or hash(state(board, buyables)) != expected[turn]:
+            return _describe(reference, candidate, seed, config, turn)
+    if turn + 1 != len(expected):
+        return _describe(reference, candidate, seed, config, turn + 1)
+    return None
+
+def _check_seed(args):
+    candidate, seed, reference, config = args
+    return check_seed(candidate, seed, reference, **config)
+
+def check(candidate, seeds = range(1296), reference = None, workers:int = None, **config):
+    """Find the smallest seed on which the candidate engine diverges.
+
+    Returns None when every seed is played identically.
+    """
+    jobs = ((candidate, seed, reference, config) for seed in seeds)
+    if workers:
+        with Pool(workers) as pool:
+            for divergence in pool.imap(_check_seed, jobs, chunksize = 8):
+                if divergence is not None:
+                    log.warning('%s', divergence)
+                    return divergence
+        return None
+    for divergence in map(_check_seed, jobs):
+        if divergence is not None:
+            log.warning('%s', divergence)
+            return divergence
+    return None
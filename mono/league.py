@@ -0,0 +1,246 @@
+"""
+League of strategies rated by adaptively allocated games.
+"""
+
+import itertools
+import logging as log
+import math
+import os
+from multiprocessing import Pool
+
+from mono import shared
+from mono.batch import _play_rotations
+from mono.player import _STRAT_VAL, _STRAT_BUY, _STRAT_CRD
+
+_CONFIG = {'start_capital' : 1500, 'houses' : 32, 'hotels' : 12}
+# ratings on the usual scale, a fresh entrant at 25 ± 25/3
+_MU = 25.0
+_SIGMA = _MU / 3
+_BETA = _SIGMA / 2
+_KAPPA = 1e-4
+_Z = 1.96
+
+
+def entrants() -> list:
+    """Every combination of a valuation, buying and card strategy."""
+    return list(itertools.product(_STRAT_VAL, _STRAT_BUY, _STRAT_CRD))
+
+def label(entrant:tuple) -> str:
+    """Short name of an entrant."""
+    return '/'.join(str(strategy) for strategy in entrant)
+
+def _phi(x:float) -> float:
+    return 0.5 * math.erfc(-x / math.sqrt(2))
+
+
+class Rating():
+    """Skill of an entrant, a normal belief with mean mu and deviation sigma."""
+    def __init__(self, mu:float = _MU, sigma:float = _SIGMA):
+        self.mu = mu
+        self.sigma = sigma
+        self.games = 0
+
+    @property
+    def lower(self) -> float:
+        """Lower confidence bound of the skill."""
+        return self.mu - _Z * self.sigma
+
+    @property
+    def upper(self) -> float:
+        """Upper confidence bound of the skill."""
+        return self.mu + _Z * self.sigma
+
+    def __repr__(self):
+        return f'{self.mu:.2f} ± {_Z * self.sigma:.2f}'
+
+
+def rate(ratings:list, ranks:list, games:int = 1):
+    """Update the ratings of everyone at a table by their ranks, lower is better.
+
+    Every pair at the table counts as a Bradley-Terry comparison, following
+    the Bayesian approximation of Weng and Lin, as used by OpenSkill. The
+    result counts as so many games played, but is weighed as one.
+    """
+    updates = []
+    for i, mine in enumerate(ratings):
+        omega = 0.0
+        delta = 0.0
+        for q, theirs in enumerate(ratings):
+            if q == i:
+                continue
+            c = math.sqrt(mine.sigma ** 2 + theirs.sigma ** 2 + 2 * _BETA ** 2)
+            p = 1 / (1 + math.exp((theirs.mu - mine.mu) / c))
+            score = 1.0 if ranks[i] < ranks[q] else 0.5 if ranks[i] == ranks[q] else 0.0
+            omega += mine.sigma ** 2 / c * (score - p)
+            delta += mine.sigma / c * mine.sigma ** 2 / c ** 2 * p * (1 - p)
+        updates.append((omega, delta))
+    for rating, (omega, delta) in zip(ratings, updates):
+        rating.mu += omega
+        rating.sigma *= math.sqrt(max(1 - delta, _KAPPA))
+        rating.games += games
+
+
+class League():
+    """Ratings of every entrant on tables of a fixed number of seats.
+
+    Games go to the tables whose entrants are least certainly ordered, and
+    the league is settled once every neighbour in the ranking is either told
+    apart or shown to be within a margin of each other.
+    """
+    def __init__(
+            self,
+            seats:int = 4,
+            lineup:list = None,
+            seed:int = 0,
+            alpha:float = 0.05,
+            margin:float = 2.0,
+            ):
+        self.seats = seats
+        self.entrants = lineup or entrants()
+        self.ratings = [Rating() for _ in self.entrants]
+        self.seed = seed
+        self.alpha = alpha
+        self.margin = margin
+        self.games = 0
+
+    def swap_probability(self, first:int, second:int) -> float:
+        """Probability that two entrants are ranked the wrong way round."""
+        mine, theirs = self.ratings[first], self.ratings[second]
+        spread = math.sqrt(mine.sigma ** 2 + theirs.sigma ** 2)
+        return _phi(-abs(mine.mu - theirs.mu) / spread)
+
+    def _equivalent(self, first:int, second:int) -> bool:
+        mine, theirs = self.ratings[first], self.ratings[second]
+        spread = math.sqrt(mine.sigma ** 2 + theirs.sigma ** 2)
+        return abs(mine.mu - theirs.mu) + _Z * spread < self.margin
+
+    def ranking(self) -> list:
+        """Entrants by their mean skill, best first."""
+        return sorted(range(len(self.entrants)), key = lambda entrant: self.ratings[entrant].mu,
+                reverse = True)
+
+    def unsettled(self) -> list:
+        """Neighbours in the ranking neither told apart nor shown equivalent."""
+        ranking = self.ranking()
+        return [(first, second) for first, second in zip(ranking, ranking[1:])
+                if self.swap_probability(first, second) >= self.alpha
+                and not self._equivalent(first, second)]
+
+    def settled(self) -> bool:
+        """Whether the ranking is settled."""
+        return not self.unsettled()
+
+    def _weight(self, first:int, second:int) -> float:
+        # what a game between them might still teach
+        swap = self.swap_probability(first, second)
+        if swap < self.alpha or self._equivalent(first, second):
+            return 0.0
+        return swap
+
+    def allocate(self, tables:int) -> list:
+        """Pick the tables of the next batch, each a tuple of entrants.
+
+        Every table is seated around the least certain of the unsettled
+        neighbours in the ranking, joined by the entrants least certainly
+        ordered against those already seated. Pairs already seated together
+        in the batch count for half as much each time.
+        """
+        count = len(self.entrants)
+        weights = {(first, second):self._weight(first, second)
+                for first in range(count) for second in range(first + 1, count)}
+        neighbours = [tuple(sorted(pair)) for pair in self.unsettled()] or list(weights)
+        allocated = []
+        for _ in range(tables):
+            table = list(max(neighbours, key = weights.get))
+            while len(table) < min(self.seats, count):
+                table.append(max((entrant for entrant in range(count) if entrant not in table),
+                    key = lambda entrant: sum(weights[tuple(sorted((entrant, seated)))]
+                        for seated in table)))
+            for pair in itertools.combinations(sorted(table), 2):
+                weights[pair] /= 2
+            allocated.append(tuple(table))
+        return allocated
+
+    def record(self, table:tuple, winners:list):
+        """Rate every rotation of a table together, as a single ranked result.
+
+        Rotations play on the same dice, so they are no independent games;
+        entrants are ranked by their mean placement over the rotations, where
+        the winner places first and everybody else shares second place.
+        """
+        placements = [0.0] * len(table)
+        for winner in winners:
+            for seated in range(len(table)):
+                # draws are ties
+                placements[seated] += 0 if winner is None or seated == winner else 1
+        rate([self.ratings[entrant] for entrant in table],
+                [placement / len(winners) for placement in placements], len(winners))
+        self.games += len(winners)
+
+    def jobs(self, tables:list, config:dict) -> list:
+        """Arguments of batch._play_rotations for a seed per table."""
+        jobs = []
+        for table in tables:
+            jobs.append(([set(self.entrants[entrant]) for entrant in table], self.seed, config))
+            self.seed += 1
+        return jobs
+
+    def table(self) -> list:
+        """Ranked table of the entrants with confidence bounds."""
+        return [{
+                'rank' : position + 1,
+                'strategies' : label(self.entrants[entrant]),
+                'mu' : round(self.ratings[entrant].mu, 3),
+                'sigma' : round(self.ratings[entrant].sigma, 3),
+                'lower' : round(self.ratings[entrant].lower, 3),
+                'upper' : round(self.ratings[entrant].upper, 3),
+                'games' : self.ratings[entrant].games,
+                } for position, entrant in enumerate(self.ranking())]
+
+    def __repr__(self):
+        return '\n'.join(f'{row["rank"]:>2} {row["strategies"]:<24} {row["mu"]:7.2f} '
+                f'[{row["lower"]:.2f}, {row["upper"]:.2f}] {row["games"]} games'
+                for row in self.table())
+
+    def write(self, directory:str = 'bounce'):
+        """Save the ranked table as csv."""
+        with open(os.path.join(directory, f'league_{self.seats}.csv'), 'w') as csv:
+            csv.write('rank, strategies, mu, sigma, lower, upper, games\n')
+            for row in self.table():
+                csv.write(', '.join(str(value) for value in row.values()) + '\n')
+
+
+def run_league(
+        seats:int = 4,
+        lineup:list = None,
+        batch:int = 24,
+        max_games:int = 20736,
+        workers:int = None,
+        seed:int = 0,
+        alpha:float = 0.05,
+        margin:float = 2.0,
+        **config,
+        ) -> League:
+    """Rate every strategy, or a lineup of them, until the ranking settles or the games run out.
+
+    Each batch plays its tables on every seat rotation with common random
+    numbers, spread over a pool of worker processes if asked.
+    """
+    config = dict(_CONFIG, **config)
+    league = League(seats, lineup, seed, alpha, margin)
+
+    def play(play_map):
+        while not league.settled() and league.games < max_games:
+            allocated = league.allocate(batch)
+            for table, winners in zip(allocated, play_map(_play_rotations, league.jobs(allocated, config))):
+                league.record(table, winners)
+            log.info('League of %d seats: %d games, %d pairs unsettled.',
+                    seats, league.games, len(league.unsettled()))
+
+    if workers:
+        with shared.publish() as tables, \
+                Pool(workers, initializer = shared.attach, initargs = (tables.spec,)) as pool:
+            play(pool.map)
+    else:
+        play(map)
+    return league
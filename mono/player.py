@@ -4,16 +4,20 @@ Player handling.
 
 import logging as log
 import csv
-from random import choice
+import threading
+from random import Random
 
 from mono.dice import roll
 from mono.board import FIELD_POSITION
+from mono.zobrist import POSITION, JAILED
 
 _NUMSTR = {0:'zero', 1:'one', 2:'two',
         3:'three', 4:'four', 5:'five'}
 _NAIVE_CLR = ['blue', 'green', 'yellow', 'red', 'orange',
         'pink', 'cyan', 'brown', 'station', 'utility']
 _SAFENET = 648
+# expert knowledge of every thread, handed on to worker threads with adopt
+_settings = threading.local()
 
 def numstring(number:int) -> str:
     """Converts a number into a word."""
@@ -24,6 +28,42 @@ def numstring(number:int) -> str:
         return _NUMSTR[number]
     raise Exception('Number of players too large,')
 
+def read_colour_tally(path:str = 'bounce/tally_colour.csv') -> dict:
+    """Read the colour visits tallied over previous games."""
+    with open(path, newline='') as tallycsv:
+        return {row['colour']:int(row['tally'])
+                for row in csv.DictReader(tallycsv, skipinitialspace = True)}
+
+def use_colour_tally(tally:dict):
+    """Let expert players of this thread rely on an already read colour tally."""
+    _settings.colour_tally = tally
+
+def use_knowledge(store):
+    """Let expert players of this thread rely on the snapshot of a knowledge store."""
+    _settings.knowledge = store
+
+def settings() -> dict:
+    """Expert knowledge used by this thread."""
+    return {'colour_tally' : getattr(_settings, 'colour_tally', None),
+            'knowledge' : getattr(_settings, 'knowledge', None)}
+
+def adopt(settings:dict):
+    """Use the expert knowledge of another thread, meant as a pool initialiser."""
+    use_colour_tally(settings['colour_tally'])
+    use_knowledge(settings['knowledge'])
+
+def _expert_tally() -> dict:
+    knowledge = getattr(_settings, 'knowledge', None)
+    if knowledge is not None:
+        return knowledge.snapshot()
+    colour_tally = getattr(_settings, 'colour_tally', None)
+    if colour_tally is not None:
+        return colour_tally
+    try:
+        return read_colour_tally()
+    except Exception:
+        return None
+
 def numestate_incolour(colour:str) -> int:
     """Return the number of fields in given colour."""
     if colour in {'brown','blue'}:
@@ -33,32 +73,49 @@ def numestate_incolour(colour:str) -> int:
 
 class Player():
     """A player in the game."""
-    def __init__(self, name = None, capital:int = 0, strategies:set = None, board = None):
+    def __init__(
+            self,
+            name = None,
+            capital:int = 0,
+            strategies:set = None,
+            board = None,
+            safenet:int = _SAFENET,
+            jailtries:int = 3,
+            colours:list = None,
+            seat:int = None,
+            ):
         self.name = name
+        self.seat = seat
         self.capital = capital
         self.position = 0
         self.estates = set()
         self.jailed = False
-        self.jailoutcard = False
+        self.jailoutcards = []
         self.jailouttries = 0
         self.strategies = strategies
         self.bankrupt = False
+        self.safenet = safenet
+        self.jailtries = jailtries
+        self.colours = _NAIVE_CLR if colours is None else list(colours)
         self.colour_priorities = self._establish_colour_priorities(board)
 
     def _establish_colour_priorities(self, board):
         if 'counter' in self.strategies:
             return sorted([colour for colour in board.colour_visits],
                     key = lambda x: board.colour_visits[x], reverse = True)
+        if 'roi' in self.strategies:
+            # numpy backed tables are only needed by this strategy
+            from mono.valuation import roi_priorities
+            return list(roi_priorities())
         if 'expert' in self.strategies:
-            try:
-                with open('bounce/tally_colour.csv', newline='') as tallycsv:
-                    colours = {row['colour']:row['tally'] for row in csv.DictReader(tallycsv)}
-                    return sorted([colour for colour in colours],
-                            key = lambda x: colours[x], reverse = True)
-            except Exception:
-                return _NAIVE_CLR
+            # without a tally to read, expert players fall back on the naive order
+            colours = _expert_tally()
+            if not colours:
+                return self.colours
+            return sorted([colour for colour in colours],
+                    key = lambda x: colours[x], reverse = True)
 
-        return _NAIVE_CLR
+        return self.colours
 
     # counting
 
@@ -83,6 +140,20 @@ class Player():
         return sum(1 for estate in self.estates
                 if estate.category == 'station')
 
+    def net_worth(self) -> int:
+        """Count capital together with the value of estates and houses."""
+        return self.capital + sum(estate.cost + estate.house * estate.development
+                if hasattr(estate,'development') else estate.cost
+                for estate in self.estates)
+
+    def expected_cashflow(self, board):
+        """Exact expected cash flow of the next turn, see mono.cashflow.
+
+        Evaluations are kept in the transposition cache of the board.
+        """
+        from mono.cashflow import next_turn
+        return board.transpositions.evaluate(board, self, next_turn)
+
     def can_develop(self, colour:str) -> bool:
         """Checks whether the player has all estates of the given colour."""
         return sum(1 for estate in self.estates
@@ -91,11 +162,21 @@ class Player():
 
     # moving
 
+    def _place(self, position, board):
+        if self.seat is not None and board is not None:
+            board.zobrist ^= POSITION[self.seat][self.position] ^ POSITION[self.seat][position]
+        self.position = position
+
+    def _jail(self, jailed, board):
+        if self.seat is not None and board is not None and jailed != self.jailed:
+            board.zobrist ^= JAILED[self.seat]
+        self.jailed = jailed
+
     def _move(self, arg, board):
         if isinstance(arg, int):
-            self.position = (self.position + arg) % 40
+            self._place((self.position + arg) % 40, board)
         elif isinstance(arg, str):
-            self.position = FIELD_POSITION[arg]
+            self._place(FIELD_POSITION[arg], board)
         log.info('Player %s moves to %s', self.name, board.fields[self.position].name)
         board.log_position(self.position)
 
@@ -122,7 +203,7 @@ class Player():
             else:
                 self.pay(100, board)
         elif field.category == 'gojail':
-            self.enjail()
+            self.enjail(board)
         elif field.category in {'station', 'utility', 'estate'}:
             self._evaluate_at_estate(board, field, moved)
         elif field.category in {'community', 'chance'}:
@@ -139,37 +220,39 @@ class Player():
                 rent = field.current_rent()
             else:
                 rent = field.current_rent(moved)
-            field.owner.capital += self.pay(rent, board)
+            paid = self.pay(rent, board)
+            field.owner.capital += paid
+            board.log_rent(field.position, paid)
             log.info('Player %s receives %d£ in rent.', field.owner.name, rent)
 
     # jailing
 
-    def enjail(self):
+    def enjail(self, board = None):
         """Put player in jail."""
-        self.position = 10
-        self.jailed = True
+        self._place(10, board)
+        self._jail(True, board)
         log.info('Player %s lands in jail!', self.name)
 
     def try_jailout(self, board):
         """Attempt to get out of jail."""
-        if self.jailoutcard:
-            self.jailed = False
-            self.jailoutcard = False
+        if self.jailoutcards:
+            self._jail(False, board)
+            board.give_back(self.jailoutcards.pop(0))
             log.info('Player %s uses the Get Out of Jail card.', self.name)
-        elif self.jailouttries > 2:
+        elif self.jailouttries >= self.jailtries:
             self.pay(50, board)
-            self.jailed = False
+            self._jail(False, board)
             self.jailouttries = 0
             log.info('Player %s pays their way out of jail.', self.name)
         else:
-            _, doubles = roll()
+            _, doubles = roll(board.rng)
             if not doubles:
                 self.jailouttries = self.jailouttries + 1
                 log.info('Player %s remains in jail.', self.name)
             else:
                 log.info('Player %s gets out of jail.', self.name)
                 self.jailouttries = 0
-            self.jailed = self.jailed and not doubles
+            self._jail(self.jailed and not doubles, board)
 
     # actions
     ## developing
@@ -181,7 +264,7 @@ class Player():
 
         can_develop = True
         if 'safenet' in self.strategies:
-            while self.capital > _SAFENET and can_develop:
+            while self.capital > self.safenet and can_develop:
                 can_develop = self._develop_estates(board)
         else:
             while can_develop:
@@ -189,6 +272,8 @@ class Player():
 
 
     def _develop_estates(self, board):
+        if 'roi' in self.strategies:
+            return self._develop_by_roi(board)
         for colour in self.colour_priorities:
             estates = [estate for estate in self.estates
                     if estate.category == colour or
@@ -209,28 +294,72 @@ class Player():
                     continue
         return False
 
+    def _develop_by_roi(self, board):
+        # mortgages are paid off in the order of the colours, then the next
+        # house goes wherever it returns the most on the money spent
+        from mono.valuation import develop_roi
+        best = None
+        best_roi = None
+        for colour in self.colour_priorities:
+            estates = [estate for estate in self.estates
+                    if estate.category == colour or
+                    estate.category == 'estate' and estate.colour == colour]
+            for estate in estates:
+                if estate.mortgaged and not self.capital < (estate.cost + estate.cost // 10):
+                    estate.demortgage(board)
+                    return True
+            if colour in {'station', 'utility'} or not estates or not self.can_develop(colour):
+                continue
+            lowest = min(estates, key = lambda x: x.development)
+            if lowest.can_be_developed(board) and not self.capital < lowest.house:
+                roi = develop_roi(lowest.position, lowest.development)
+                if best is None or roi > best_roi:
+                    best, best_roi = lowest, roi
+        if best is None:
+            return False
+        best.develop(board)
+        return True
+
     ## buying
 
+    def _worth_buying(self, field) -> bool:
+        from mono.valuation import worth_buying
+        level = 0
+        if field.category == 'station':
+            level = self.count_owned_stations()
+        elif field.category == 'utility':
+            level = self.count_owned_utilities()
+        return worth_buying(field.position, level)
+
     def _consider_buy(self, field, board):
+        if 'roi' in self.strategies and not self._worth_buying(field):
+            return
         if not field.cost > self.capital:
             if 'buyall' in self.strategies:
                 self._buy(field, board)
-            elif 'safenet' in self.strategies and self.capital > _SAFENET:
+            elif 'safenet' in self.strategies and self.capital > self.safenet:
                 self._buy(field, board)
 
 
     def _buy(self, field, board):
         self.pay(field.cost, board)
-        field.owner = self
+        board.own(field, self)
         self.estates |= {field, }
         log.info('Player %s buys %s.', self.name, board.fields[self.position].name)
 
 
     ## paying
 
-    def _declare_bankruptcy(self):
+    def _declare_bankruptcy(self, board = None):
+        if self.jailoutcards and board is not None:
+            for card in self.jailoutcards:
+                board.give_back(card)
+            self.jailoutcards = []
         for estate in self.estates:
-            estate.owner = None
+            if board is None:
+                estate.owner = None
+            else:
+                board.own(estate, None)
         self.estates = set()
         self.bankrupt = True
         log.info('Player %s declares bankruptcy!', self.name)
@@ -251,11 +380,11 @@ class Player():
                                 return
                 estates.sort(key = lambda x: x.mortgaged, reverse=True)
                 if any(not estate.mortgaged for estate in estates):
-                    estates[-1].mortgage()
+                    estates[-1].mortgage(board)
                     return
             else:
                 continue
-        self._declare_bankruptcy()
+        self._declare_bankruptcy(board)
 
     def pay(self, amount:int, board) -> int:
         """Subtract amount from capital if possible."""
@@ -270,26 +399,37 @@ class Player():
 
     def draw_card(self, deck:str, board):
         """Draw a card from the specified deck and evaluate it."""
-        try:
-            getattr(board, deck).pop().evaluate(self,board)
-        except Exception:
-            pass
+        card = getattr(board, deck).draw()
+        if card is not None:
+            card.evaluate(self, board)
 
 
 _STRAT_VAL = ('counter', 'expert', None)
 _STRAT_BUY = ('buyall', 'safenet', None)
-_STRAT_CRD = ('choice', None)
+_STRAT_CRD = ('chance', None)
 
-def assign_strategies():
+def assign_strategies(rng = None):
     """Choose strategies randomly."""
-    return {choice(_STRAT_VAL), choice(_STRAT_BUY), choice(_STRAT_CRD)}
-
-def initialise_player(capital:int = 0, name:str = None, board = None) -> Player:
-    """Construct a new player."""
+    rng = Random() if rng is None else rng
+    return {rng.choice(_STRAT_VAL), rng.choice(_STRAT_BUY), rng.choice(_STRAT_CRD)}
+
+def initialise_player(
+        capital:int = 0,
+        name:str = None,
+        board = None,
+        strategies:set = None,
+        **options,
+        ) -> Player:
+    """Construct a new player, with random strategies unless specified.
+
+    Options tune the strategies, see Player.
+    """
     log.info('Initialising new player.')
     return Player(
             capital = capital,
             name = name,
-            strategies = assign_strategies(),
+            strategies = assign_strategies(board and board.rng) if strategies is None \
+                    else set(strategies),
             board = board,
+            **options,
             )
@@ -0,0 +1,245 @@
+"""
+Sharding of batches over a shared work directory.
+"""
+
+import json
+import logging as log
+import os
+import socket
+import time
+import uuid
+from multiprocessing import Process
+
+from mono import shared
+from mono.batch import play_chunk, portable, restore
+from mono.player import adopt, settings, use_knowledge
+from mono.sketch import Sketches
+from mono.store import KnowledgeStore
+
+# a shard moves from pending to claimed by rename, which only one worker can win,
+# and its result lands in done under the shard name, so it is never counted twice
+_PENDING = 'pending'
+_CLAIMED = 'claimed'
+_DONE = 'done'
+_LEASE = 60.0
+_POLL = 0.5
+
+
+def _path(directory:str, state:str, shard:str = None) -> str:
+    if shard is None:
+        return os.path.join(directory, state)
+    return os.path.join(directory, state, f'{shard}.json')
+
+def _shards(directory:str, state:str) -> list:
+    try:
+        return sorted(name[:-5] for name in os.listdir(_path(directory, state))
+                if name.endswith('.json'))
+    except FileNotFoundError:
+        return []
+
+def _write(path:str, content:dict):
+    # write aside and rename, so readers never see half a file
+    temporary = f'{path}.{socket.gethostname()}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as handle:
+        json.dump(content, handle)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+
+def _read(path:str) -> dict:
+    with open(path) as handle:
+        return json.load(handle)
+
+def _batch(directory:str) -> str:
+    # named once per work directory, whichever submit comes first
+    path = os.path.join(directory, 'batch.json')
+    try:
+        with open(path, 'x') as handle:
+            json.dump({'batch' : uuid.uuid4().hex}, handle)
+    except FileExistsError:
+        pass
+    for _ in range(100):
+        try:
+            return _read(path)['batch']
+        except ValueError:
+            # still being written by another submit
+            time.sleep(0.01)
+    return _read(path)['batch']
+
+
+# coordinating
+
+def submit(directory:str, num_games:int, shard_size:int = 72, seed:int = 0, **config) -> list:
+    """Split a batch of games into shards of seeds waiting to be claimed.
+
+    Submitting the same batch again does not add shards that already exist.
+    Every shard carries the id of the batch, the same on every host, and the
+    config, with the strategies of every seat as sorted lists.
+    """
+    for state in (_PENDING, _CLAIMED, _DONE):
+        os.makedirs(_path(directory, state), exist_ok = True)
+    batch = _batch(directory)
+    known = set(_shards(directory, _PENDING) + _shards(directory, _CLAIMED) + _shards(directory, _DONE))
+    shards = []
+    for start in range(seed, seed + num_games, shard_size):
+        shard = f'shard-{start:012d}'
+        shards.append(shard)
+        if shard not in known:
+            _write(_path(directory, _PENDING, shard), {
+                'batch' : batch,
+                'shard' : shard,
+                'seeds' : [start, min(start + shard_size, seed + num_games)],
+                'config' : portable(config),
+                })
+    log.info('Submitted %d shards to %s.', len(shards), directory)
+    return shards
+
+def requeue_stale(directory:str, lease:float = _LEASE) -> int:
+    """Return shards of workers which stopped reporting back to pending."""
+    requeued = 0
+    for shard in _shards(directory, _CLAIMED):
+        claimed = _path(directory, _CLAIMED, shard)
+        try:
+            if os.path.exists(_path(directory, _DONE, shard)):
+                os.remove(claimed)
+            elif time.time() - os.path.getmtime(claimed) > lease:
+                os.rename(claimed, _path(directory, _PENDING, shard))
+                requeued += 1
+                log.info('Shard %s requeued.', shard)
+        except FileNotFoundError:
+            # finished or requeued meanwhile
+            continue
+    return requeued
+
+def is_finished(directory:str) -> bool:
+    """Check whether every shard has been done."""
+    return not _shards(directory, _PENDING) and not _shards(directory, _CLAIMED)
+
+
+# working
+
+def claim(directory:str):
+    """Take a pending shard, or return None if there are none left."""
+    for shard in _shards(directory, _PENDING):
+        pending = _path(directory, _PENDING, shard)
+        claimed = _path(directory, _CLAIMED, shard)
+        try:
+            # touched before the rename, so a claim is never stale on arrival
+            os.utime(pending)
+            os.rename(pending, claimed)
+        except FileNotFoundError:
+            # another worker was quicker
+            continue
+        return _read(claimed)
+    return None
+
+def run_shard(shard:dict, heartbeat = None) -> dict:
+    """Play every game of a shard."""
+    return dict(play_chunk(*shard['seeds'], restore(shard['config']), heartbeat), shard = shard['shard'])
+
+def work(
+        directory:str,
+        poll:float = _POLL,
+        wait:bool = False,
+        spec:dict = None,
+        knowledge:str = None,
+        ):
+    """Claim and finish shards until there are none left.
+
+    A waiting worker keeps polling for new shards until the batch is finished.
+    Local workers can attach to the tables published by the coordinator.
+    With a knowledge store, expert players rely on it, and every finished
+    shard is merged into it once, keyed by the batch id and shard name.
+    """
+    if spec is not None:
+        shared.attach(spec)
+    store = None if knowledge is None else KnowledgeStore(knowledge)
+    previous = settings()
+    if store is not None:
+        use_knowledge(store)
+    try:
+        _work(directory, poll, wait, store)
+    finally:
+        adopt(previous)
+
+def _work(directory:str, poll:float, wait:bool, store):
+    while True:
+        shard = claim(directory)
+        if shard is None:
+            if wait and not is_finished(directory):
+                time.sleep(poll)
+                continue
+            return
+        claimed = _path(directory, _CLAIMED, shard['shard'])
+
+        def heartbeat():
+            try:
+                os.utime(claimed)
+            except FileNotFoundError:
+                pass
+
+        log.info('Working on shard %s.', shard['shard'])
+        done = run_shard(shard, heartbeat)
+        if store is not None:
+            store.merge(done['tally_c'], done['tally_f'], done['outcomes'],
+                    batch = f'{shard["batch"]}/{shard["shard"]}')
+        _write(_path(directory, _DONE, shard['shard']), done)
+        try:
+            os.remove(claimed)
+        except FileNotFoundError:
+            pass
+
+
+# merging
+
+def merge(directory:str) -> (dict, dict, list):
+    """Sum up the tallies and collect the game results of every done shard."""
+    tally_c = dict()
+    tally_f = dict()
+    results = []
+    for shard in _shards(directory, _DONE):
+        done = _read(_path(directory, _DONE, shard))
+        for key, value in done['tally_c'].items():
+            tally_c[key] = tally_c.get(key, 0) + value
+        for key, value in done['tally_f'].items():
+            tally_f[int(key)] = tally_f.get(int(key), 0) + value
+        results.extend(done['results'])
+    return tally_c, dict(sorted(tally_f.items())), results
+
+def merge_sketches(directory:str) -> Sketches:
+    """Merge the distribution sketches of every done shard."""
+    sketches = Sketches()
+    for shard in _shards(directory, _DONE):
+        sketches.merge(Sketches.from_dict(_read(_path(directory, _DONE, shard))['sketches']))
+    return sketches
+
+def coordinate(
+        directory:str,
+        num_games:int,
+        workers:int = 1,
+        shard_size:int = 72,
+        seed:int = 0,
+        lease:float = _LEASE,
+        poll:float = _POLL,
+        knowledge:str = None,
+        **config,
+        ) -> (dict, dict, list):
+    """Run a sharded batch on local worker processes and merge the results.
+
+    Workers on other hosts sharing the directory can join at any time.
+    """
+    submit(directory, num_games, shard_size, seed, **config)
+    with shared.publish() as tables:
+        processes = [Process(target = work, args = (directory, poll, True, tables.spec, knowledge))
+                for _ in range(workers)]
+        for process in processes:
+            process.start()
+        while not is_finished(directory):
+            requeue_stale(directory, lease)
+            if not any(process.is_alive() for process in processes):
+                # every local worker died, so finish the batch here
+                work(directory, poll, knowledge = knowledge)
+            time.sleep(poll)
+        for process in processes:
+            process.join()
+    return merge(directory)
@@ -0,0 +1,162 @@
+"""
+Read-only tables shared between worker processes.
+"""
+
+import csv
+import logging as log
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from mono import board as br
+from mono import player as pl
+from mono.store import KnowledgeStore
+
+_RENT_LEVELS = ('site', 'single', 'double', 'triple', 'quadruple', 'hotel')
+_attached = dict()
+_local = dict()
+
+
+def _read_field_prior(path:str = 'bounce/tally_field.csv') -> np.ndarray:
+    prior = np.full(40, 1 / 40)
+    try:
+        with open(path, newline='') as tallycsv:
+            tally = {int(row['field']):int(row['tally'])
+                    for row in csv.DictReader(tallycsv, skipinitialspace = True)}
+    except Exception:
+        return prior
+    total = sum(tally.values())
+    for field, value in tally.items():
+        prior[field] = value / total
+    return prior
+
+def _column(values:list) -> np.ndarray:
+    # whole numbers as integers, anything else as fixed width text
+    try:
+        return np.array([int(value) for value in values], dtype = np.int64)
+    except (TypeError, ValueError):
+        values = ['' if value is None else value for value in values]
+        return np.array(values, dtype = f'U{max(map(len, values), default = 1) or 1}')
+
+def records(rows:list) -> np.ndarray:
+    """Rows of a csv file as a record array of fixed types, indexed like the rows."""
+    columns = list(rows[0]) if rows else []
+    arrays = [_column([row[column] for row in rows]) for column in columns]
+    dtype = np.dtype([(column, array.dtype) for column, array in zip(columns, arrays)])
+    table = np.zeros(len(rows), dtype = dtype)
+    for column, array in zip(columns, arrays):
+        table[column] = array
+    return table
+
+def build_tables(static:dict = None) -> dict:
+    """Read the static rows and derive the numeric tables from them.
+
+    Every table is an array of a fixed type, the static rows and the colour
+    tally as record arrays, so they can be mapped without being parsed.
+    """
+    static = br.read_static() if static is None else static
+    try:
+        colour_tally = pl.read_colour_tally()
+    except Exception:
+        colour_tally = dict()
+    rent = np.zeros((40, len(_RENT_LEVELS)), dtype = np.int64)
+    cost = np.zeros(40, dtype = np.int64)
+    house = np.zeros(40, dtype = np.int64)
+    for row in static['estate']:
+        position = int(row['position'])
+        rent[position] = [int(row[level]) for level in _RENT_LEVELS]
+        cost[position] = int(row['cost'])
+        house[position] = int(row['house'])
+    for row in static['board']:
+        if row['category'] in {'station', 'utility'}:
+            cost[int(row['position'])] = 200 if row['category'] == 'station' else 150
+    tables = {f'static_{path}':records(rows) for path, rows in static.items()}
+    tables['colour_tally'] = records([{'colour' : colour, 'tally' : tally}
+        for colour, tally in colour_tally.items()])
+    tables.update({
+            'rent' : rent,
+            'cost' : cost,
+            'house' : house,
+            'field_prior' : _read_field_prior(),
+            })
+    return tables
+
+
+class SharedTables():
+    """Tables published once by the parent for workers to attach to."""
+    def __init__(self, tables:dict):
+        self._segments = []
+        self.spec = dict()
+        for name, array in tables.items():
+            segment = shared_memory.SharedMemory(create = True, size = max(array.nbytes, 1))
+            self._segments.append(segment)
+            np.ndarray(array.shape, array.dtype, buffer = segment.buf)[...] = array
+            dtype = array.dtype.descr if array.dtype.names else array.dtype.str
+            self.spec[name] = (segment.name, array.shape, dtype)
+
+    def close(self):
+        """Release the tables once no worker needs them."""
+        for segment in self._segments:
+            segment.close()
+            segment.unlink()
+        self._segments = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def publish(static:dict = None) -> SharedTables:
+    """Build the tables and place them in shared memory."""
+    log.info('Publishing shared tables.')
+    return SharedTables(build_tables(static))
+
+def _open(name:str):
+    try:
+        return shared_memory.SharedMemory(name = name, track = False)
+    except TypeError:
+        # before python 3.13 the segment is registered with the resource
+        # tracker, which children share with the parent that unlinks it
+        return shared_memory.SharedMemory(name = name)
+
+def attach(spec:dict, knowledge:str = None):
+    """Use tables published by the parent, meant as a pool initialiser.
+
+    Every table is a read only view into shared memory, nothing is copied.
+    Expert players rely on the knowledge store at the given path, if any,
+    like worker threads adopting it from the parent.
+    """
+    for name, (segment_name, shape, dtype) in spec.items():
+        segment = _open(segment_name)
+        array = np.ndarray(shape, np.dtype(dtype), buffer = segment.buf)
+        array.flags.writeable = False
+        _attached[name] = (segment, array)
+    # boards read the records of the static files like the rows of the files
+    br.use_static({path:_attached[f'static_{path}'][1] for path in br._STATIC_FILES})
+    pl.use_colour_tally({str(row['colour']):int(row['tally'])
+        for row in _attached['colour_tally'][1]} or None)
+    if knowledge is not None:
+        pl.use_knowledge(KnowledgeStore(knowledge))
+
+def detach():
+    """Go back to reading the static files."""
+    br.use_static(None)
+    pl.use_colour_tally(None)
+    pl.use_knowledge(None)
+    for segment, _ in _attached.values():
+        try:
+            segment.close()
+        except BufferError:
+            # arrays handed out still point into the segment
+            pass
+    _attached.clear()
+
+def table(name:str) -> np.ndarray:
+    """A numeric table, attached if published or built locally otherwise."""
+    if name in _attached:
+        return _attached[name][1]
+    if not _local:
+        _local.update(build_tables())
+    return _local[name]
@@ -0,0 +1,214 @@
+"""
+Mergeable distribution sketches.
+"""
+
+import json
+import math
+
+# histogram range and bins of every metric, keyed by prefix
+_METRICS = {
+        'laps' : (0, 1296, 72),
+        'winner_capital' : (0, 36000, 72),
+        'first_bankruptcy' : (0, 1296, 72),
+        'rent' : (0, 18000, 72),
+        }
+_ACCURACY = 0.01
+_MAX_BINS = 512
+
+
+class Histogram():
+    """Counts in fixed equal bins, with underflow and overflow."""
+    def __init__(self, low:float = 0, high:float = 1, bins:int = 1):
+        self.low = low
+        self.high = high
+        self.counts = [0] * (bins + 2)
+
+    @property
+    def bins(self) -> int:
+        """Number of bins within range."""
+        return len(self.counts) - 2
+
+    def push(self, value:float):
+        """Count a single value."""
+        if value < self.low:
+            self.counts[0] += 1
+        elif value >= self.high:
+            self.counts[-1] += 1
+        else:
+            self.counts[1 + int((value - self.low) * self.bins / (self.high - self.low))] += 1
+
+    def merge(self, other):
+        """Add the counts of a histogram with the same bins."""
+        if (self.low, self.high, self.bins) != (other.low, other.high, other.bins):
+            raise ValueError('Histograms with different bins cannot be merged.')
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+
+    def as_dict(self) -> dict:
+        """Histogram in a form that can be saved as json."""
+        return {'low' : self.low, 'high' : self.high, 'counts' : self.counts}
+
+    @classmethod
+    def from_dict(cls, content:dict):
+        """Histogram saved with as_dict."""
+        histogram = cls(content['low'], content['high'], len(content['counts']) - 2)
+        histogram.counts = list(content['counts'])
+        return histogram
+
+
+class QuantileSketch():
+    """Quantiles within a relative accuracy, on a bounded number of bins.
+
+    Values are counted in logarithmic bins, so sketches with the same accuracy
+    merge by adding counts. Past the bin limit the smallest bins are folded
+    together, which only costs accuracy at the lowest quantiles.
+    """
+    def __init__(self, accuracy:float = _ACCURACY, max_bins:int = _MAX_BINS):
+        self.accuracy = accuracy
+        self.max_bins = max_bins
+        self._gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.positive = dict()
+        self.negative = dict()
+        self.zeros = 0
+        self.count = 0
+
+    def _index(self, value:float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def _value(self, index:int) -> float:
+        return 2 * self._gamma ** index / (self._gamma + 1)
+
+    def _collapse(self, store:dict):
+        if len(store) <= self.max_bins:
+            return
+        indices = sorted(store)
+        excess = len(indices) - self.max_bins
+        store[indices[excess]] += sum(store.pop(index) for index in indices[:excess])
+
+    def push(self, value:float):
+        """Count a single value."""
+        self.count += 1
+        if value > 0:
+            index = self._index(value)
+            self.positive[index] = self.positive.get(index, 0) + 1
+            self._collapse(self.positive)
+        elif value < 0:
+            index = self._index(-value)
+            self.negative[index] = self.negative.get(index, 0) + 1
+            self._collapse(self.negative)
+        else:
+            self.zeros += 1
+
+    def merge(self, other):
+        """Add the counts of a sketch with the same accuracy."""
+        if self.accuracy != other.accuracy:
+            raise ValueError('Sketches with different accuracy cannot be merged.')
+        for store, theirs in ((self.positive, other.positive), (self.negative, other.negative)):
+            for index, count in theirs.items():
+                store[index] = store.get(index, 0) + count
+            self._collapse(store)
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, fraction:float) -> float:
+        """Estimate the value below which the given fraction of values lie."""
+        if self.count == 0:
+            return math.nan
+        rank = fraction * (self.count - 1)
+        seen = 0
+        for index in sorted(self.negative, reverse = True):
+            seen += self.negative[index]
+            if seen > rank:
+                return -self._value(index)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for index in sorted(self.positive):
+            seen += self.positive[index]
+            if seen > rank:
+                return self._value(index)
+        return self._value(max(self.positive))
+
+    def as_dict(self) -> dict:
+        """Sketch in a form that can be saved as json."""
+        return {
+                'accuracy' : self.accuracy,
+                'max_bins' : self.max_bins,
+                'positive' : {str(index):count for index, count in self.positive.items()},
+                'negative' : {str(index):count for index, count in self.negative.items()},
+                'zeros' : self.zeros,
+                'count' : self.count,
+                }
+
+    @classmethod
+    def from_dict(cls, content:dict):
+        """Sketch saved with as_dict."""
+        sketch = cls(content['accuracy'], content['max_bins'])
+        sketch.positive = {int(index):count for index, count in content['positive'].items()}
+        sketch.negative = {int(index):count for index, count in content['negative'].items()}
+        sketch.zeros = content['zeros']
+        sketch.count = content['count']
+        return sketch
+
+
+class Sketches():
+    """A histogram and a quantile sketch for every metric of a batch.
+
+    Metrics are named by a prefix from _METRICS and an optional qualifier,
+    such as the strategy of the winner or the position of a field.
+    """
+    def __init__(self):
+        self.metrics = dict()
+
+    def _metric(self, name:str) -> (Histogram, QuantileSketch):
+        try:
+            return self.metrics[name]
+        except KeyError:
+            self.metrics[name] = (Histogram(*_METRICS[name.split('/')[0]]), QuantileSketch())
+            return self.metrics[name]
+
+    def push(self, name:str, value:float):
+        """Count a value of a metric."""
+        histogram, sketch = self._metric(name)
+        histogram.push(value)
+        sketch.push(value)
+
+    def merge(self, other):
+        """Add the metrics of other sketches."""
+        for name, (histogram, sketch) in other.metrics.items():
+            mine = self._metric(name)
+            mine[0].merge(histogram)
+            mine[1].merge(sketch)
+
+    def add_game(self, board):
+        """Count the metrics of a finished game."""
+        strategies = {str(strategy) for player in board.seats for strategy in player.strategies}
+        for strategy in [None] + sorted(strategies):
+            suffix = '' if strategy is None else f'/{strategy}'
+            self.push(f'laps{suffix}', board.laps)
+            if board.first_bankruptcy is not None:
+                self.push(f'first_bankruptcy{suffix}', board.first_bankruptcy)
+        if board.winner is not None:
+            self.push('winner_capital', board.winner.capital)
+            for strategy in sorted(map(str, board.winner.strategies)):
+                self.push(f'winner_capital/{strategy}', board.winner.capital)
+        for position, rent in board.rent_paid.items():
+            self.push(f'rent/{position}', rent)
+
+    def as_dict(self) -> dict:
+        """Sketches in a form that can be saved as json."""
+        return {name:{'histogram' : histogram.as_dict(), 'sketch' : sketch.as_dict()}
+                for name, (histogram, sketch) in sorted(self.metrics.items())}
+
+    @classmethod
+    def from_dict(cls, content:dict):
+        """Sketches saved with as_dict."""
+        sketches = cls()
+        sketches.metrics = {name:(Histogram.from_dict(metric['histogram']),
+            QuantileSketch.from_dict(metric['sketch'])) for name, metric in content.items()}
+        return sketches
+
+    def write(self, directory:str = 'bounce'):
+        """Save the sketches next to the tallies."""
+        with open(f'{directory}/sketch.json', 'w') as handle:
+            json.dump(self.as_dict(), handle)
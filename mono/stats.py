@@ -0,0 +1,169 @@
+"""
+Online statistics.
+"""
+
+import math
+
+_Z_SCORE = 1.96
+
+
+class RunningStat():
+    """Running mean and variance of a stream of values."""
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._squares = 0.0
+
+    def push(self, value:float):
+        """Add a single value to the stream."""
+        # welford's update, stable for long streams
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._squares += delta * (value - self.mean)
+
+    def merge(self, other):
+        """Absorb the values seen by another running statistic."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self._squares += other._squares + delta ** 2 * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+
+    @property
+    def variance(self) -> float:
+        """Sample variance of the values seen so far."""
+        if self.count < 2:
+            return math.inf
+        return self._squares / (self.count - 1)
+
+    def halfwidth(self, zscore:float = _Z_SCORE) -> float:
+        """Half width of the confidence interval around the mean."""
+        if self.count < 2:
+            return math.inf
+        return zscore * math.sqrt(self.variance / self.count)
+
+    def __repr__(self):
+        return f'{self.mean:.4f} ± {self.halfwidth():.4f} ({self.count})'
+
+
+class StatGroup():
+    """Running statistics for a family of named quantities."""
+    def __init__(self, keys = ()):
+        self.stats = {key:RunningStat() for key in keys}
+
+    def push(self, values:dict):
+        """Add one observation for each of the named quantities."""
+        for key, value in values.items():
+            try:
+                self.stats[key].push(value)
+            except KeyError:
+                self.stats[key] = RunningStat()
+                self.stats[key].push(value)
+
+    def merge(self, other):
+        """Absorb the statistics of another group."""
+        for key, stat in other.stats.items():
+            self.stats.setdefault(key, RunningStat()).merge(stat)
+
+    def means(self) -> dict:
+        """Current estimate of every quantity."""
+        return {key:stat.mean for key, stat in self.stats.items()}
+
+    def widest(self, zscore:float = _Z_SCORE) -> float:
+        """Widest confidence half width among the quantities."""
+        return max((stat.halfwidth(zscore) for stat in self.stats.values()), default = math.inf)
+
+    def converged(self, tolerance:float, zscore:float = _Z_SCORE) -> bool:
+        """Check whether every quantity is known within tolerance."""
+        return self.widest(zscore) <= tolerance
+
+
+class RatioStat():
+    """Running ratio of the sums of two streams, such as visits over all visits.
+
+    The ratio is pooled over every pair pushed, and its variance follows from
+    the delta method on the running means and co-moments of both streams.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean_x = 0.0
+        self.mean_y = 0.0
+        self._xx = 0.0
+        self._yy = 0.0
+        self._xy = 0.0
+
+    def push(self, numerator:float, denominator:float):
+        """Add a single pair to the streams."""
+        self.count += 1
+        delta_x = numerator - self.mean_x
+        delta_y = denominator - self.mean_y
+        self.mean_x += delta_x / self.count
+        self.mean_y += delta_y / self.count
+        self._xx += delta_x * (numerator - self.mean_x)
+        self._yy += delta_y * (denominator - self.mean_y)
+        self._xy += delta_x * (denominator - self.mean_y)
+
+    def merge(self, other):
+        """Absorb the pairs seen by another running ratio."""
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        weight = self.count * other.count / total
+        delta_x = other.mean_x - self.mean_x
+        delta_y = other.mean_y - self.mean_y
+        self._xx += other._xx + delta_x ** 2 * weight
+        self._yy += other._yy + delta_y ** 2 * weight
+        self._xy += other._xy + delta_x * delta_y * weight
+        self.mean_x += delta_x * other.count / total
+        self.mean_y += delta_y * other.count / total
+        self.count = total
+
+    @property
+    def mean(self) -> float:
+        """Pooled ratio of the sums seen so far."""
+        return self.mean_x / self.mean_y if self.mean_y else 0.0
+
+    @property
+    def variance(self) -> float:
+        """Estimated variance of the pooled ratio."""
+        if self.count < 2 or not self.mean_y:
+            return math.inf
+        ratio = self.mean
+        residual = (self._xx - 2 * ratio * self._xy + ratio ** 2 * self._yy) / (self.count - 1)
+        return max(residual, 0.0) / (self.count * self.mean_y ** 2)
+
+    def halfwidth(self, zscore:float = _Z_SCORE) -> float:
+        """Half width of the confidence interval around the ratio."""
+        return zscore * math.sqrt(self.variance)
+
+    def __repr__(self):
+        return f'{self.mean:.4f} ± {self.halfwidth():.4f} ({self.count})'
+
+
+class RatioGroup(StatGroup):
+    """Running shares of a family of counts in their common total."""
+    def push(self, counts:dict):
+        """Add the counts of one observation, quantities left out count zero."""
+        total = sum(counts.values())
+        for key in counts.keys() - self.stats.keys():
+            self.stats[key] = self._zeros()
+        for key, stat in self.stats.items():
+            stat.push(counts.get(key, 0), total)
+
+    def merge(self, other):
+        """Absorb the statistics of another group, quantities either left out count zero."""
+        for key in other.stats.keys() - self.stats.keys():
+            self.stats[key] = self._zeros()
+        for key, stat in self.stats.items():
+            stat.merge(other.stats[key] if key in other.stats else other._zeros())
+
+    def _zeros(self) -> RatioStat:
+        # every share has the same totals, so a late quantity counted zero so far
+        stat = RatioStat()
+        for other in self.stats.values():
+            stat.count, stat.mean_y, stat._yy = other.count, other.mean_y, other._yy
+            break
+        return stat
@@ -0,0 +1,114 @@
+"""
+Knowledge store shared by concurrent simulations.
+"""
+
+import logging as log
+import os
+import sqlite3
+import threading
+
+_KNOWLEDGE = 'bounce/knowledge.db'
+_TIMEOUT = 60.0
+_SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS field_visits (field INTEGER PRIMARY KEY, tally INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS colour_visits (colour TEXT PRIMARY KEY, tally INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS outcomes '
+            '(strategy TEXT PRIMARY KEY, games INTEGER NOT NULL, wins INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS batches (batch TEXT PRIMARY KEY)',
+        )
+
+
+class KnowledgeStore():
+    """Cumulative visit counts and strategy outcomes in a sqlite database.
+
+    Every process and thread gets its own connection, and every merge is a
+    single transaction, so concurrent simulations never lose counts.
+    """
+    def __init__(self, path:str = _KNOWLEDGE, timeout:float = _TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        # connection and snapshot of every thread, sqlite objects stay in their thread
+        self._local = threading.local()
+
+    def __reduce__(self):
+        # connections never travel, a copy opens its own
+        return type(self), (self.path, self.timeout)
+
+    def _connect(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            # connections must not cross a fork either
+            local.connection = sqlite3.connect(self.path, timeout = self.timeout,
+                    isolation_level = None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in _SCHEMA:
+                local.connection.execute(statement)
+            local.pid = os.getpid()
+            local.version = None
+            local.colours = None
+        return local.connection
+
+    def close(self):
+        """Close the connection of this thread."""
+        if getattr(self._local, 'pid', None) == os.getpid():
+            self._local.connection.close()
+        self._local.__dict__.clear()
+
+    def merge(self, tally_c:dict, tally_f:dict, outcomes:dict = None, batch:str = None) -> bool:
+        """Add the tallies of a batch atomically.
+
+        A named batch is only ever merged once, so retried batches do not
+        double count. Returns whether the batch was merged.
+        """
+        connection = self._connect()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            if batch is not None:
+                if connection.execute('SELECT 1 FROM batches WHERE batch = ?', (batch,)).fetchone():
+                    connection.execute('ROLLBACK')
+                    log.info('Batch %s already merged.', batch)
+                    return False
+                connection.execute('INSERT INTO batches VALUES (?)', (batch,))
+            connection.executemany(
+                    'INSERT INTO colour_visits VALUES (?, ?) '
+                    'ON CONFLICT(colour) DO UPDATE SET tally = tally + excluded.tally',
+                    tally_c.items())
+            connection.executemany(
+                    'INSERT INTO field_visits VALUES (?, ?) '
+                    'ON CONFLICT(field) DO UPDATE SET tally = tally + excluded.tally',
+                    ((int(field), tally) for field, tally in tally_f.items()))
+            connection.executemany(
+                    'INSERT INTO outcomes VALUES (?, ?, ?) '
+                    'ON CONFLICT(strategy) DO UPDATE SET '
+                    'games = games + excluded.games, wins = wins + excluded.wins',
+                    ((strategy, games, wins)
+                        for strategy, (games, wins) in (outcomes or dict()).items()))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        self._local.colours = None
+        return True
+
+    def colour_tally(self) -> dict:
+        """Read the cumulative colour visits."""
+        return dict(self._connect().execute('SELECT colour, tally FROM colour_visits'))
+
+    def field_tally(self) -> dict:
+        """Read the cumulative field visits."""
+        return dict(self._connect().execute('SELECT field, tally FROM field_visits ORDER BY field'))
+
+    def outcomes(self) -> dict:
+        """Read the games played and won by every strategy."""
+        return {strategy:(games, wins) for strategy, games, wins
+                in self._connect().execute('SELECT strategy, games, wins FROM outcomes')}
+
+    def snapshot(self) -> dict:
+        """Colour visits, read again only when another process has merged since."""
+        version = self._connect().execute('PRAGMA data_version').fetchone()[0]
+        local = self._local
+        if local.colours is None or version != local.version:
+            local.colours = self.colour_tally()
+            local.version = version
+        return local.colours
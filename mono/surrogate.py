@@ -0,0 +1,289 @@
+"""
+Surrogate model of the probability of winning.
+"""
+
+import copy
+import json
+import logging as log
+import math
+import time
+from random import Random
+
+import numpy as np
+
+from mono.batch import seeded_players
+from mono.game import finish_game, prepare_game
+from mono.player import numestate_incolour
+
+_MODEL = 'bounce/surrogate.json'
+_CONFIG = {'start_capital' : 1500, 'houses' : 32, 'hotels' : 12}
+FEATURES = (
+        'capital', 'worth', 'rent', 'development', 'estates',
+        'sets', 'rival_sets', 'opponents', 'laps', 'jailed', 'position',
+        )
+_model = None
+
+
+# features
+
+def _summary(player) -> tuple:
+    colours = dict()
+    development = 0
+    rent = 0
+    for estate in player.estates:
+        if estate.category == 'estate':
+            colours[estate.colour] = colours.get(estate.colour, 0) + 1
+            development += estate.development
+            if not estate.mortgaged:
+                rent += estate.rent[estate.development]
+    sets = sum(1 for colour, owned in colours.items() if owned == numestate_incolour(colour))
+    return max(player.capital, 0), player.net_worth(), rent, development, len(player.estates), sets
+
+def _share(mine:float, total:float) -> float:
+    return mine / total if total > 0 else 0.0
+
+def features(board, player) -> list:
+    """Features of a player on a board, in the order of FEATURES.
+
+    Money, rent and development are shares of the totals of players still in
+    the game, so the features mean the same from the first lap to the last.
+    """
+    players = [other for other in board.players if not other.bankrupt] or [player]
+    summaries = [_summary(other) for other in players]
+    mine = summaries[players.index(player)] if player in players else _summary(player)
+    totals = [sum(column) for column in zip(*summaries)]
+    return [
+            _share(mine[0], totals[0]),
+            _share(mine[1], totals[1]),
+            _share(mine[2], totals[2]),
+            _share(mine[3], totals[3]),
+            mine[4] / 28,
+            mine[5],
+            max([summary[5] for other, summary in zip(players, summaries) if other is not player],
+                default = 0),
+            len(players) - 1,
+            math.log1p(board.laps),
+            float(player.jailed),
+            player.position / 40,
+            ]
+
+
+# model
+
+def _sklearn():
+    try:
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression
+    except ImportError:
+        return None
+
+
+class Model():
+    """Logistic regression of winning on standardised features."""
+    def __init__(self, weights:list = None, bias:float = 0.0, mean:list = None, scale:list = None):
+        self.weights = list(weights or [0.0] * len(FEATURES))
+        self.bias = bias
+        self.mean = list(mean or [0.0] * len(FEATURES))
+        self.scale = list(scale or [1.0] * len(FEATURES))
+        self._folded()
+
+    def _folded(self):
+        # standardisation folded into the weights, for fast single predictions
+        self._coefficients = [weight / scale for weight, scale in zip(self.weights, self.scale)]
+        self._intercept = self.bias - sum(coefficient * mean
+                for coefficient, mean in zip(self._coefficients, self.mean))
+
+    def fit(self, X:np.ndarray, y:np.ndarray, l2:float = 1.0, iterations:int = 32, backend:str = None):
+        """Fit the weights by regularised maximum likelihood.
+
+        The backend is numpy or sklearn, by default sklearn when installed.
+        """
+        X = np.asarray(X, dtype = float)
+        y = np.asarray(y, dtype = float)
+        mean = X.mean(axis = 0)
+        scale = X.std(axis = 0)
+        scale[scale == 0] = 1.0
+        Z = (X - mean) / scale
+        LogisticRegression = _sklearn() if backend in {None, 'sklearn'} else None
+        if backend == 'sklearn' and LogisticRegression is None:
+            raise ImportError('The sklearn backend needs scikit-learn installed.')
+        if LogisticRegression is not None:
+            fitted = LogisticRegression(C = 1 / l2).fit(Z, y)
+            weights, bias = fitted.coef_[0], fitted.intercept_[0]
+        else:
+            weights, bias = _newton(Z, y, l2, iterations)
+        self.weights = [float(weight) for weight in weights]
+        self.bias = float(bias)
+        self.mean = mean.tolist()
+        self.scale = scale.tolist()
+        self._folded()
+        return self
+
+    def predict(self, X:np.ndarray) -> np.ndarray:
+        """Probabilities of winning for rows of features."""
+        logits = np.asarray(X, dtype = float) @ np.array(self._coefficients) + self._intercept
+        return 1 / (1 + np.exp(-logits))
+
+    def probability(self, vector:list) -> float:
+        """Probability of winning for a single row of features."""
+        logit = self._intercept
+        for coefficient, value in zip(self._coefficients, vector):
+            logit += coefficient * value
+        if logit < -36:
+            return 0.0
+        return 1 / (1 + math.exp(-logit))
+
+    def as_dict(self) -> dict:
+        """Model in a form that can be saved as json."""
+        return {'features' : list(FEATURES), 'weights' : self.weights, 'bias' : self.bias,
+                'mean' : self.mean, 'scale' : self.scale}
+
+    @classmethod
+    def from_dict(cls, content:dict):
+        """Model saved with as_dict."""
+        if tuple(content['features']) != FEATURES:
+            raise ValueError('Model was trained on different features.')
+        return cls(content['weights'], content['bias'], content['mean'], content['scale'])
+
+    def save(self, path:str = _MODEL):
+        """Save the model as json."""
+        with open(path, 'w') as handle:
+            json.dump(self.as_dict(), handle)
+
+    @classmethod
+    def load(cls, path:str = _MODEL):
+        """Model saved with save."""
+        with open(path) as handle:
+            return cls.from_dict(json.load(handle))
+
+
+def _newton(Z:np.ndarray, y:np.ndarray, l2:float, iterations:int) -> (np.ndarray, float):
+    # iteratively reweighted least squares, the bias is not regularised
+    A = np.hstack([Z, np.ones((len(Z), 1))])
+    penalty = np.full(A.shape[1], l2)
+    penalty[-1] = 0
+    w = np.zeros(A.shape[1])
+    for _ in range(iterations):
+        p = 1 / (1 + np.exp(-(A @ w)))
+        gradient = A.T @ (p - y) + penalty * w
+        hessian = (A * (p * (1 - p))[:, None]).T @ A + np.diag(penalty) + 1e-9 * np.eye(A.shape[1])
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < 1e-8:
+            break
+    return w[:-1], w[-1]
+
+
+def use_model(model:Model):
+    """Let win_probability rely on an already trained model."""
+    global _model
+    _model = model
+
+def win_probability(board, player, model:Model = None) -> float:
+    """Estimated probability that the player goes on to win the game.
+
+    Without a model, the installed one is used, read from
+    bounce/surrogate.json the first time.
+    """
+    if model is None:
+        if _model is None:
+            use_model(Model.load())
+        model = _model
+    return model.probability(features(board, player))
+
+
+# training
+
+def collect(seeds, every:int = 4, num_players:int = None, **config) -> (np.ndarray, np.ndarray):
+    """Features of every player at every few laps of seeded games, and whether they won.
+
+    Games nobody won are left out.
+    """
+    config = dict(_CONFIG, **config)
+    rows = []
+    labels = []
+    for seed in seeds:
+        samples = []
+
+        def sample(board):
+            if board.laps % every == 0 and len(board.players) > 1:
+                samples.extend((player.seat, features(board, player)) for player in board.players)
+
+        board = prepare_game(num_players or seeded_players(seed), seed = seed, **config)
+        winner = finish_game(board, sample)
+        if winner is None:
+            continue
+        for seat, row in samples:
+            rows.append(row)
+            labels.append(float(seat == winner.seat))
+    return np.array(rows, dtype = float).reshape(-1, len(FEATURES)), np.array(labels)
+
+def train(games:int = 1296, seed:int = 0, every:int = 4, backend:str = None, **config) -> Model:
+    """Train a model on seeded games."""
+    X, y = collect(range(seed, seed + games), every, **config)
+    log.info('Training surrogate model on %d states of %d games.', len(y), games)
+    return Model().fit(X, y, backend = backend)
+
+
+# benchmark
+
+def rollout(board, player, rollouts:int = 32, seed:int = 0) -> float:
+    """Share of games continued from the board with fresh dice that the player wins."""
+    won = 0
+    for j in range(rollouts):
+        continued = copy.deepcopy(board)
+        continued.rng = Random(seed + j)
+        winner = finish_game(continued)
+        won += winner is not None and winner.seat == player.seat
+    return won / rollouts
+
+def _scores(predictions:list, outcomes:list) -> dict:
+    clipped = [min(max(prediction, 1e-6), 1 - 1e-6) for prediction in predictions]
+    return {
+            'brier' : sum((prediction - outcome) ** 2
+                for prediction, outcome in zip(predictions, outcomes)) / len(outcomes),
+            'log_loss' : -sum(outcome * math.log(prediction) + (1 - outcome) * math.log(1 - prediction)
+                for prediction, outcome in zip(clipped, outcomes)) / len(outcomes),
+            }
+
+def benchmark(model:Model, seeds, lap:int = 12, rollouts:int = 32, **config) -> dict:
+    """Compare the model with rollouts on boards of held out games.
+
+    Every game is stopped at a lap, both estimates are made for every player
+    still in, and both are scored against how the game really ended.
+    """
+    config = dict(_CONFIG, **config)
+    predictions = []
+    estimates = []
+    outcomes = []
+    model_seconds = 0.0
+    rollout_seconds = 0.0
+    for seed in seeds:
+        board = prepare_game(seeded_players(seed), seed = seed, **config)
+        states = []
+
+        def stop(board):
+            if board.laps == lap and len(board.players) > 1:
+                states.append(copy.deepcopy(board))
+
+        winner = finish_game(board, stop)
+        if winner is None or not states:
+            continue
+        state = states[0]
+        for player in state.players:
+            started = time.perf_counter()
+            predictions.append(win_probability(state, player, model))
+            model_seconds += time.perf_counter() - started
+            started = time.perf_counter()
+            estimates.append(rollout(state, player, rollouts, seed))
+            rollout_seconds += time.perf_counter() - started
+            outcomes.append(float(player.seat == winner.seat))
+    if not outcomes:
+        return {'states' : 0}
+    return {
+            'states' : len(outcomes),
+            'model' : dict(_scores(predictions, outcomes),
+                seconds_per_call = model_seconds / len(outcomes)),
+            'rollouts' : dict(_scores(estimates, outcomes),
+                seconds_per_call = rollout_seconds / len(outcomes)),
+            }
@@ -0,0 +1,32 @@
+"""
+Trajectory recording.
+"""
+
+import numpy as np
+
+from mono.game import _MAX_LAPS
+
+COLUMNS = ('capital', 'worth', 'estates', 'houses', 'hotels')
+CAPITAL, WORTH, ESTATES, HOUSES, HOTELS = range(len(COLUMNS))
+
+
+class Trajectory():
+    """Preallocated per lap record of every seat in a game."""
+    def __init__(self, num_players:int, laps:int = _MAX_LAPS):
+        self.data = np.zeros((laps, num_players, len(COLUMNS)), dtype = np.int64)
+        self.laps = 0
+
+    def record(self, seats:list):
+        """Write down the state of every seat at the end of a lap."""
+        row = self.data[self.laps]
+        for seat, player in enumerate(seats):
+            row[seat, CAPITAL] = player.capital
+            row[seat, WORTH] = player.net_worth()
+            row[seat, ESTATES] = len(player.estates)
+            row[seat, HOUSES] = player.count_owned_houses()
+            row[seat, HOTELS] = player.count_owned_hotels()
+        self.laps += 1
+
+    def values(self) -> np.ndarray:
+        """Copy of the recorded laps, of shape laps × seats × columns."""
+        return self.data[:self.laps].copy()
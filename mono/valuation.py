@@ -0,0 +1,111 @@
+"""
+Expected return on investment of estates.
+"""
+
+import functools
+
+from mono import board as br
+from mono import shared
+
+# a turn lands on more than one field after doubles or cards
+_LANDINGS_PER_TURN = 7 / 6
+_EXPECTED_ROLL = 7
+_TYPICAL_HOUSES = 3
+# opponent turns a purchase may take to pay for itself
+_PAYBACK = 400
+
+
+@functools.lru_cache(maxsize = None)
+def rent_table() -> dict:
+    """Expected rent per opponent turn of every buyable field at every level.
+
+    Levels of estates are the houses built on a full colour set, levels of
+    stations and utilities the number of them owned, starting from one.
+    """
+    landing = (shared.table('field_prior') * _LANDINGS_PER_TURN).tolist()
+    rent = shared.table('rent').tolist()
+    table = dict()
+    for row in br._static_rows('estate'):
+        position = int(row['position'])
+        # an undeveloped full set pays double
+        rents = [2 * rent[position][0]] + [rent[position][level] for level in range(1, 6)]
+        table[position] = tuple(landing[position] * value for value in rents)
+    for row in br._static_rows('board'):
+        position = int(row['position'])
+        if row['category'] == 'station':
+            table[position] = tuple(landing[position] * 25 * 2 ** owned for owned in range(4))
+        elif row['category'] == 'utility':
+            table[position] = tuple(landing[position] * _EXPECTED_ROLL * (6 * owned - 2)
+                    for owned in range(1, 3))
+    return table
+
+@functools.lru_cache(maxsize = None)
+def roi_table() -> dict:
+    """Expected rent per opponent turn divided by the money invested."""
+    cost = shared.table('cost').tolist()
+    house = shared.table('house').tolist()
+    table = dict()
+    for position, rents in rent_table().items():
+        if house[position]:
+            table[position] = tuple(rent / (cost[position] + level * house[position])
+                    for level, rent in enumerate(rents))
+        else:
+            table[position] = tuple(rent / cost[position] for rent in rents)
+    return table
+
+@functools.lru_cache(maxsize = None)
+def develop_table() -> dict:
+    """Expected rent per opponent turn gained by the next house, per money spent on it.
+
+    Levels are the houses already built, from none to four.
+    """
+    house = shared.table('house').tolist()
+    return {position:tuple((rents[level + 1] - rents[level]) / house[position]
+        for level in range(5))
+        for position, rents in rent_table().items() if house[position]}
+
+@functools.lru_cache(maxsize = None)
+def colour_roi() -> dict:
+    """Return on investment of every colour owned in full.
+
+    Colour sets are valued with three houses on each estate, stations and
+    utilities with all of them owned.
+    """
+    cost = shared.table('cost').tolist()
+    house = shared.table('house').tolist()
+    rents = rent_table()
+    groups = dict()
+    for row in br._static_rows('estate'):
+        groups.setdefault(row['colour'], []).append(int(row['position']))
+    for row in br._static_rows('board'):
+        if row['category'] in {'station', 'utility'}:
+            groups.setdefault(row['category'], []).append(int(row['position']))
+    value = dict()
+    for colour, positions in groups.items():
+        level = _TYPICAL_HOUSES if colour not in {'station', 'utility'} else -1
+        invested = sum(cost[position] + max(level, 0) * house[position] for position in positions)
+        value[colour] = sum(rents[position][level] for position in positions) / invested
+    return value
+
+@functools.lru_cache(maxsize = None)
+def roi_priorities() -> tuple:
+    """Colours ordered by their return on investment, best first."""
+    value = colour_roi()
+    return tuple(sorted(value, key = lambda colour: value[colour], reverse = True))
+
+def estate_roi(position:int, level:int = 0) -> float:
+    """Look up the return on investment of a field at a level."""
+    return roi_table()[position][level]
+
+def develop_roi(position:int, level:int) -> float:
+    """Look up the return on investment of the next house on an estate."""
+    return develop_table()[position][level]
+
+def worth_buying(position:int, level:int = 0) -> bool:
+    """Check whether a field pays for itself soon enough at a level."""
+    return estate_roi(position, level) * _PAYBACK >= 1
+
+def clear():
+    """Forget the cached tables, after the landing probabilities changed."""
+    for cached in (rent_table, roi_table, develop_table, colour_roi, roi_priorities):
+        cached.cache_clear()
@@ -0,0 +1,105 @@
+"""
+Zobrist hashing of the game state.
+"""
+
+from collections import OrderedDict
+from random import Random
+
+_SEED = 0x5eed
+_SEATS = 6
+_FIELDS = 40
+
+_rng = Random(_SEED)
+OWNER = [[_rng.getrandbits(64) for _ in range(_SEATS)] for _ in range(_FIELDS)]
+# building nothing leaves the hash unchanged
+DEVELOPMENT = [[0] + [_rng.getrandbits(64) for _ in range(5)] for _ in range(_FIELDS)]
+MORTGAGED = [_rng.getrandbits(64) for _ in range(_FIELDS)]
+POSITION = [[_rng.getrandbits(64) for _ in range(_FIELDS)] for _ in range(_SEATS)]
+JAILED = [_rng.getrandbits(64) for _ in range(_SEATS)]
+del _rng
+
+
+def full_hash(board) -> int:
+    """Hash the ownership, development, mortgages and positions from scratch.
+
+    Capital is left out, so the hash tells apart positions on the board, not
+    the money in the players' hands, see unhashed.
+    """
+    value = 0
+    for position, field in board.fields.items():
+        if getattr(field, 'owner', None) is not None and field.owner.seat is not None:
+            value ^= OWNER[position][field.owner.seat]
+        if getattr(field, 'mortgaged', False):
+            value ^= MORTGAGED[position]
+        value ^= DEVELOPMENT[position][getattr(field, 'development', 0)]
+    for player in board.seats or ():
+        if player.seat is not None:
+            value ^= POSITION[player.seat][player.position]
+            if player.jailed:
+                value ^= JAILED[player.seat]
+    return value
+
+
+def unhashed(board) -> tuple:
+    """The rest of the state, changing too often to be hashed incrementally.
+
+    That is the capital, jail tries, Get Out of Jail card and bankruptcy of
+    every player, the houses and hotels left in the bank and how far the
+    decks have been drawn, each of which is cheap to read whole.
+    """
+    return (board.houses, board.hotels,
+            board.chance.top, len(board.chance.held),
+            board.community.top, len(board.community.held),
+            *((player.capital, player.jailouttries, len(player.jailoutcards), player.bankrupt)
+                for player in board.seats or ()))
+
+
+class TranspositionCache():
+    """Bounded cache of evaluations, keyed by the whole state of a game.
+
+    The key is the incremental hash together with the unhashed rest of the
+    state, so evaluations depending on money are never served stale. Other
+    games differ in ways neither covers, like the strategies in every seat,
+    so every board keeps a cache of its own. Players without a seat are not
+    followed by the hash, so their evaluations are never cached.
+    """
+    def __init__(self, maxsize:int = 4096):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key) -> bool:
+        return key in self._entries
+
+    def get(self, key, default = None):
+        """Look up an evaluation, marking it as recently used."""
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Store an evaluation, dropping the least recently used beyond the bound."""
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last = False)
+
+    def evaluate(self, board, player, evaluation, *args):
+        """Evaluate the board for a player, or reuse an equivalent evaluation."""
+        if player.seat is None:
+            return evaluation(board, player, *args)
+        key = (board.zobrist, unhashed(board), player.seat, *args)
+        value = self.get(key, self)
+        if value is self:
+            value = evaluation(board, player, *args)
+            self.put(key, value)
+        return value
@@ -1,38 +1,57 @@
 #!/usr/bin/env python3
 
+import argparse
+import json
 import logging as log
+import os
+import sys
 from random import randint
 
 from mono import run_game
+from mono import gamelog
+from mono.batch import tally_game, write_tallies, run_until_converged, run_batch, write_batch, Progress
+from mono.sketch import Sketches
 
 NUM_PLAYERS = 3
 NUM_HOUSES = 32
 NUM_HOTELS = 12
 START_CAPITAL = 1500
+TOLERANCE = 0.005
 
 
-def run_many_games(num = 72):
-    first = run_single_game()
-    tally_c = first.colour_visits
-    tally_f = first.field_visits
-    for _ in range(num-1):
-        more = run_single_game(num_players = randint(2,6))
-        visits_c = more.colour_visits
-        visits_f = more.field_visits
-        for key in tally_c:
-            tally_c[key] += visits_c[key]
-        for key in tally_f:
-            tally_f[key] += visits_f[key]
-    total_c = sum(value for value in iter(tally_c.values()))
-    total_f = sum(value for value in iter(tally_f.values()))
-    with open('bounce/tally_colour.csv', 'w') as csv:
-        csv.write('colour, tally, prob\n')
-        for key in tally_c:
-            csv.write(f'{key}, {tally_c[key]}, {tally_c[key]/total_c:.4f}\n')
-    with open('bounce/tally_field.csv', 'w') as csv:
-        csv.write('field, tally, prob\n')
-        for key in tally_f:
-            csv.write(f'{key}, {tally_f[key]}, {tally_f[key]/total_f:.4f}\n')
+def run_many_games(num = 72, logs = None):
+    tally_c = dict()
+    tally_f = dict()
+    sketches = Sketches()
+    for j in range(num):
+        board = run_single_game(num_players = randint(2,6)) if j else run_single_game()
+        tally_game(board, tally_c, tally_f)
+        sketches.add_game(board)
+        if logs is not None:
+            logs.rotate()
+    write_tallies(tally_c, tally_f)
+    sketches.write()
+
+
+def run_converged_games(args):
+    batch = run_until_converged(
+            tolerance = args.converge,
+            max_games = args.games,
+            max_seconds = args.time,
+            num_players = args.players,
+            seed = args.seed,
+            fast_forward = args.fast_forward,
+            start_capital = args.capital,
+            houses = args.houses,
+            hotels = args.hotels,
+            )
+    os.makedirs(args.out, exist_ok = True)
+    write_tallies(batch.tally_c, batch.tally_f, args.out)
+    batch.sketches.write(args.out)
+    summary = {'games' : batch.games, 'seconds' : round(batch.elapsed, 3),
+            'widest' : round(batch.widest(), 6), 'converged' : batch.converged(args.converge)}
+    print(json.dumps(summary, indent = 2))
+    return summary
 
 
 def run_single_game(num_players = NUM_PLAYERS):
@@ -44,13 +63,195 @@ def run_single_game(num_players = NUM_PLAYERS):
             )
 
 
-if __name__ == '__main__':
-    log.basicConfig(
-            format='%(message)s',
-            filemode='w',
-            filename='bounce/game.log',
-            encoding='utf-8',
-            level=log.INFO,
+def run_batch_games(args):
+    if args.converge is not None:
+        return run_converged_games(args)
+    if args.games is None and args.time is None:
+        args.games = 72
+    progress = Progress(args.games, args.time, stream = None if args.quiet else sys.stderr)
+    total = run_batch(
+            num_games = args.games,
+            max_seconds = args.time,
+            workers = args.workers,
+            seed = args.seed,
+            chunk = args.chunk,
+            progress = progress,
+            threads = args.threads,
+            checkpoint = args.checkpoint,
+            checkpoint_every = args.checkpoint_every,
+            knowledge = args.knowledge,
+            fast_forward = args.fast_forward,
+            num_players = args.players,
+            start_capital = args.capital,
+            houses = args.houses,
+            hotels = args.hotels,
             )
-    run_single_game()
-#   run_many_games(1296)
+    os.makedirs(args.out, exist_ok = True)
+    write_batch(total, args.out, args.format)
+    summary = dict(progress.summary(), workers = args.workers or 1)
+    if not args.quiet:
+        sys.stderr.write('\n')
+    print(json.dumps(summary, indent = 2))
+    return summary
+
+
+def submit_shards(args):
+    from mono import shard
+    shards = shard.submit(
+            args.directory,
+            args.games,
+            shard_size = args.shard_size,
+            seed = args.seed,
+            fast_forward = args.fast_forward,
+            num_players = args.players,
+            start_capital = args.capital,
+            houses = args.houses,
+            hotels = args.hotels,
+            )
+    print(f'{len(shards)} shards in {args.directory}')
+    return shards
+
+
+def work_shards(args):
+    from mono import shard
+    shard.work(args.directory, poll = args.poll, wait = args.wait, knowledge = args.knowledge)
+
+
+def merge_shards(args):
+    from mono import shard
+    tally_c, tally_f, results = shard.merge(args.directory)
+    os.makedirs(args.out, exist_ok = True)
+    write_tallies(tally_c, tally_f, args.out)
+    shard.merge_sketches(args.directory).write(args.out)
+    print(f'{len(results)} games merged, {"finished" if shard.is_finished(args.directory) else "unfinished"}')
+    return results
+
+
+def train_surrogate(args):
+    from mono import surrogate
+    model = surrogate.train(games = args.games, seed = args.seed, every = args.every)
+    model.save(os.path.join(args.out, 'surrogate.json'))
+    report = surrogate.benchmark(model, range(args.seed + args.games, args.seed + args.games + args.bench),
+            lap = args.lap, rollouts = args.rollouts)
+    print(json.dumps(report, indent = 2))
+    return report
+
+
+def run_leagues(args):
+    from mono.league import run_league
+    os.makedirs(args.out, exist_ok = True)
+    leagues = dict()
+    for seats in args.seats:
+        league = run_league(seats = seats, batch = args.batch, max_games = args.games,
+                workers = args.workers, seed = args.seed)
+        league.write(args.out)
+        print(f'{seats} seats, {league.games} games, {"settled" if league.settled() else "unsettled"}:')
+        print(league)
+        leagues[seats] = league
+    return leagues
+
+
+def add_game_options(parser):
+    parser.add_argument('-p', '--players', type = int, default = None,
+            help = 'players per game, random from two to six by default')
+    parser.add_argument('--capital', type = int, default = START_CAPITAL)
+    parser.add_argument('--houses', type = int, default = NUM_HOUSES)
+    parser.add_argument('--hotels', type = int, default = NUM_HOTELS)
+    parser.add_argument('--fast-forward', action = 'store_true',
+            help = 'skip decision-free stretches of games in bulk')
+
+
+def parse_arguments(argv = None):
+    parser = argparse.ArgumentParser(description = 'Simulate games of Monopoly.')
+    commands = parser.add_subparsers(dest = 'command')
+    game = commands.add_parser('game', help = 'play games logged to bounce/game.log')
+    game.add_argument('-n', '--games', type = int, default = 1,
+            help = 'number of games, each logged to a file of its own')
+    game.add_argument('-z', '--compress', action = 'store_true', help = 'gzip the logs')
+    game.add_argument('--max-bytes', type = int, default = None, help = 'start a new log past this size')
+    game.add_argument('--queue', type = int, default = 65536, help = 'log records waiting to be written')
+    game.add_argument('--full', choices = ('block', 'drop', 'oldest'), default = 'block',
+            help = 'what to do with log records when the queue is full')
+    batch = commands.add_parser('batch', help = 'play a batch of games and save the tallies')
+    budget = batch.add_argument_group('budget')
+    budget.add_argument('-n', '--games', type = int, help = 'number of games, 72 without a time budget')
+    budget.add_argument('-t', '--time', type = float, help = 'wall clock budget in seconds')
+    batch.add_argument('-w', '--workers', type = int, default = None, help = 'worker processes')
+    batch.add_argument('--threads', action = 'store_true',
+            help = 'run workers as threads, for free-threaded builds of python')
+    batch.add_argument('-s', '--seed', type = int, default = 0, help = 'seed of the first game')
+    batch.add_argument('-o', '--out', default = 'bounce', help = 'output directory')
+    batch.add_argument('-f', '--format', choices = ('csv', 'json'), default = 'csv', help = 'output format')
+    add_game_options(batch)
+    batch.add_argument('--chunk', type = int, default = 8, help = 'games handed to a worker at once')
+    batch.add_argument('--checkpoint', default = None, metavar = 'DIR',
+            help = 'save progress to a directory and resume from it')
+    batch.add_argument('--checkpoint-every', type = float, default = 60.0,
+            help = 'seconds between checkpoints')
+    batch.add_argument('--knowledge', default = None, metavar = 'PATH',
+            help = 'knowledge store to merge every chunk into and to play by')
+    batch.add_argument('--converge', type = float, nargs = '?', const = TOLERANCE, default = None,
+            metavar = 'TOLERANCE', help = 'play until every visit share and win rate is known within '
+            f'tolerance, {TOLERANCE} by default, in this process only')
+    batch.add_argument('-q', '--quiet', action = 'store_true', help = 'no live progress')
+    submit = commands.add_parser('submit', help = 'split a batch into shards for workers on any host')
+    submit.add_argument('directory', help = 'work directory shared by the workers')
+    submit.add_argument('-n', '--games', type = int, default = 72, help = 'number of games')
+    submit.add_argument('--shard-size', type = int, default = 72, help = 'games per shard')
+    submit.add_argument('-s', '--seed', type = int, default = 0, help = 'seed of the first game')
+    add_game_options(submit)
+    work = commands.add_parser('work', help = 'claim and play the shards of a work directory')
+    work.add_argument('directory', help = 'work directory shared by the workers')
+    work.add_argument('--wait', action = 'store_true', help = 'keep polling until the batch is finished')
+    work.add_argument('--poll', type = float, default = 0.5, help = 'seconds between polls')
+    work.add_argument('--knowledge', default = None, metavar = 'PATH',
+            help = 'knowledge store to merge every shard into and to play by')
+    merge = commands.add_parser('merge', help = 'save the tallies and sketches of the finished shards')
+    merge.add_argument('directory', help = 'work directory shared by the workers')
+    merge.add_argument('-o', '--out', default = 'bounce', help = 'output directory')
+    league = commands.add_parser('league', help = 'rank every strategy by adaptively allocated games')
+    league.add_argument('--seats', type = int, nargs = '+', default = [2, 3, 4, 5, 6],
+            help = 'table sizes, each with a league of its own')
+    league.add_argument('-n', '--games', type = int, default = 20736, help = 'most games per league')
+    league.add_argument('-b', '--batch', type = int, default = 24, help = 'tables per batch')
+    league.add_argument('-w', '--workers', type = int, default = None, help = 'worker processes')
+    league.add_argument('-s', '--seed', type = int, default = 0, help = 'seed of the first game')
+    league.add_argument('-o', '--out', default = 'bounce', help = 'output directory')
+    model = commands.add_parser('surrogate', help = 'train and benchmark the win probability model')
+    model.add_argument('-n', '--games', type = int, default = 1296, help = 'training games')
+    model.add_argument('-s', '--seed', type = int, default = 0, help = 'seed of the first game')
+    model.add_argument('-o', '--out', default = 'bounce', help = 'output directory')
+    model.add_argument('--every', type = int, default = 4, help = 'laps between training samples')
+    model.add_argument('--bench', type = int, default = 72, help = 'held out benchmark games')
+    model.add_argument('--lap', type = int, default = 12, help = 'lap at which benchmark games are judged')
+    model.add_argument('--rollouts', type = int, default = 32, help = 'rollouts per benchmark estimate')
+    return parser.parse_args(argv)
+
+
+if __name__ == '__main__':
+    arguments = parse_arguments()
+    if arguments.command == 'batch':
+        run_batch_games(arguments)
+    elif arguments.command == 'submit':
+        submit_shards(arguments)
+    elif arguments.command == 'work':
+        work_shards(arguments)
+    elif arguments.command == 'merge':
+        merge_shards(arguments)
+    elif arguments.command == 'league':
+        run_leagues(arguments)
+    elif arguments.command == 'surrogate':
+        train_surrogate(arguments)
+    else:
+        logs = gamelog.install(
+                'bounce/game.log',
+                compress = getattr(arguments, 'compress', False),
+                max_bytes = getattr(arguments, 'max_bytes', None),
+                queue_size = getattr(arguments, 'queue', 65536),
+                full = getattr(arguments, 'full', 'block'),
+                )
+        if getattr(arguments, 'games', 1) > 1:
+            run_many_games(arguments.games, logs)
+        else:
+            run_single_game()
+        logs.close()
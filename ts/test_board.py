@@ -1,3 +1,6 @@
+import subprocess
+import sys
+import timeit
 import mono.player as pl
 import mono.board as br
 
@@ -72,6 +75,91 @@ def test_retreat_card():
     assert plr.position == 0
     assert plr.capital == 1
 
+def test_birthday_card():
+    party = br.prepare_board(0,0)
+    party.players = [pl.initialise_player(100, f'guest-{j}', party) for j in range(3)]
+    card = br.Card(name = 'birthday', category = 'special')
+    card.evaluate(party.players[0], party)
+    assert [player.capital for player in party.players] == [120, 90, 90]
+
+def test_repairs_card():
+    party = br.prepare_board(0,0)
+    player = pl.initialise_player(1000, 'repairs-test', party)
+    estate = party.fields[1]
+    estate.owner = player
+    estate.development = 2
+    player.estates.add(estate)
+    br.Card(name = 'repairs', category = 'special').evaluate(player, party)
+    assert player.capital == 950
+    br.Card(name = 'repairsexp', category = 'special').evaluate(player, party)
+    assert player.capital == 870
+
+
+# decks
+
+def test_deck_cycles():
+    cards = [br.Card(name = str(j), category = 'capital') for j in range(3)]
+    deck = br.Deck(cards)
+    assert [deck.draw().name for _ in range(7)] == ['0', '1', '2', '0', '1', '2', '0']
+    assert len(deck) == 3
+
+def test_deck_discard():
+    cards = [br.Card(name = str(j), category = 'capital') for j in range(2)]
+    deck = br.Deck(cards, 'discard')
+    assert [deck.draw().name for _ in range(2)] == ['0', '1']
+    assert deck.draw() is None
+    assert len(deck) == 0
+
+def test_deck_holds_jailout():
+    cards = [br.Card(name = 'free', category = 'jailout'), br.Card(name = '1', category = 'capital')]
+    deck = br.Deck(cards)
+    jailout = deck.draw()
+    assert [deck.draw().name for _ in range(2)] == ['1', '1']
+    assert len(deck) == 1
+    assert deck.give_back(jailout)
+    assert len(deck) == 2
+    assert deck.draw() is jailout
+
+def test_jailout_card_returned():
+    table = br.prepare_board(0,0)
+    player = pl.initialise_player(200, 'jailout-test', table)
+    card = next(card for card in table.chance.cards if card.category == 'jailout')
+    table.chance.top = table.chance.cards.index(card)
+    player.draw_card('chance', table)
+    assert player.jailoutcards == [card]
+    assert len(table.chance) == 15
+    player.enjail(table)
+    player.try_jailout(table)
+    assert not player.jailed
+    assert len(table.chance) == 16
+
+def test_second_jailout_card():
+    table = br.prepare_board(0,0)
+    player = pl.initialise_player(200, 'jailout-test', table)
+    for deck in ('chance', 'community'):
+        cards = getattr(table, deck).cards
+        getattr(table, deck).top = cards.index(next(card for card in cards if card.category == 'jailout'))
+        player.draw_card(deck, table)
+    # both cards are kept, and go back one at a time as they are used
+    assert [card.category for card in player.jailoutcards] == ['jailout', 'jailout']
+    assert len(table.chance) == 15
+    assert len(table.community) == 15
+    player.enjail(table)
+    player.try_jailout(table)
+    assert len(table.chance) == 16
+    assert len(table.community) == 15
+    player.enjail(table)
+    player.try_jailout(table)
+    assert not player.jailed
+    assert len(table.community) == 16
+
+def test_unknown_deck_rule():
+    try:
+        br.Deck([], 'shuffle')
+    except ValueError:
+        return
+    assert False
+
 # estates
 
 def test_board_developable():
@@ -205,3 +293,40 @@ def test_discard():
     board.players[1]._declare_bankruptcy()
     board.discard_players()
     assert len(board.players) == 1
+
+
+# static data
+
+def test_static_read_once():
+    br.use_static(None)
+    br.prepare_board(0, 0)
+    static = br._static
+    br.prepare_board(0, 0)
+    assert br._static is static
+    assert static == br.read_static()
+
+def test_static_cache(tmp_path, monkeypatch):
+    cache = str(tmp_path / 'cache.marshal')
+    static = br.load_static(cache)
+    assert static == br.read_static()
+    assert br.load_static(cache) == static
+    with open(cache, 'wb') as stale:
+        stale.write(b'stale')
+    assert br.load_static(cache) == static
+    # a changed csv file rebuilds the cache
+    sources = br._sources()
+    sources['chance'] = sources['chance'].replace(b'Mayfair', b'Park Lane', 1)
+    monkeypatch.setattr(br, '_sources', lambda: dict(sources))
+    assert br.load_static(cache)['chance'] != static['chance']
+
+def test_static_cache_faster(tmp_path):
+    cache = str(tmp_path / 'cache.marshal')
+    br.load_static(cache)
+    cached = min(timeit.repeat(lambda: br.load_static(cache), number = 20, repeat = 5))
+    parsed = min(timeit.repeat(br.read_static, number = 20, repeat = 5))
+    assert cached < parsed
+
+def test_import_mono_lazily():
+    script = 'import sys, mono; print(sorted(name for name in sys.modules if name.startswith("mono.")))'
+    out = subprocess.run([sys.executable, '-c', script], capture_output = True, text = True, check = True)
+    assert out.stdout.strip() == '[]'
@@ -0,0 +1,71 @@
+import math
+from random import Random
+import mono.board as br
+import mono.cashflow as cf
+import mono.player as pl
+from mono.game import turn
+
+
+def _table(capital:int = 300, position:int = 28, seed:int = None):
+    board = br.prepare_board(32, 12, rng = Random(seed))
+    plr = pl.initialise_player(capital, 'player-test', board, strategies = set())
+    landlord = pl.initialise_player(1500, 'landlord', board, strategies = set())
+    board.players = [plr, landlord]
+    for field in (1, 3, 5, 12, 15, 16, 18, 19, 25, 37, 39):
+        board.own(board.fields[field], landlord)
+        landlord.estates.add(board.fields[field])
+    board.fields[37].development = 3
+    board.fields[39].development = 3
+    board.fields[19].development = 2
+    plr.position = position
+    return board, plr
+
+
+def test_rolls():
+    assert len(cf._ROLLS) == 15
+    assert math.isclose(sum(probability for _, _, probability in cf._ROLLS), 1)
+    assert math.isclose(sum(probability for _, doubles, probability in cf._ROLLS if doubles), 1 / 6)
+
+def test_empty_board():
+    board = br.prepare_board(32, 12)
+    plr = pl.initialise_player(1500, 'player-test', board, strategies = set())
+    board.players = [plr]
+    flow = plr.expected_cashflow(board)
+    assert flow.rent == 0
+    assert flow.bankruptcy == 0
+    assert flow.tax > 0
+
+def test_jailed():
+    board, plr = _table(capital = 30)
+    plr.enjail(board)
+    plr.jailoutcards = [br.Card(category = 'jailout')]
+    assert plr.expected_cashflow(board).net == 0
+    plr.jailoutcards = []
+    plr.jailouttries = plr.jailtries
+    flow = plr.expected_cashflow(board)
+    assert flow.tax == 30
+    assert flow.bankruptcy == 1
+
+def test_remaining_cards():
+    deck = br.Deck([br.Card(name = str(j), category = 'capital') for j in range(4)])
+    for _ in range(3):
+        deck.draw()
+    assert [card.name for card in deck.remaining()] == ['3']
+    deck.draw()
+    assert len(deck.remaining()) == 4
+
+def test_matches_simulation():
+    board, plr = _table()
+    flow = plr.expected_cashflow(board)
+    games = 4000
+    changes = []
+    bankruptcies = 0
+    for seed in range(games):
+        board, plr = _table(seed = seed)
+        turn(board, plr)
+        changes.append(max(plr.capital, 0) - 300)
+        bankruptcies += plr.bankrupt
+    mean = sum(changes) / games
+    error = math.sqrt(sum((change - mean) ** 2 for change in changes) / games / games)
+    assert abs(flow.net - mean) < 4 * error
+    assert abs(flow.bankruptcy - bankruptcies / games) < 4 * math.sqrt(0.25 / games)
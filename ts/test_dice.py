@@ -1,10 +1,18 @@
+from random import Random
 import mono.dice as dc
 
 def test_d6():
+    rng = Random(0)
     for _ in range(36):
-        assert dc.d6() in range(1,6+1)
+        assert dc.d6(rng) in range(1,6+1)
 
 def test_result():
     die0, die1 = 1,2
     assert dc.result(die0, die1) == (3, False)
     assert dc.result(die0, die0) == (2, True)
+
+def test_roll_own_generator():
+    rng, same, other = Random(6), Random(6), Random(7)
+    rolls = [dc.roll(rng) for _ in range(6)]
+    assert rolls == [dc.roll(same) for _ in range(6)]
+    assert rolls != [dc.roll(other) for _ in range(6)]
@@ -0,0 +1,36 @@
+import random
+import mono.evolve as ev
+
+
+def test_genome_options():
+    genome = ev.Genome(valuation = 'counter', buy = 'safenet', chance = True, safenet = 100)
+    assert genome.strategies() == {'counter', 'safenet', 'chance'}
+    assert genome.options()['safenet'] == 100
+    assert ev.Genome(**genome.as_dict()) == genome
+
+def test_mutate_keeps_colours():
+    rng = random.Random(0)
+    genome = ev.random_genome(rng)
+    for _ in range(36):
+        genome = ev.mutate(ev.crossover(genome, ev.random_genome(rng), rng), rng, rate = 1)
+        assert sorted(genome.colours) == sorted(ev._NAIVE_CLR)
+        assert 0 <= genome.jailtries <= 3
+        assert genome.safenet >= 0
+
+def test_play_seed_deterministic():
+    genome = ev.Genome()
+    assert ev.play_seed(genome, 3) == ev.play_seed(genome, 3)
+
+def test_evolve_checkpoint(tmp_path):
+    kwds = dict(population = 4, games = 4, elite = 1)
+    first = ev.evolve(generations = 1, checkpoint = str(tmp_path), **kwds)
+    assert first.generation == 1
+    assert (tmp_path / 'generation-0001.json').exists()
+    resumed = ev.Evolution(**kwds)
+    assert resumed.load(str(tmp_path))
+    assert resumed.population == first.population
+    assert resumed.fitness == {key:value for key, value in first.fitness.items()
+            if key in resumed.fitness}
+    second = ev.evolve(generations = 2, checkpoint = str(tmp_path), workers = 2, **kwds)
+    assert second.generation == 2
+    assert all(genome.key() in second.fitness for genome in second.population)
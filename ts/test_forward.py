@@ -0,0 +1,85 @@
+import math
+from random import Random
+import mono.board as br
+import mono.forward as fw
+import mono.player as pl
+from mono.game import prepare_game, finish_game, run_game, turn
+
+
+def _landlord(seed:int = 0):
+    board = br.prepare_board(0, 0, rng = Random(seed))
+    plr = pl.initialise_player(10 ** 6, 'player-test', board, strategies = set())
+    landlord = pl.initialise_player(10 ** 6, 'landlord', board, strategies = set())
+    board.players = [plr, landlord]
+    for field in board.fields.values():
+        if field.category in {'station', 'utility', 'estate'}:
+            board.own(field, landlord)
+            landlord.estates.add(field)
+    return board, plr, landlord
+
+
+def test_quiescent():
+    board = prepare_game(3, 1500, 32, 12, strategies = [{None}] * 3, seed = 0)
+    assert fw.quiescent(board)
+    board = prepare_game(3, 1500, 32, 12, strategies = [{'buyall'}] * 3, seed = 0)
+    assert not fw.quiescent(board)
+    board, _, _ = _landlord()
+    assert fw.quiescent(board)
+    # the chains know a Get Out of Jail card as held or not, so not both
+    board, plr, _ = _landlord()
+    for deck in (board.chance, board.community):
+        card = next(card for card in deck.cards if card.category == 'jailout')
+        deck.top = deck.cards.index(card)
+        card = deck.draw()
+        card.evaluate(plr, board)
+        assert fw.quiescent(board) == (len(plr.jailoutcards) == 1)
+
+def test_chain():
+    board, plr, _ = _landlord()
+    chain = fw._Chain(board, plr)
+    assert all(math.isclose(total, 1) for total in chain.P.sum(axis = 1))
+    # the landlord gains the rent, less a birthday present now and then
+    rent = sum(chain.mean[chain.seats + 40:chain.seats + 80])
+    assert 0 < rent - chain.mean[1] < 1
+    assert 0.9 < sum(chain.mean[chain.seats:chain.seats + 40]) < 1.1
+    # against the turns really played
+    start = plr.capital
+    for _ in range(4000):
+        turn(board, plr)
+    assert abs((plr.capital - start) / 4000 - chain.mean[0]) < 0.1 * abs(chain.mean[0])
+
+def test_fast_forward():
+    board = prepare_game(3, 1500, 32, 12, strategies = [{None}] * 3, seed = 0)
+    assert finish_game(board, fast_forward = True) is None
+    assert board.laps == 1296
+    assert board.turns == 3 * 1296
+    assert all(player.capital > 1500 for player in board.players)
+    assert 0.9 < sum(board.field_visits.values()) / board.turns < 1.1
+
+def test_fast_forward_seeded():
+    first = run_game(4, 1500, 32, 12, seed = 6, fast_forward = True)
+    second = run_game(4, 1500, 32, 12, seed = 6, fast_forward = True)
+    assert first.laps == second.laps
+    assert [player.capital for player in first.seats] == [player.capital for player in second.seats]
+
+def test_fast_forward_trajectory():
+    try:
+        run_game(2, 1500, 32, 12, seed = 0, trajectory = True, fast_forward = True)
+    except ValueError:
+        return
+    assert False
+
+def test_fast_forward_stays_solvent():
+    for seed in range(8):
+        board, plr, _ = _landlord(seed)
+        forward = fw.FastForward(board)
+        forward.chains()
+        plr.capital = int(forward._floor[0]) + 1000
+        length = forward.jump(1296)
+        # the walk ends with the lap leaving the player short of the floor
+        assert 0 < length < 1296
+        assert 0 <= plr.capital < forward._floor[0]
+        assert not plr.bankrupt
+        assert forward.jump(1296) == 0
+    plr.bankrupt = True
+    assert not fw.quiescent(board)
@@ -0,0 +1,103 @@
+import gzip
+import logging as log
+import threading
+import mono.gamelog as gl
+
+
+def _logger(writer, name:str):
+    logger = log.getLogger(f'gamelog-test.{name}')
+    logger.propagate = False
+    logger.setLevel(log.INFO)
+    logger.addHandler(writer)
+    return logger
+
+def _read(path:str) -> list:
+    with gzip.open(path, 'rt') as lines:
+        return lines.read().splitlines()
+
+
+def test_write_compressed(tmp_path):
+    writer = gl.LogWriter(str(tmp_path / 'game.log'))
+    logger = _logger(writer, 'compressed')
+    for j in range(100):
+        logger.info('Player %s pays %d£', 'player-one', j)
+    writer.close()
+    assert writer.files == [str(tmp_path / 'game.log.gz')]
+    lines = _read(writer.files[0])
+    assert len(lines) == 100
+    assert lines[-1] == 'Player player-one pays 99£'
+
+def test_rotate(tmp_path):
+    writer = gl.LogWriter(str(tmp_path / 'game.log'))
+    logger = _logger(writer, 'rotate')
+    for game in range(3):
+        logger.info('game %d', game)
+        writer.rotate()
+    writer.close()
+    assert [path.split('/')[-1] for path in writer.files] == \
+            ['game.log.gz', 'game.1.log.gz', 'game.2.log.gz']
+    assert [_read(path) for path in writer.files] == [['game 0'], ['game 1'], ['game 2']]
+
+def test_rotate_by_size(tmp_path):
+    writer = gl.LogWriter(str(tmp_path / 'game.log'), max_bytes = 64, compress = False, batch = 4)
+    logger = _logger(writer, 'size')
+    for j in range(100):
+        logger.info('record %03d', j)
+    writer.close()
+    assert len(writer.files) > 1
+    lines = []
+    for path in writer.files:
+        with open(path) as content:
+            lines.extend(content.read().splitlines())
+    assert lines == [f'record {j:03d}' for j in range(100)]
+
+def test_drop_when_full(tmp_path):
+    writer = gl.LogWriter(str(tmp_path / 'game.log'), queue_size = 1, full = 'drop')
+    logger = _logger(writer, 'drop')
+    for j in range(1000):
+        logger.info('record %d', j)
+    writer.close()
+    lines = _read(writer.files[0])
+    if writer.dropped:
+        assert lines[-1] == f'{writer.dropped} log records dropped.'
+        lines = lines[:-1]
+    assert len(lines) + writer.dropped == 1000
+
+class _Stalling(log.Formatter):
+    # holds up the writer on the first record until released
+    def __init__(self):
+        super().__init__()
+        self.stalled = threading.Event()
+        self.release = threading.Event()
+
+    def format(self, record):
+        if record.getMessage() == 'record 0':
+            self.stalled.set()
+            self.release.wait()
+        return super().format(record)
+
+def test_drop_oldest_across_rotate(tmp_path):
+    writer = gl.LogWriter(str(tmp_path / 'game.log'), queue_size = 3, full = 'oldest', batch = 1)
+    formatter = _Stalling()
+    writer.setFormatter(formatter)
+    logger = _logger(writer, 'oldest')
+    logger.info('record 0')
+    assert formatter.stalled.wait(5)
+    logger.info('record 1')
+    logger.info('record 2')
+    writer.rotate()
+    logger.info('record 3')
+    logger.info('record 4')
+    formatter.release.set()
+    writer.close()
+    # only record 1 is dropped, and record 2 stays before the rotation
+    assert writer.dropped == 1
+    assert [_read(path) for path in writer.files] == \
+            [['record 0', 'record 2'], ['record 3', 'record 4', '1 log records dropped.']]
+
+def test_unknown_policy():
+    try:
+        gl.LogWriter(full = 'wait')
+    except ValueError:
+        return
+    assert False
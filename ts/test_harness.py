@@ -0,0 +1,32 @@
+import mono.harness as hr
+
+
+class GenerousEngine(hr.Engine):
+    def turn(self, board, player):
+        super().turn(board, player)
+        if board.laps == 3:
+            player.capital += 1
+
+class ShortEngine(hr.Engine):
+    def end_lap(self, board):
+        winner = super().end_lap(board)
+        return winner or (board.players[0] if board.laps > 5 else None)
+
+
+def test_reference_agrees():
+    assert hr.check(hr.Engine(), seeds = range(4)) is None
+
+def test_first_divergence():
+    divergence = hr.check(GenerousEngine(), seeds = range(4))
+    assert divergence.seed == 0
+    assert divergence.lap == 3
+    assert divergence.differences[0][0].endswith('.capital')
+    assert divergence.differences[0][2] == divergence.differences[0][1] + 1
+
+def test_early_end():
+    divergence = hr.check_seed(ShortEngine(), 0)
+    assert divergence is not None
+    assert divergence.lap == 6
+
+def test_parallel():
+    assert hr.check(GenerousEngine(), seeds = range(3), workers = 2).seed == 0
@@ -0,0 +1,69 @@
+import mono.board as br
+import mono.league as lg
+import mono.player as pl
+
+
+def test_entrants():
+    entrants = lg.entrants()
+    assert len(set(entrants)) == len(entrants)
+    # every card strategy answers the card offering a chance differently
+    drawn = set()
+    for card in {entrant[2] for entrant in entrants}:
+        board = br.prepare_board(0, 0)
+        player = pl.initialise_player(1000, 'card-test', board, strategies = {card})
+        br.Card(name = 'takechance', category = 'special').evaluate(player, board)
+        drawn.add(board.chance.top)
+    assert len(drawn) == len({entrant[2] for entrant in entrants})
+
+def test_rate():
+    ratings = [lg.Rating() for _ in range(3)]
+    lg.rate(ratings, [0, 1, 1])
+    assert ratings[0].mu > lg._MU > ratings[1].mu
+    assert ratings[1].mu == ratings[2].mu
+    assert all(rating.sigma < lg._SIGMA for rating in ratings)
+    assert all(rating.games == 1 for rating in ratings)
+
+def test_rate_tie():
+    ratings = [lg.Rating(), lg.Rating()]
+    lg.rate(ratings, [0, 0])
+    assert ratings[0].mu == ratings[1].mu == lg._MU
+
+def test_record_rotations_once():
+    league = lg.League(seats = 3, lineup = lg.entrants()[:3])
+    league.record((0, 1, 2), [0, 0, 1])
+    single = [lg.Rating() for _ in range(3)]
+    lg.rate(single, [1 / 3, 2 / 3, 1])
+    assert [rating.sigma for rating in league.ratings] == [rating.sigma for rating in single]
+    assert league.ratings[0].mu > league.ratings[1].mu > league.ratings[2].mu
+    assert league.games == 3
+    assert all(rating.games == 3 for rating in league.ratings)
+
+def test_allocate():
+    league = lg.League(seats = 3)
+    tables = league.allocate(8)
+    assert len(tables) == 8
+    assert all(len(set(table)) == 3 for table in tables)
+
+def test_settled():
+    league = lg.League(seats = 2, lineup = lg.entrants()[:3])
+    assert not league.settled()
+    for position, rating in enumerate(league.ratings):
+        rating.mu = 10 * position
+        rating.sigma = 1
+    assert league.settled()
+    assert [row['strategies'] for row in league.table()] == \
+            [lg.label(entrant) for entrant in reversed(lg.entrants()[:3])]
+    league.ratings[1].mu = 20.5
+    assert not league.settled()
+    league.margin = 5
+    assert league.settled()
+
+def test_run_league(tmp_path):
+    lineup = [('roi', 'buyall', None), (None, 'buyall', None)]
+    league = lg.run_league(seats = 2, lineup = lineup, batch = 2, max_games = 4)
+    assert league.games == 4
+    assert [row['games'] for row in league.table()] == [4, 4]
+    assert all(row['lower'] < row['mu'] < row['upper'] for row in league.table())
+    league.write(str(tmp_path))
+    with open(tmp_path / 'league_2.csv') as csv:
+        assert len(csv.readlines()) == 3
@@ -28,10 +28,10 @@ def test_jailout():
     assert not plr.jailed
 
     plr.jailed = True
-    plr.jailoutcard = True
+    plr.jailoutcards = [br.Card(category = 'jailout')]
     plr.try_jailout(board)
     assert not plr.jailed
-    assert not plr.jailoutcard
+    assert not plr.jailoutcards
 
 def test_advance():
     plr.position = 39
@@ -165,3 +165,11 @@ def test_develop():
     assert est2.development == 0
     assert est3.development == 0
     assert est4.development == 0
+
+def test_net_worth():
+    est = br.Estate(category = 'estate', colour = 'green', cost = 10, house = 3)
+    est.development = 2
+    util = br.Buyable(category = 'utility')
+    plr.capital = 1
+    plr.estates = {est, util}
+    assert plr.net_worth() == 1 + 10 + 6 + 150
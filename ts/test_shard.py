@@ -0,0 +1,81 @@
+import os
+import shutil
+import mono.shard as sh
+import mono.batch as bt
+import mono.store as st
+
+config = dict(num_players = 3, start_capital = 1500, houses = 32, hotels = 12)
+
+
+def test_submit_idempotent(tmp_path):
+    shards = sh.submit(str(tmp_path), 10, shard_size = 4, **config)
+    assert len(shards) == 3
+    sh.submit(str(tmp_path), 10, shard_size = 4, **config)
+    assert len(os.listdir(tmp_path / 'pending')) == 3
+
+def test_submit_strategies(tmp_path):
+    strategies = [{'expert', 'buyall'}, {'counter', None}]
+    sh.submit(str(tmp_path), 2, shard_size = 2, strategies = strategies, start_capital = 1500)
+    shard = sh.claim(str(tmp_path))
+    assert shard['config']['strategies'] == [['buyall', 'expert'], [None, 'counter']]
+    done = sh.run_shard(shard)
+    for seed, result in zip(range(2), done['results']):
+        board = bt.run_game(strategies = strategies, seed = seed, start_capital = 1500)
+        assert result['turns'] == board.turns
+
+def test_claim_and_requeue(tmp_path):
+    sh.submit(str(tmp_path), 4, shard_size = 2, **config)
+    shard = sh.claim(str(tmp_path))
+    assert shard['seeds'] == [0, 2]
+    assert sh.requeue_stale(str(tmp_path), lease = 60) == 0
+    os.utime(tmp_path / 'claimed' / f'{shard["shard"]}.json', (0, 0))
+    assert sh.requeue_stale(str(tmp_path), lease = 60) == 1
+    assert len(os.listdir(tmp_path / 'pending')) == 2
+
+def test_claim_never_stale(tmp_path, monkeypatch):
+    sh.submit(str(tmp_path), 2, shard_size = 2, **config)
+    os.utime(tmp_path / 'pending' / 'shard-000000000000.json', (0, 0))
+    rename = os.rename
+    swept = []
+
+    def rename_and_sweep(source, destination):
+        # a sweep right after the rename, before the worker reads the shard
+        rename(source, destination)
+        swept.append(sh.requeue_stale(str(tmp_path), lease = 60))
+
+    monkeypatch.setattr(sh.os, 'rename', rename_and_sweep)
+    assert sh.claim(str(tmp_path))['seeds'] == [0, 2]
+    assert swept == [0]
+
+def test_merge_matches_serial(tmp_path):
+    tally_c, tally_f, results = sh.coordinate(str(tmp_path), 6,
+            workers = 2, shard_size = 2, poll = 0.05, **config)
+    assert len(results) == 6
+    serial_c, serial_f = dict(), dict()
+    for seed in range(6):
+        bt.tally_game(bt.run_game(seed = seed, **config), serial_c, serial_f)
+    assert tally_c == serial_c
+    assert tally_f == serial_f
+    assert sh.merge(str(tmp_path)) == (tally_c, tally_f, results)
+
+def test_merge_sketches(tmp_path):
+    sh.submit(str(tmp_path), 4, shard_size = 2, **config)
+    sh.work(str(tmp_path))
+    sketches = sh.merge_sketches(str(tmp_path))
+    assert sketches.metrics['laps'][1].count == 4
+
+def test_merge_once_across_hosts(tmp_path):
+    work = tmp_path / 'work'
+    sh.submit(str(work), 2, shard_size = 2, **config)
+    sh.submit(str(work), 2, shard_size = 2, **config)
+    # the same directory mounted elsewhere on another host
+    os.symlink(work, tmp_path / 'mount')
+    shard = work / 'pending' / 'shard-000000000000.json'
+    shutil.copy(shard, tmp_path / 'shard.json')
+    knowledge = str(tmp_path / 'knowledge.db')
+    sh.work(str(work), knowledge = knowledge)
+    once = st.KnowledgeStore(knowledge).colour_tally()
+    # a lost claim played again through the other mount
+    shutil.copy(tmp_path / 'shard.json', shard)
+    sh.work(str(tmp_path / 'mount'), knowledge = knowledge)
+    assert st.KnowledgeStore(knowledge).colour_tally() == once
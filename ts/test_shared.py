@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import mono.board as br
+import mono.game as gm
+import mono.player as pl
+import mono.shared as sh
+
+
+def test_build_tables():
+    tables = sh.build_tables()
+    assert len(tables['static_estate']) == 22
+    assert tables['static_estate']['cost'].dtype.kind == 'i'
+    assert tables['rent'][39].tolist() == [50, 200, 600, 1400, 1700, 2000]
+    assert tables['cost'][5] == 200
+    assert abs(tables['field_prior'].sum() - 1) < 1e-9
+
+def test_records():
+    table = sh.records([{'name' : 'Go', 'position' : '0', 'advance' : ''},
+        {'name' : 'Mayfair', 'position' : '39', 'advance' : '-3'}])
+    assert table.dtype['position'].kind == 'i'
+    assert table[1]['name'] == 'Mayfair'
+    assert table[0]['advance'] == ''
+
+def test_attach():
+    local = gm.run_game(3, 1500, 32, 12, seed = 4)
+    with sh.publish() as tables:
+        sh.attach(tables.spec)
+        try:
+            assert sh.table('house')[1] == 30
+            assert not sh.table('rent').flags.writeable
+            # the boards are built straight from the shared records
+            assert not br._static['estate'].flags.writeable
+            board = br.prepare_board(0, 0)
+            assert len(board.fields) == 40
+            assert len(board.chance) == 16
+            plr = pl.Player('player-test', 1, {'expert'}, board)
+            tally = pl.settings()['colour_tally']
+            assert plr.colour_priorities[0] == max(tally, key = tally.get)
+            assert gm.run_game(3, 1500, 32, 12, seed = 4).field_visits == local.field_visits
+        finally:
+            sh.detach()
+    assert br._static is None
+    assert len(br.prepare_board(0, 0).fields) == 40
+
+def test_run_without_numpy():
+    # only worker pools publish the tables, so playing a game never loads numpy
+    script = 'import sys, run; run.run_single_game(); print("numpy" in sys.modules)'
+    out = subprocess.run([sys.executable, '-c', script], capture_output = True, text = True, check = True)
+    assert out.stdout.strip() == 'False'
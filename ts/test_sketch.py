@@ -0,0 +1,54 @@
+import json
+import math
+import random
+import mono.sketch as sk
+import mono.game as gm
+
+
+def test_histogram():
+    histogram = sk.Histogram(0, 10, 5)
+    for value in [-1, 0, 1.9, 2, 9.9, 10]:
+        histogram.push(value)
+    assert histogram.counts == [1, 2, 1, 0, 0, 1, 1]
+    other = sk.Histogram.from_dict(histogram.as_dict())
+    histogram.merge(other)
+    assert histogram.counts == [2, 4, 2, 0, 0, 2, 2]
+
+def test_quantile_accuracy():
+    rng = random.Random(0)
+    values = [rng.expovariate(1 / 500) for _ in range(5000)] + [0, -3]
+    sketch = sk.QuantileSketch(accuracy = 0.01)
+    for value in values:
+        sketch.push(value)
+    values.sort()
+    for fraction in [0.1, 0.5, 0.9, 0.99]:
+        exact = values[int(fraction * (len(values) - 1))]
+        assert math.isclose(sketch.quantile(fraction), exact, rel_tol = 0.02)
+    assert sketch.quantile(0) < 0
+
+def test_quantile_merge():
+    left, right, whole = sk.QuantileSketch(), sk.QuantileSketch(), sk.QuantileSketch()
+    for value in range(1, 1000):
+        (left if value % 2 else right).push(value)
+        whole.push(value)
+    left.merge(sk.QuantileSketch.from_dict(json.loads(json.dumps(right.as_dict()))))
+    assert left.count == whole.count
+    assert left.quantile(0.5) == whole.quantile(0.5)
+
+def test_quantile_bounded():
+    sketch = sk.QuantileSketch(max_bins = 16)
+    for value in range(1, 10000):
+        sketch.push(value)
+    assert len(sketch.positive) == 16
+    assert math.isclose(sketch.quantile(0.99), 9900, rel_tol = 0.02)
+
+def test_add_game():
+    board = gm.run_game(num_players = 3, start_capital = 1500, houses = 32, hotels = 12, seed = 2)
+    sketches = sk.Sketches()
+    sketches.add_game(board)
+    assert sketches.metrics['laps'][1].count == 1
+    assert sum(board.rent_paid.values()) > 0
+    assert sketches.metrics['rent/39'][1].count == 1
+    merged = sk.Sketches.from_dict(sketches.as_dict())
+    merged.merge(sketches)
+    assert merged.metrics['laps'][0].counts == [2 * count for count in sketches.metrics['laps'][0].counts]
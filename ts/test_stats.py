@@ -0,0 +1,154 @@
+import math
+import os
+import subprocess
+import sys
+import mono.stats as st
+import mono.batch as bt
+
+
+def test_running_stat():
+    stat = st.RunningStat()
+    assert stat.halfwidth() == math.inf
+    for value in [1, 2, 3, 4]:
+        stat.push(value)
+    assert stat.count == 4
+    assert stat.mean == 2.5
+    assert math.isclose(stat.variance, 5/3)
+
+def test_running_stat_merge():
+    left, right, whole = st.RunningStat(), st.RunningStat(), st.RunningStat()
+    for value in [1, 5, 2]:
+        left.push(value)
+        whole.push(value)
+    for value in [7, 3]:
+        right.push(value)
+        whole.push(value)
+    left.merge(right)
+    assert left.count == whole.count
+    assert math.isclose(left.mean, whole.mean)
+    assert math.isclose(left.variance, whole.variance)
+
+def test_stat_group_converged():
+    group = st.StatGroup()
+    assert not group.converged(1)
+    for _ in range(4):
+        group.push({'a':1, 'b':0})
+    assert group.converged(0.001)
+    group.push({'a':0})
+    assert not group.converged(0.001)
+
+def test_ratio_stat():
+    stat = st.RatioStat()
+    assert stat.halfwidth() == math.inf
+    for numerator, denominator in [(1, 4), (3, 4), (2, 10)]:
+        stat.push(numerator, denominator)
+    assert math.isclose(stat.mean, 6 / 18)
+    assert 0 < stat.variance < math.inf
+    group = st.RatioGroup()
+    group.push({'a':1, 'b':3})
+    group.push({'a':2, 'b':2, 'c':4})
+    assert math.isclose(group.means()['c'], 4 / 12)
+    assert math.isclose(sum(group.means().values()), 1)
+
+def test_ratio_group_merge():
+    counts = [{'a':1, 'b':3}, {'a':2, 'b':2, 'c':4}, {'b':5}, {'a':3, 'c':1}]
+    whole = st.RatioGroup()
+    for observation in counts:
+        whole.push(observation)
+    first = st.RatioGroup()
+    second = st.RatioGroup()
+    for observation in counts[:2]:
+        first.push(observation)
+    for observation in counts[2:]:
+        second.push(observation)
+    first.merge(second)
+    for key, stat in whole.stats.items():
+        assert first.stats[key].count == stat.count
+        assert math.isclose(first.stats[key].mean, stat.mean)
+        assert math.isclose(first.stats[key].variance, stat.variance)
+
+def test_run_until_converged_budget():
+    batch = bt.run_until_converged(tolerance = 0, max_games = 3,
+            start_capital = 1500, houses = 32, hotels = 12)
+    assert batch.games == 3
+    assert sum(batch.tally_f.values()) > 0
+    assert not batch.converged(0)
+    # the stopping rule follows the pooled shares written out as tallies
+    total = sum(batch.tally_c.values())
+    for colour, share in batch.colours.means().items():
+        assert math.isclose(share, batch.tally_c[colour] / total)
+
+def test_run_until_converged_tolerance():
+    batch = bt.run_until_converged(tolerance = 1, max_games = 100,
+            start_capital = 1500, houses = 32, hotels = 12)
+    assert batch.games < 100
+    assert batch.converged(1)
+
+def test_common_random_numbers():
+    kwds = dict(start_capital = 1500, houses = 32, hotels = 12)
+    first = bt.run_game(strategies = [{'buyall'}, {'safenet'}], seed = 6, **kwds)
+    second = bt.run_game(strategies = [{'buyall'}, {'safenet'}], seed = 6, **kwds)
+    assert first.field_visits == second.field_visits
+    assert first.laps == second.laps
+
+def test_rotate():
+    assert bt.rotate(['a', 'b', 'c'], 1) == ['b', 'c', 'a']
+
+def test_compare_strategies():
+    lineup = [{'buyall'}, {None}]
+    comparison = bt.compare_strategies(lineup, num_seeds = 4,
+            start_capital = 1500, houses = 32, hotels = 12)
+    assert comparison.games == 8
+    assert comparison.differences[0].mean == 0
+    parallel = bt.compare_strategies(lineup, num_seeds = 4, workers = 2,
+            start_capital = 1500, houses = 32, hotels = 12)
+    assert [stat.mean for stat in parallel.wins] == [stat.mean for stat in comparison.wins]
+
+def test_run_batch():
+    kwds = dict(start_capital = 1500, houses = 32, hotels = 12)
+    progress = bt.Progress(6, stream = None)
+    total = bt.run_batch(6, chunk = 4, progress = progress, **kwds)
+    assert [result['seed'] for result in total['results']] == list(range(6))
+    assert progress.summary()['turns'] == sum(result['turns'] for result in total['results'])
+    parallel = bt.run_batch(6, chunk = 4, workers = 2, **kwds)
+    assert parallel['results'] == total['results']
+    assert parallel['tally_f'] == total['tally_f']
+    threaded = bt.run_batch(6, chunk = 2, workers = 3, threads = True, **kwds)
+    assert threaded['results'] == total['results']
+    assert threaded['tally_f'] == total['tally_f']
+
+def test_run_batch_checkpoint(tmp_path):
+    kwds = dict(start_capital = 1500, houses = 32, hotels = 12)
+    fresh = bt.run_batch(12, chunk = 4, **kwds)
+    directory = str(tmp_path / 'checkpoint')
+    first = bt.run_batch(8, chunk = 4, checkpoint = directory, checkpoint_every = 0, **kwds)
+    assert len(first['results']) == 8
+    # results written after the last checkpoint are dropped on resuming
+    with open(f'{directory}/results.journal', 'a') as journal:
+        journal.write('{"seed": 8}\n')
+    resumed = bt.run_batch(12, chunk = 4, checkpoint = directory, **kwds)
+    assert resumed['results'] == fresh['results']
+    assert resumed['tally_c'] == fresh['tally_c']
+    assert resumed['tally_f'] == fresh['tally_f']
+    assert resumed['outcomes'] == fresh['outcomes']
+    assert resumed['sketches'].as_dict() == fresh['sketches'].as_dict()
+    try:
+        bt.run_batch(12, seed = 1, checkpoint = directory, **kwds)
+    except ValueError:
+        return
+    assert False
+
+def test_checkpoint_across_hash_seeds(tmp_path):
+    # sets of strategies iterate in another order in every interpreter
+    script = ('import sys, mono.batch as bt; bt.run_batch(int(sys.argv[1]), chunk = 1, checkpoint = sys.argv[2], '
+            'strategies = [{"expert", "buyall", "chance"}, {"counter", "safenet", None}], start_capital = 1500)')
+    for games, hashseed in ((1, '1'), (2, '2')):
+        subprocess.run([sys.executable, '-c', script, str(games), str(tmp_path)], check = True,
+                env = dict(os.environ, PYTHONHASHSEED = hashseed))
+    with open(tmp_path / 'results.journal') as journal:
+        assert len(journal.readlines()) == 2
+
+def test_run_batch_time_budget():
+    total = bt.run_batch(max_seconds = 0.1, chunk = 1,
+            start_capital = 1500, houses = 32, hotels = 12)
+    assert len(total['results']) >= 1
@@ -0,0 +1,103 @@
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import mono.batch as bt
+import mono.board as br
+import mono.player as pl
+import mono.shard as sh
+import mono.store as st
+
+
+def _merge(path):
+    store = st.KnowledgeStore(path)
+    for _ in range(10):
+        store.merge({'red':1, 'blue':2}, {0:1}, {'buyall':(1, 1)})
+    return True
+
+def test_merge(tmp_path):
+    store = st.KnowledgeStore(str(tmp_path / 'knowledge.db'))
+    assert store.merge({'red':1}, {0:2, 1:3}, {'buyall':(2, 1)})
+    assert store.merge({'red':1, 'blue':5}, {1:1})
+    assert store.colour_tally() == {'red':2, 'blue':5}
+    assert store.field_tally() == {0:2, 1:4}
+    assert store.outcomes() == {'buyall':(2, 1)}
+
+def test_merge_batch_once(tmp_path):
+    store = st.KnowledgeStore(str(tmp_path / 'knowledge.db'))
+    assert store.merge({'red':1}, {}, batch = 'shard-0')
+    assert not store.merge({'red':1}, {}, batch = 'shard-0')
+    assert store.colour_tally() == {'red':1}
+
+def test_concurrent_merge(tmp_path):
+    path = str(tmp_path / 'knowledge.db')
+    with Pool(4) as pool:
+        assert all(pool.map(_merge, [path] * 4))
+    store = st.KnowledgeStore(path)
+    assert store.colour_tally() == {'red':40, 'blue':80}
+    assert store.outcomes() == {'buyall':(40, 40)}
+
+def test_snapshot_for_expert(tmp_path):
+    path = str(tmp_path / 'knowledge.db')
+    store = st.KnowledgeStore(path)
+    store.merge({'red':1, 'blue':2}, {})
+    board = br.prepare_board(0, 0)
+    pl.use_knowledge(store)
+    try:
+        assert pl.Player('player-test', 1, {'expert'}, board).colour_priorities == ['blue', 'red']
+        other = st.KnowledgeStore(path)
+        other.merge({'red':5}, {})
+        assert store.snapshot() == {'red':6, 'blue':2}
+        assert pl.Player('player-test', 1, {'expert'}, board).colour_priorities == ['red', 'blue']
+    finally:
+        pl.use_knowledge(None)
+
+def test_knowledge_in_threads(tmp_path):
+    store = st.KnowledgeStore(str(tmp_path / 'knowledge.db'))
+    store.merge({'red':1, 'blue':2}, {})
+    board = br.prepare_board(0, 0)
+    pl.use_knowledge(store)
+    try:
+        with ThreadPool(2, initializer = pl.adopt, initargs = (pl.settings(),)) as pool:
+            priorities = pool.map(lambda _: pl.Player('player-test', 1, {'expert'}, board).colour_priorities,
+                    range(4))
+        assert priorities == [['blue', 'red']] * 4
+        # every thread reads through a connection of its own
+        kwds = dict(num_players = 2, strategies = [{'expert', 'buyall'}, {'buyall'}],
+                start_capital = 1500, houses = 32, hotels = 12)
+        serial = bt.run_batch(4, chunk = 1, **kwds)
+        threaded = bt.run_batch(4, chunk = 1, workers = 2, threads = True, **kwds)
+        assert threaded['results'] == serial['results']
+    finally:
+        pl.use_knowledge(None)
+    with ThreadPool(1) as pool:
+        assert pool.apply(pl.settings)['knowledge'] is None
+
+def _knowing(path:str, tally:dict) -> str:
+    st.KnowledgeStore(path).merge(tally, {})
+    return path
+
+def test_batch_plays_by_knowledge(tmp_path):
+    config = dict(strategies = [{'expert', 'buyall'}] * 3, start_capital = 1500, houses = 32, hotels = 12)
+    turns = dict()
+    for name, tally in (('brown', {'brown':100, 'blue':90}), ('green', {'green':100, 'yellow':90})):
+        for workers, threads in ((None, False), (2, False), (2, True)):
+            path = _knowing(str(tmp_path / f'{name}-{workers}-{threads}.db'), tally)
+            total = bt.run_batch(num_games = 4, chunk = 4, workers = workers, threads = threads,
+                    knowledge = path, **config)
+            turns.setdefault(name, set()).add(tuple(result['turns'] for result in total['results']))
+            merged = st.KnowledgeStore(path).colour_tally()
+            assert merged == {colour:tally.get(colour, 0) + visits for colour, visits in total['tally_c'].items()}
+    # every kind of worker plays by the same knowledge, and other knowledge changes the games
+    assert len(turns['brown']) == len(turns['green']) == 1
+    assert turns['brown'] != turns['green']
+    assert pl.settings()['knowledge'] is None
+
+def test_worker_plays_by_knowledge(tmp_path):
+    config = dict(num_players = 3, strategies = [{'expert', 'buyall'}] * 3, start_capital = 1500,
+            houses = 32, hotels = 12)
+    turns = []
+    for name, tally in (('brown', {'brown':100, 'blue':90}), ('green', {'green':100, 'yellow':90})):
+        path = _knowing(str(tmp_path / f'{name}.db'), tally)
+        sh.submit(str(tmp_path / name), 4, shard_size = 4, **config)
+        sh.work(str(tmp_path / name), knowledge = path)
+        turns.append([result['turns'] for result in sh.merge(str(tmp_path / name))[2]])
+    assert turns[0] != turns[1]
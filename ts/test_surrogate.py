@@ -0,0 +1,48 @@
+import copy
+import numpy as np
+import mono.surrogate as sg
+from mono.game import prepare_game, lap
+
+
+def _board(seed:int = 0, laps:int = 8):
+    board = prepare_game(3, 1500, 32, 12, seed = seed)
+    while board.laps < laps and len(board.players) > 1:
+        lap(board)
+    return board
+
+
+def test_features():
+    board = _board()
+    rows = [sg.features(board, player) for player in board.players]
+    assert all(len(row) == len(sg.FEATURES) for row in rows)
+    assert abs(sum(row[0] for row in rows) - 1) < 1e-9
+
+def test_fit():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size = (2000, len(sg.FEATURES)))
+    y = (X[:, 1] + 0.5 * rng.normal(size = 2000) > 0).astype(float)
+    model = sg.Model().fit(X, y, backend = 'numpy')
+    assert model.weights[1] == max(model.weights)
+    assert ((model.predict(X) > 0.5) == y).mean() > 0.85
+    assert abs(model.probability(X[0]) - model.predict(X[:1])[0]) < 1e-9
+
+def test_save_load(tmp_path):
+    model = sg.Model(weights = list(range(len(sg.FEATURES))), bias = 0.5)
+    model.save(str(tmp_path / 'surrogate.json'))
+    loaded = sg.Model.load(str(tmp_path / 'surrogate.json'))
+    assert loaded.as_dict() == model.as_dict()
+
+def test_collect_and_predict():
+    X, y = sg.collect(range(4), every = 8, num_players = 2)
+    assert X.shape == (len(y), len(sg.FEATURES))
+    model = sg.Model().fit(X, y, backend = 'numpy')
+    board = _board()
+    for player in board.players:
+        assert 0 <= sg.win_probability(board, player, model) <= 1
+
+def test_rollout_leaves_board():
+    board = _board(laps = 64)
+    before = sg.features(board, board.players[0])
+    assert 0 <= sg.rollout(board, board.players[0], rollouts = 2) <= 1
+    assert sg.features(board, board.players[0]) == before
+    assert copy.deepcopy(board).zobrist == board.zobrist
@@ -0,0 +1,26 @@
+import mono.game as gm
+import mono.trajectory as tj
+
+
+def test_trajectory():
+    board = gm.run_game(num_players = 3, start_capital = 1500,
+            houses = 32, hotels = 12, seed = 1, trajectory = True)
+    values = board.trajectory
+    assert values.shape == (board.laps + (board.winner is not None), 3, len(tj.COLUMNS))
+    winner = board.seats.index(board.winner) if board.winner else 0
+    assert values[-1, winner, tj.CAPITAL] == board.seats[winner].capital
+    assert (values[:, :, tj.WORTH] >= values[:, :, tj.CAPITAL]).all()
+
+def test_no_trajectory():
+    board = gm.run_game(num_players = 2, start_capital = 1500, seed = 1)
+    assert board.trajectory is None
+
+def test_values_copied():
+    board = gm.run_game(num_players = 2, start_capital = 1500, seed = 1)
+    record = tj.Trajectory(2, 4)
+    record.record(board.seats)
+    values = record.values()
+    assert values.base is None
+    # reusing the recorder leaves what was returned alone
+    record.data[:] = 0
+    assert values[0, 0, tj.CAPITAL] == board.seats[0].capital
@@ -0,0 +1,49 @@
+import math
+import mono.board as br
+import mono.player as pl
+import mono.valuation as vl
+
+
+def test_rent_table():
+    table = vl.rent_table()
+    assert len(table) == 28
+    assert len(table[39]) == 6
+    assert len(table[5]) == 4
+    assert len(table[12]) == 2
+    # undeveloped full set pays double
+    assert math.isclose(table[39][0] / table[39][5], 2 * 50 / 2000)
+
+def test_roi_table():
+    assert math.isclose(vl.estate_roi(39, 5), vl.rent_table()[39][5] / (400 + 5 * 200))
+    assert math.isclose(vl.estate_roi(5, 3), vl.rent_table()[5][3] / 200)
+
+def test_roi_priorities():
+    priorities = vl.roi_priorities()
+    assert sorted(priorities) == sorted(pl._NAIVE_CLR)
+    board = br.prepare_board(0, 0)
+    plr = pl.Player('player-test', 1, {'roi'}, board)
+    assert plr.colour_priorities == list(priorities)
+
+def test_develop_roi():
+    assert math.isclose(vl.develop_roi(39, 0), (vl.rent_table()[39][1] - vl.rent_table()[39][0]) / 200)
+    assert 12 not in vl.develop_table()
+
+def test_roi_buys():
+    board = br.prepare_board(0, 0)
+    plr = pl.Player('player-test', 1500, {'roi', 'buyall'}, board)
+    # old kent road takes too long to pay for itself
+    plr._consider_buy(board.fields[1], board)
+    assert board.fields[1].owner is None
+    plr._consider_buy(board.fields[39], board)
+    assert board.fields[39].owner is plr
+
+def test_roi_develops():
+    board = br.prepare_board(32, 12)
+    plr = pl.Player('player-test', 10 ** 4, {'roi'}, board)
+    for position in (1, 3, 37, 39):
+        board.own(board.fields[position], plr)
+        plr.estates.add(board.fields[position])
+    assert plr._develop_estates(board)
+    best = max((1, 3, 37, 39), key = lambda position: vl.develop_roi(position, 0))
+    assert board.fields[best].development == 1
+    assert sum(board.fields[position].development for position in (1, 3, 37, 39)) == 1
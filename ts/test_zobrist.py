@@ -0,0 +1,53 @@
+import mono.board as br
+import mono.harness as hr
+import mono.zobrist as zb
+
+
+def test_incremental_hash():
+    for seed in range(6):
+        for board, _ in hr._play(hr.Engine(), seed, {}):
+            assert board.zobrist == zb.full_hash(board)
+
+def test_move_order():
+    first = hr.Engine().prepare(0, num_players = 2)
+    second = hr.Engine().prepare(0, num_players = 2)
+    one, two = first.seats
+    one._buy(first.fields[1], first)
+    two._buy(first.fields[3], first)
+    one, two = second.seats
+    two._buy(second.fields[3], second)
+    one._buy(second.fields[1], second)
+    assert first.zobrist == second.zobrist
+    first.fields[1].mortgage(first)
+    assert first.zobrist != second.zobrist
+    first.fields[1].demortgage(first)
+    assert first.zobrist == second.zobrist
+
+def test_transposition_cache():
+    board = hr.Engine().prepare(0, num_players = 2)
+    cache = zb.TranspositionCache(maxsize = 2)
+    calls = []
+    def evaluation(board, player):
+        calls.append(player.seat)
+        return player.seat
+    for player in board.seats * 2:
+        assert cache.evaluate(board, player, evaluation) == player.seat
+    assert calls == [0, 1]
+    assert cache.hits == 2
+    board.seats[0].advance(1, board)
+    cache.evaluate(board, board.seats[0], evaluation)
+    assert len(cache) == 2
+    assert (board.zobrist, zb.unhashed(board), 0) in cache
+
+def test_cache_follows_money():
+    board = hr.Engine().prepare(0, num_players = 2)
+    player = board.seats[0]
+    first = player.expected_cashflow(board)
+    assert player.expected_cashflow(board) is first
+    assert board.transpositions.hits == 1
+    zobrist = board.zobrist
+    player.capital = 5
+    board.houses -= 1
+    assert board.zobrist == zobrist
+    assert player.expected_cashflow(board) is not first
+    assert board.transpositions.hits == 1